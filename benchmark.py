@@ -0,0 +1,246 @@
+# Micro-benchmarks for the generator, the board checks and the board rendering
+# Runs headless (SDL dummy video driver), so it works without a window, e.g. over ssh or in CI.
+#
+#   python benchmark.py --output new.json                  # run and save the results
+#   python benchmark.py --compare old.json --output new.json   # run, save and compare to an older run
+#
+# Every repetition re-seeds random with its repetition number, so two runs time the same boards.
+# A benchmark counts as a regression when its median is more than --threshold (default 10%) slower.
+
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import argparse, json, platform, random, sys, time
+import pygame
+from sudoku_generator import SudokuGenerator, generate_sudoku, make_puzzle_id, generate_from_id
+from sudoku import Board
+from sudoku_grader import PuzzleGrader
+from bulk_validator import validate_grids, np
+from grid_symmetry import expand, canonical_puzzle
+
+BENCHMARKS = []  # (name, setup, timed) - setup(seed) returns the argument passed to timed, only timed is measured
+
+
+def benchmark(name):
+    def register(setup_and_timed):
+        setup, timed = setup_and_timed()
+        BENCHMARKS.append((name, setup, timed))
+        return setup_and_timed
+    return register
+
+
+for removed in (30, 40, 50):
+    BENCHMARKS.append((f"generate_sudoku[{removed}]", lambda seed: None,
+                       lambda arg, removed=removed: generate_sudoku(9, removed)))
+    BENCHMARKS.append((f"generate_sudoku_unique[{removed}]", lambda seed: None,
+                       lambda arg, removed=removed: generate_sudoku(9, removed, unique=True)))
+
+
+BENCHMARKS.append(("generate_from_id[50]", lambda seed: make_puzzle_id(seed, 9, 50, True), generate_from_id))
+
+
+@benchmark("fill_remaining")
+def fill_remaining_benchmark():
+    def setup(seed):
+        sudoku = SudokuGenerator(9, 40)
+        sudoku.fill_diagonal()
+        return sudoku
+    return setup, lambda sudoku: sudoku.fill_remaining(0, sudoku.box_length)
+
+
+@benchmark("remove_cells[40]")
+def remove_cells_benchmark():
+    def setup(seed):
+        sudoku = SudokuGenerator(9, 40)
+        sudoku.fill_values()
+        return sudoku
+    return setup, lambda sudoku: sudoku.remove_cells()
+
+
+@benchmark("grade_puzzle[50]")
+def grade_benchmark():
+    grader = PuzzleGrader()
+    return (lambda seed: generate_sudoku(9, 50, unique=True)), grader.grade
+
+
+def solved_board(screen):
+    # a board with every cell filled in correctly, the slowest case for is_full and check_board
+    board = Board(612, 680, screen, 40)
+    sudoku = SudokuGenerator(9, 0)
+    sudoku.fill_values()
+    solution = sudoku.get_board()
+    for row in range(9):
+        for col in range(9):
+            if not board.model.is_given(row, col):
+                board.place_number(str(solution[row][col]), row, col)
+    return board
+
+
+@benchmark("check_board")
+def check_board_benchmark():
+    return (lambda seed: solved_board(pygame.display.get_surface())), (lambda board: board.check_board())
+
+
+@benchmark("is_full")
+def is_full_benchmark():
+    return (lambda seed: solved_board(pygame.display.get_surface())), (lambda board: board.is_full())
+
+
+if np is not None:
+    @benchmark("validate_grids[10000]")
+    def validate_grids_benchmark():
+        def setup(seed):
+            grids = []
+            for _ in range(10):
+                sudoku = SudokuGenerator(9, 0)
+                sudoku.fill_values()
+                grids.append(sudoku.get_board())
+            return np.array(grids * 1000, np.uint8)
+        return setup, validate_grids
+
+    @benchmark("canonical_puzzle")
+    def canonical_puzzle_benchmark():
+        def setup(seed):
+            sudoku = SudokuGenerator(9, 40)
+            sudoku.fill_values()
+            solution = sudoku.get_board()
+            sudoku.remove_cells()
+            return sudoku.get_board(), solution
+        return setup, lambda pair: canonical_puzzle(*pair)
+
+
+@benchmark("expand[10000]")
+def expand_benchmark():
+    def setup(seed):
+        sudoku = SudokuGenerator(9, 40)
+        sudoku.fill_values()
+        solution = sudoku.get_board()
+        sudoku.remove_cells()
+        return sudoku.get_board(), solution
+    return setup, lambda pair: sum(1 for moved in expand(pair[0], pair[1], 10000, random.Random(0)))
+
+
+@benchmark("board_draw")
+def board_draw_benchmark():
+    def setup(seed):
+        screen = pygame.display.get_surface()
+        board = Board(612, 680, screen, 40)
+        for row in range(9):
+            for col in range(9):
+                if not board.model.is_given(row, col) and (row + col) % 2:
+                    board.sketch(str((row + col) % 9 + 1), row, col)
+        screen.fill('pink')
+        return board
+
+    def draw(board):
+        board.draw_grid(board.screen)
+        for row in board.cells:
+            for cell in row:
+                cell.draw()
+    return setup, draw
+
+
+@benchmark("board_compose")
+def board_compose_benchmark():
+    # the whole in-game screen (grid, cells and buttons) put back together from the board's cached layers
+    return board_draw_benchmark()[0], lambda board: board.draw()
+
+
+'''
+Returns the pct percentile of a sorted list of numbers (nearest rank)
+'''
+
+def percentile(ordered, pct):
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+'''
+Runs one benchmark repeat times (seeds 0 to repeat - 1) and returns its timing summary in microseconds
+'''
+
+def run_benchmark(setup, timed, repeat):
+    times = []
+    for seed in range(repeat):
+        random.seed(seed)
+        arg = setup(seed)
+        start = time.perf_counter_ns()
+        timed(arg)
+        times.append((time.perf_counter_ns() - start) / 1000)
+    times.sort()
+    return {
+        "repeat": repeat,
+        "min": times[0],
+        "mean": sum(times) / len(times),
+        "p50": percentile(times, 50),
+        "p90": percentile(times, 90),
+        "p99": percentile(times, 99),
+        "max": times[-1],
+    }
+
+
+'''
+Compares two result files and prints a table of the median change per benchmark
+
+Return: list of benchmark names that got slower than threshold (e.g. 0.10 for 10%)
+'''
+
+def compare(old, new, threshold):
+    regressions = []
+    print(f"\n{'benchmark':32} {'old p50 us':>12} {'new p50 us':>12} {'change':>8}")
+    for name, result in new["results"].items():
+        if name not in old["results"]:
+            continue
+        before, after = old["results"][name]["p50"], result["p50"]
+        change = after / before - 1 if before else 0.0
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:32} {before:12.1f} {after:12.1f} {change:+8.1%}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless micro-benchmarks for the Sudoku game")
+    parser.add_argument("--repeat", type=int, default=200, help="repetitions (seeds) per benchmark")
+    parser.add_argument("--output", help="save the results to this JSON file")
+    parser.add_argument("--compare", help="earlier results JSON file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="median slowdown that counts as a regression")
+    parser.add_argument("--filter", default="", help="only run benchmarks whose name contains this")
+    args = parser.parse_args(argv)
+
+    pygame.init()
+    pygame.display.set_mode((612, 680))
+
+    results = {}
+    print(f"{'benchmark':32} {'p50 us':>10} {'p90 us':>10} {'p99 us':>10} {'max us':>10}")
+    for name, setup, timed in BENCHMARKS:
+        if args.filter not in name:
+            continue
+        result = run_benchmark(setup, timed, args.repeat)
+        results[name] = result
+        print(f"{name:32} {result['p50']:10.1f} {result['p90']:10.1f} {result['p99']:10.1f} {result['max']:10.1f}")
+
+    report = {
+        "python": platform.python_version(),
+        "pygame": pygame.version.ver,
+        "machine": platform.machine(),
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+
+    if args.compare:
+        with open(args.compare) as file:
+            old = json.load(file)
+        regressions = compare(old, report, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,414 @@
+# Board state without any drawing - everything Board needs to know about a game, packed into one bytearray
+# so thousands of boards can be kept in memory (e.g. by a server hosting many games). No pygame in here.
+#
+# data layout, with n = size * size cells numbered row * size + col:
+#   data[0:n]        givens   - the numbers the puzzle came with (0 = empty)
+#   data[n:2n]       values   - the numbers on the board right now (givens + the player's numbers)
+#   data[2n:3n]      sketches - the sketched number in each cell (0 = none)
+#   data[3n:...]     marks    - pencil marks, a bitset per cell (bit num set = num is marked) stored in
+#                               mark_bytes bytes, little endian: 2 bytes on 9x9, 3 on 16x16, 4 on 25x25
+#   data[counts_start:] counts - how many times each number is in each unit: unit * (size + 1) + number,
+#                               units 0 to size-1 are the rows, then the columns, then the boxes
+#
+# The auto candidates (the numbers that can still legally go in each cell) are kept up to date from the
+# counts when they are switched on: a number only stops or starts being possible in the cells of the three
+# units it was just added to or removed from, so each change touches the cell's 20 peers and nothing else.
+
+from array import array
+from sudoku_solver import get_unit_tables
+
+UNDO_CAP = 4096  # changes an UndoLog keeps before it starts forgetting the oldest ones
+
+
+class BoardModel:
+    '''
+    The state of one game
+
+    Parameters:
+    puzzle is a 2D list of the starting numbers (0 = empty)
+    '''
+    __slots__ = ("size", "box_length", "cell_count", "mark_bytes", "counts_start", "data",
+                 "empty_count", "duplicate_count", "history", "candidates")
+
+    def __init__(self, puzzle):
+        self.size = len(puzzle)
+        self.box_length = int(self.size ** 0.5)
+        self.cell_count = self.size * self.size
+        self.mark_bytes = (self.size + 1 + 7) // 8  # bits 1 to size
+        self.counts_start = (3 + self.mark_bytes) * self.cell_count
+        self.data = bytearray(self.counts_start + 3 * self.size * (self.size + 1))
+        self.empty_count = 0
+        self.duplicate_count = 0  # (unit, number) pairs where the number is in the unit more than once
+        self.history = None  # UndoLog every change gets recorded in, if there is one
+        self.candidates = None  # array of the auto candidate bitsets, None when they are switched off
+        for row in range(self.size):
+            for col in range(self.size):
+                value = puzzle[row][col]
+                self.data[row * self.size + col] = value
+                self.count_value(row, col, value, 1)
+                self.data[self.cell_count + row * self.size + col] = value
+
+    def given(self, row, col):
+        return self.data[row * self.size + col]
+
+    def is_given(self, row, col):
+        return self.data[row * self.size + col] != 0
+
+    def value(self, row, col):
+        return self.data[self.cell_count + row * self.size + col]
+
+    def sketch_value(self, row, col):
+        return self.data[2 * self.cell_count + row * self.size + col]
+
+    def marks(self, row, col):
+        start = 3 * self.cell_count + (row * self.size + col) * self.mark_bytes
+        return int.from_bytes(self.data[start:start + self.mark_bytes], "little")
+
+    ''' for units(self, row, col)
+    Returns the indexes of the row, column and box units that the cell at (row, col) belongs to.
+    '''
+    def units(self, row, col):
+        box = (row // self.box_length) * self.box_length + col // self.box_length
+        return row, self.size + col, 2 * self.size + box
+
+    ''' for count_value(self, row, col, value, change)
+    Adds (change = 1) or removes (change = -1) value at (row, col) from the running counts.
+    '''
+    def count_value(self, row, col, value, change):
+        if value == 0:
+            self.empty_count += change
+            return
+        for unit in self.units(row, col):
+            index = self.counts_start + unit * (self.size + 1) + value
+            before = self.data[index]
+            self.data[index] = before + change
+            if change > 0 and before == 1:
+                self.duplicate_count += 1
+            elif change < 0 and before == 2:
+                self.duplicate_count -= 1
+            if self.candidates is not None and (before == 0 or before + change == 0):
+                self.update_candidates(unit, value)
+
+    ''' for set_value(self, row, col, value)
+    Changes the value of the cell at (row, col) and updates the running counts.
+    '''
+    def set_value(self, row, col, value):
+        index = self.cell_count + row * self.size + col
+        old = self.data[index]
+        if old == value:
+            return
+        self.count_value(row, col, old, -1)
+        self.count_value(row, col, value, 1)
+        self.data[index] = value
+        if self.history is not None:
+            self.history.add(index, old, value)
+
+    ''' for update_candidates(self, unit, value)
+    value was just added to the unit for the first time, or its last one was removed from it,
+    so work out again whether value is a candidate in each cell of the unit.
+    '''
+    def update_candidates(self, unit, value):
+        size, counts, candidates = self.size, self.data, self.candidates
+        units = get_unit_tables(size)[0]
+        bit = 1 << value
+        for cell in units[unit]:
+            free = True
+            for cell_unit in self.units(cell // size, cell % size):
+                if counts[self.counts_start + cell_unit * (size + 1) + value]:
+                    free = False
+                    break
+            if free:
+                candidates[cell] |= bit
+            else:
+                candidates[cell] &= ~bit
+
+    ''' for show_candidates(self, on)
+    Switches the auto candidates on (worked out for every cell once, then kept up to date) or off.
+    '''
+    def show_candidates(self, on):
+        if not on:
+            self.candidates = None
+            return
+        size = self.size
+        full = (1 << (size + 1)) - 2
+        self.candidates = array("I", bytes(4 * self.cell_count))
+        for cell in range(self.cell_count):
+            used = 0
+            for unit in self.units(cell // size, cell % size):
+                start = self.counts_start + unit * (size + 1)
+                for value in range(1, size + 1):
+                    if self.data[start + value]:
+                        used |= 1 << value
+            self.candidates[cell] = full & ~used
+
+    def set_sketch(self, row, col, value):
+        index = 2 * self.cell_count + row * self.size + col
+        old = self.data[index]
+        if old == value:
+            return
+        self.data[index] = value
+        if self.history is not None:
+            self.history.add(index, old, value)
+
+    ''' for set_marks(self, row, col, marks)
+    Sets the pencil marks of a cell (a bitset, bit num set = num is marked).
+    '''
+    def set_marks(self, row, col, marks):
+        start = 3 * self.cell_count + (row * self.size + col) * self.mark_bytes
+        for offset, byte in enumerate(marks.to_bytes(self.mark_bytes, "little"), start):
+            old = self.data[offset]
+            if old != byte:
+                self.data[offset] = byte
+                if self.history is not None:
+                    self.history.add(offset, old, byte)
+
+    ''' for toggle_mark(self, value, row, col)
+    Marks value in a cell or takes the mark away if it was there. Returns True if value is marked now.
+    '''
+    def toggle_mark(self, value, row, col):
+        if self.is_given(row, col):
+            return False
+        marks = self.marks(row, col) ^ (1 << int(value))
+        self.set_marks(row, col, marks)
+        return bool(marks >> int(value) & 1)
+
+    ''' for place_number(self, value, row, col)
+    Puts the player's number in a cell (givens can't be changed).
+    '''
+    def place_number(self, value, row, col):
+        if not self.is_given(row, col):
+            self.set_value(row, col, int(value))
+
+    ''' for sketch(self, value, row, col)
+    Sets the sketched number of a cell (0 or None for no sketch).
+    '''
+    def sketch(self, value, row, col):
+        if not self.is_given(row, col):
+            self.set_sketch(row, col, int(value) if value else 0)
+
+    ''' for clear(self, row, col)
+    Removes the player's number and sketch from a cell (givens can't be cleared).
+    '''
+    def clear(self, row, col):
+        if not self.is_given(row, col):
+            self.set_value(row, col, 0)
+            self.set_sketch(row, col, 0)
+
+    ''' for reset_to_original(self)
+    Clears every number, sketch and pencil mark the player entered.
+    '''
+    def reset_to_original(self):
+        for row in range(self.size):
+            for col in range(self.size):
+                self.clear(row, col)
+                self.set_marks(row, col, 0)
+
+    def is_full(self):
+        return self.empty_count == 0
+
+    ''' for check_board(self)
+    The board is solved when it is full and no number repeats in any row, column or box.
+    '''
+    def check_board(self):
+        return self.empty_count == 0 and self.duplicate_count == 0
+
+    ''' for conflicts(self)
+    Returns a set of (row, col) for every cell whose value is repeated in its row, column or box.
+    Only the units that have a repeat get looked at.
+    '''
+    def conflicts(self):
+        cells = set()
+        if self.duplicate_count == 0:
+            return cells
+        size, counts_start = self.size, self.counts_start
+        for unit in range(3 * size):
+            for value in range(1, size + 1):
+                if self.data[counts_start + unit * (size + 1) + value] < 2:
+                    continue
+                if unit < size:
+                    positions = [(unit, col) for col in range(size)]
+                elif unit < 2 * size:
+                    positions = [(row, unit - size) for row in range(size)]
+                else:
+                    box = unit - 2 * size
+                    row_start = box // self.box_length * self.box_length
+                    col_start = box % self.box_length * self.box_length
+                    positions = [(row_start + i, col_start + j)
+                                 for i in range(self.box_length) for j in range(self.box_length)]
+                cells.update((row, col) for row, col in positions if self.value(row, col) == value)
+        return cells
+
+    ''' for find_empty(self)
+    Returns (row, col) of the first empty cell, or None if the board is full.
+    '''
+    def find_empty(self):
+        if self.empty_count == 0:
+            return None
+        index = self.data.index(0, self.cell_count, 2 * self.cell_count) - self.cell_count
+        return index // self.size, index % self.size
+
+    def current_values(self):
+        start, size = self.cell_count, self.size
+        return [list(self.data[start + row * size:start + (row + 1) * size]) for row in range(size)]
+
+    def original_values(self):
+        size = self.size
+        return [list(self.data[row * size:(row + 1) * size]) for row in range(size)]
+
+
+class UndoLog:
+    '''
+    Undo and redo for a BoardModel, as a ring buffer of the changes made to it
+    Every change is one entry (offset into model.data, old byte, new byte) packed into a single int,
+    so the log takes 4 bytes per change and never more than cap changes, however long the game goes.
+    Changes are grouped into moves with begin_move(), undo() and redo() go one move at a time.
+
+    Parameters:
+    model is the BoardModel to record (the log attaches itself as model.history)
+    cap is how many changes to keep, the oldest moves are forgotten after that
+    '''
+    __slots__ = ("model", "entries", "cap", "start", "count", "position", "new_move", "complete")
+
+    MOVE_START = 1 << 31  # set on the first change of every move
+
+    def __init__(self, model, cap=UNDO_CAP):
+        self.model = model
+        self.entries = array("I", bytes(4 * cap))
+        self.cap = cap
+        self.start = 0  # where the oldest change is in entries
+        self.count = 0  # changes in the log
+        self.position = 0  # changes that are applied, the ones after it can be redone
+        self.new_move = True
+        # True while undoing everything in the log gets back to the original board
+        cells = model.cell_count
+        self.complete = (model.data[cells:2 * cells] == model.data[:cells]
+                         and not any(model.data[2 * cells:model.counts_start]))
+        model.history = self
+
+    def begin_move(self):
+        self.new_move = True
+
+    ''' for add(self, offset, old, new)
+    Records a change of model.data[offset] from old to new (called by the model).
+    Anything that could be redone is dropped, and so is the oldest move if the log is full.
+    '''
+    def add(self, offset, old, new):
+        self.count = self.position
+        if self.count == self.cap:
+            self.complete = False
+            self.forget_oldest()
+        entry = offset << 16 | old << 8 | new
+        if self.new_move or self.count == 0:
+            entry |= self.MOVE_START
+            self.new_move = False
+        self.entries[(self.start + self.count) % self.cap] = entry
+        self.count += 1
+        self.position = self.count
+
+    def forget_oldest(self):
+        # drops the oldest move completely, a move that is only half in the log couldn't be undone properly
+        while True:
+            self.start = (self.start + 1) % self.cap
+            self.count -= 1
+            if self.count == 0 or self.entries[self.start] & self.MOVE_START:
+                break
+        self.position = self.count
+
+    ''' for undo(self)
+    Undoes the last move. Returns the (row, col) of the cells that changed (empty if there was nothing to undo).
+    '''
+    def undo(self):
+        changed = []
+        while self.position:
+            self.position -= 1
+            entry = self.entries[(self.start + self.position) % self.cap]
+            changed.append(self.apply(entry >> 16 & 0x7FFF, entry >> 8 & 0xFF))
+            if entry & self.MOVE_START:
+                break
+        return changed
+
+    ''' for redo(self)
+    Redoes the last undone move. Returns the (row, col) of the cells that changed.
+    '''
+    def redo(self):
+        changed = []
+        while self.position < self.count:
+            entry = self.entries[(self.start + self.position) % self.cap]
+            changed.append(self.apply(entry >> 16 & 0x7FFF, entry & 0xFF))
+            self.position += 1
+            if self.position < self.count and self.entries[(self.start + self.position) % self.cap] & self.MOVE_START:
+                break
+        return changed
+
+    ''' for rewind(self)
+    Undoes every move in the log. Returns True if that got back to the original board,
+    False if the log doesn't go back that far (it was full, or the game didn't start from the original board).
+    '''
+    def rewind(self):
+        while self.undo():
+            pass
+        self.new_move = True
+        return self.complete
+
+    def apply(self, offset, value):
+        # sets a byte of model.data through the model (so the counts stay right) without recording it
+        model = self.model
+        cells = model.cell_count
+        if offset < 3 * cells:
+            index = offset % cells
+        else:
+            index = (offset - 3 * cells) // model.mark_bytes
+        row, col = index // model.size, index % model.size
+        model.history = None
+        if offset < 2 * cells:
+            model.set_value(row, col, value)
+        elif offset < 3 * cells:
+            model.set_sketch(row, col, value)
+        else:
+            model.data[offset] = value  # a byte of the pencil marks
+        model.history = self
+        return row, col
+
+
+class CellView:
+    '''
+    One cell of a BoardModel, read and written straight through to the model (it holds no state of its own)
+    value and sketched_value work like the old Cell attributes: sketched_value is a string like "5" or None.
+
+    Parameters:
+    model is the BoardModel
+    row and col are the position of the cell
+    '''
+    __slots__ = ("model", "row", "col")
+
+    def __init__(self, model, row, col):
+        self.model = model
+        self.row = row
+        self.col = col
+
+    @property
+    def value(self):
+        return self.model.value(self.row, self.col)
+
+    @value.setter
+    def value(self, value):
+        self.model.set_value(self.row, self.col, value)
+
+    @property
+    def sketched_value(self):
+        sketch = self.model.sketch_value(self.row, self.col)
+        return str(sketch) if sketch else None
+
+    @sketched_value.setter
+    def sketched_value(self, value):
+        self.model.set_sketch(self.row, self.col, int(value) if value else 0)
+
+    @property
+    def given(self):
+        return self.model.is_given(self.row, self.col)
+
+    def set_cell_value(self, value): # cell's value
+        self.value = value
+
+    def set_sketched_value(self, value): # cell's sketched value
+        self.sketched_value = value
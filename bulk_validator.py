@@ -0,0 +1,82 @@
+# Checks big batches of solved grids at once with numpy (e.g. submitted solutions or a whole puzzle bank).
+# Same rule as Board.check_board: a grid is solved when every row, column and box has each number exactly once.
+#
+# Every cell becomes the bitmask 1 << value, and the masks of a unit are ORed together; the unit is fine
+# exactly when that comes out as full = (1 << (size + 1)) - 2, the same full mask SudokuGenerator uses.
+# 0, numbers above size and repeats all leave a bit of full missing or set one that shouldn't be.
+# The grids are worked on in chunks, transposed so cell k of every grid in the chunk sits next to each
+# other in memory, which turns each unit into a handful of ORs over long contiguous arrays.
+#
+# numpy is optional for the game, it is only needed here.
+
+try:
+    import numpy as np
+except ImportError:  # the rest of the game works without numpy
+    np = None
+
+CHUNK = 4096  # grids per chunk, small enough that a chunk's masks stay in cache
+
+
+'''
+Checks a batch of solved grids
+
+Parameters:
+grids is an (N, size, size) array of ints (or anything np.asarray turns into one), size 9, 16 or 25
+chunk is how many grids are checked at a time
+
+Return: (valid, first_bad) - valid is an (N,) bool array, True for the grids that are solved,
+first_bad is an (N,) int8 array with the first unit that is wrong in each grid, -1 if none is.
+Units are numbered like BoardModel.units: 0 to size-1 are the rows, then the columns, then the boxes
+(0-8, 9-17 and 18-26 on a 9x9 board).
+'''
+
+def validate_grids(grids, chunk=CHUNK):
+    if np is None:
+        raise ImportError("validate_grids needs numpy (pip install numpy)")
+    grids = np.asarray(grids)
+    if grids.ndim != 3 or grids.shape[1] != grids.shape[2]:
+        raise ValueError(f"expected an (N, size, size) array, got shape {grids.shape}")
+    count, size = grids.shape[0], grids.shape[1]
+    box_length = int(size ** 0.5)
+    if box_length * box_length != size:
+        raise ValueError(f"size {size} is not a square number")
+    if grids.dtype != np.uint8:
+        # anything outside 0-255 is wrong anyway, clipping keeps it wrong and makes the shift safe
+        grids = np.clip(grids, 0, 255).astype(np.uint8)
+    one = np.uint16(1) if size < 16 else np.uint32(1)  # shifts past the width come out as 0
+    full = (1 << (size + 1)) - 2
+
+    flat = grids.reshape(count, size * size)
+    first_bad = np.empty(count, np.int8)
+    units = np.empty((3 * size, min(chunk, count)), one.dtype)
+    for start in range(0, count, chunk):
+        part = flat[start:start + chunk]
+        n = len(part)
+        # masks[row, col] is the row of cell (row, col)'s masks for every grid in the chunk
+        masks = np.left_shift(one, part.T).reshape(size, size, n)
+        unit_masks = units[:, :n]
+
+        rows = unit_masks[:size]
+        np.bitwise_or(masks[:, 0], masks[:, 1], out=rows)
+        for col in range(2, size):
+            rows |= masks[:, col]
+
+        cols = unit_masks[size:2 * size]
+        np.bitwise_or(masks[0], masks[1], out=cols)
+        for row in range(2, size):
+            cols |= masks[row]
+
+        # boxes[band, stack] ORs the cells at (band * box_length + i, stack * box_length + j)
+        in_boxes = masks.reshape(box_length, box_length, box_length, box_length, n)
+        boxes = unit_masks[2 * size:].reshape(box_length, box_length, n)
+        np.bitwise_or(in_boxes[:, 0, :, 0], in_boxes[:, 0, :, 1], out=boxes)
+        for i in range(box_length):
+            for j in range(box_length):
+                if i or j > 1:
+                    boxes |= in_boxes[:, i, :, j]
+
+        bad = unit_masks != full
+        first = bad.argmax(axis=0).astype(np.int8)
+        first[~bad.any(axis=0)] = -1
+        first_bad[start:start + n] = first
+    return first_bad == -1, first_bad
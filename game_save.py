@@ -0,0 +1,243 @@
+# Saving the game in progress so it can be picked up again after the window is closed.
+#
+# A save is a snapshot of the board plus a journal of the moves made since the snapshot:
+#   snapshot "sudoku.save" (all numbers little endian):
+#       header - magic b"FSSV", version (1 byte), board size (1 byte), selected row and col (1 byte each,
+#                255 = nothing selected), generation (4 bytes)
+#       givens, values, sketches - one byte per cell each, then the pencil marks, straight out of the BoardModel
+#   journal "sudoku.save.<generation>" - fixed size records: op, row, col, value (1 byte each)
+#
+# A move only appends one 4 byte record to the journal (the records of a frame go out in a single write).
+# Every COMPACT_EVERY moves a new snapshot is written by a background thread and the journal starts over:
+# the generation goes up, new moves go to the journal of the new generation, and the older journals
+# are deleted once the new snapshot is in place. Loading replays every journal from the snapshot's
+# generation on, so a save is never lost whatever point the compaction got to.
+
+import os, struct, threading
+from board_model import BoardModel
+
+SAVE_FILE = "sudoku.save"
+MAGIC = b"FSSV"
+VERSION = 2
+HEADER = struct.Struct("<4sBBBBI")
+RECORD = struct.Struct("<BBBB")
+NO_SELECTION = 255
+COMPACT_EVERY = 64  # journal records before a new snapshot is written
+
+# journal ops (MARK and UNMARK put a pencil mark for value in or take it out, CLEAR_MARKS takes them all out)
+PLACE, SKETCH, CLEAR, RESET, MARK, UNMARK, CLEAR_MARKS = 1, 2, 3, 4, 5, 6, 7
+
+
+'''
+Writes a snapshot file (through a temporary file, so a half written snapshot never replaces a good one)
+'''
+
+def write_snapshot(path, size, row, col, generation, cells):
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, VERSION, size, row, col, generation))
+        file.write(cells)
+    os.replace(temp_path, path)
+
+
+'''
+Applies journal records to a model, returns the (row, col) of the last move or None if there were none
+A record cut short at the end of the journal (the game was killed mid-write) is left out.
+'''
+
+def replay(model, journal):
+    last = None
+    for start in range(0, len(journal) - RECORD.size + 1, RECORD.size):
+        op, row, col, value = RECORD.unpack_from(journal, start)
+        if op == RESET:
+            model.reset_to_original()
+            continue
+        if row >= model.size or col >= model.size:
+            continue
+        if op == PLACE:
+            model.place_number(value, row, col)
+        elif op == SKETCH:
+            model.sketch(value, row, col)
+        elif op == CLEAR:
+            model.clear(row, col)
+        elif op in (MARK, UNMARK):
+            if bool(model.marks(row, col) >> value & 1) != (op == MARK):
+                model.toggle_mark(value, row, col)
+        elif op == CLEAR_MARKS:
+            model.set_marks(row, col, 0)
+        last = (row, col)
+    return last
+
+
+class GameSave:
+    '''
+    The save of the game in progress
+
+    Parameters:
+    path is the snapshot file, the journals are next to it
+    '''
+    def __init__(self, path=SAVE_FILE):
+        self.path = path
+        self.model = None  # the board being saved, None when there is no game
+        self.generation = 0
+        self.journal = None  # file the moves are appended to
+        self.pending = bytearray()  # records not written yet, they go out together in flush()
+        self.records = 0  # records in the current journal
+        self.row = self.col = NO_SELECTION
+        self.compacting = None  # background thread writing a snapshot
+
+    def journal_path(self, generation):
+        return f"{self.path}.{generation}"
+
+    ''' for journals(self)
+    Returns the generations of the journal files next to the snapshot, oldest first.
+    '''
+    def journals(self):
+        folder, name = os.path.split(os.path.abspath(self.path))
+        generations = []
+        for file_name in os.listdir(folder):
+            suffix = file_name[len(name) + 1:]
+            if file_name.startswith(name + ".") and suffix.isdigit():
+                generations.append(int(suffix))
+        return sorted(generations)
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    ''' for start(self, model, row=None, col=None)
+    Starts saving a new game: writes its snapshot straight away and throws away the old save.
+    '''
+    def start(self, model, row=None, col=None):
+        self.close()
+        self.model = model
+        self.select(row, col)
+        self.generation = max([0] + self.journals()) + 1
+        self.open_journal()
+        write_snapshot(self.path, model.size, self.row, self.col, self.generation, self.cells())
+        self.delete_journals(self.generation)
+
+    ''' for load(self)
+    Loads the save: the snapshot with every journal after it replayed.
+    Returns (model, row, col) - row and col are None if nothing was selected - or None if there is no
+    save or it can't be read. Saving then carries on from the loaded board.
+    '''
+    def load(self):
+        self.close()  # anything still pending belongs in the save being loaded
+        try:
+            with open(self.path, "rb") as file:
+                data = file.read()
+            magic, version, size, row, col, generation = HEADER.unpack_from(data, 0)
+        except (OSError, struct.error):
+            return None
+        cell_count = size * size
+        if magic != MAGIC or version != VERSION or not size or len(data) < HEADER.size + cell_count:
+            return None
+        start = HEADER.size
+        givens = data[start:start + cell_count]
+        model = BoardModel([list(givens[i * size:(i + 1) * size]) for i in range(size)])
+        if len(data) != HEADER.size + model.counts_start:
+            return None
+        for index, value in enumerate(data[start + cell_count:start + 2 * cell_count]):
+            if not givens[index]:
+                model.set_value(index // size, index % size, value)
+        model.data[2 * cell_count:model.counts_start] = data[start + 2 * cell_count:]
+
+        for journal_generation in self.journals():
+            if journal_generation >= generation:
+                with open(self.journal_path(journal_generation), "rb") as file:
+                    last = replay(model, file.read())
+                if last is not None:
+                    row, col = last
+        if row == NO_SELECTION:
+            row = col = None
+        self.start(model, row, col)
+        return model, row, col
+
+    def cells(self):
+        return bytes(self.model.data[:self.model.counts_start])
+
+    def open_journal(self):
+        self.journal = open(self.journal_path(self.generation), "ab", buffering=0)
+        self.records = 0
+
+    def select(self, row, col):
+        if row is None:
+            self.row = self.col = NO_SELECTION
+        else:
+            self.row, self.col = row, col
+
+    ''' for record(self, op, row, col, value=0)
+    Adds a move to the journal. It is only written out by the next flush().
+    '''
+    def record(self, op, row=0, col=0, value=0):
+        if self.model is not None:
+            self.pending += RECORD.pack(op, row, col, value)
+
+    ''' for flush(self)
+    Writes the moves recorded since the last flush in one append, and starts a compaction once
+    the journal has COMPACT_EVERY records. Called once per frame.
+    '''
+    def flush(self):
+        if not self.pending or self.model is None:
+            return
+        self.journal.write(self.pending)
+        self.records += len(self.pending) // RECORD.size
+        self.pending.clear()
+        if self.records >= COMPACT_EVERY and not (self.compacting and self.compacting.is_alive()):
+            self.compact()
+
+    ''' for compact(self)
+    Starts a new journal and writes the snapshot for it in the background.
+    Only copying the cells (a few hundred bytes) happens on the calling thread.
+    '''
+    def compact(self):
+        self.journal.close()
+        self.generation += 1
+        self.open_journal()
+        arguments = (self.path, self.model.size, self.row, self.col, self.generation, self.cells())
+        self.compacting = threading.Thread(target=self.write_compacted, args=arguments, name="save-compaction", daemon=True)
+        self.compacting.start()
+
+    def write_compacted(self, path, size, row, col, generation, cells):
+        write_snapshot(path, size, row, col, generation, cells)
+        self.delete_journals(generation)
+
+    ''' for delete_journals(self, keep_from)
+    Deletes the journals older than generation keep_from (they are in the snapshot now).
+    '''
+    def delete_journals(self, keep_from):
+        for generation in self.journals():
+            if generation < keep_from:
+                try:
+                    os.remove(self.journal_path(generation))
+                except OSError:
+                    pass
+
+    ''' for close(self)
+    Writes out anything pending and stops saving (the save stays on disk to be loaded next time).
+    '''
+    def close(self):
+        self.flush()
+        if self.compacting is not None:
+            self.compacting.join()
+            self.compacting = None
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+        self.model = None
+
+    ''' for discard(self)
+    Stops saving and deletes the save, e.g. when the game is finished.
+    '''
+    def discard(self):
+        self.pending.clear()
+        self.close()
+        for generation in self.journals():
+            try:
+                os.remove(self.journal_path(generation))
+            except OSError:
+                pass
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
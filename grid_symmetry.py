@@ -0,0 +1,329 @@
+# Turning one generated grid into lots of different looking (but equivalent) ones, and telling equivalent ones apart.
+#
+# These moves keep a sudoku a sudoku: relabeling the digits, swapping rows inside a band, swapping whole
+# bands, the same for columns and stacks, and transposing (fill_pattern uses the same moves). A puzzle
+# moved this way keeps its number of solutions and how hard it is, so expanding one puzzle from the
+# generator gives as many new ones as needed without any more backtracking or solving.
+#
+# Grids are passed around flat, as bytes with one cell per byte (row by row), so a move is two
+# itemgetters over the cells and a bytes.translate for the digits.
+#
+# The canonical form picks one grid out of all the equivalent ones, so equivalent puzzles get the same
+# key and a bank can drop the repeats (see dedupe). It needs numpy and works on 9x9 boards.
+
+import random
+from itertools import permutations
+from math import gcd
+from operator import itemgetter
+from sudoku_generator import SudokuGenerator, shuffled_lines
+from bulk_validator import validate_grids, np
+
+POOL_BITS = 8  # expand() keeps up to 2**POOL_BITS row moves, column moves and relabelings
+
+
+'''
+Returns a grid as flat bytes, one cell per byte row by row (bytes are returned as they are)
+
+Parameters:
+grid is a 2D list of ints, or flat bytes/bytearray
+
+Return: bytes
+'''
+
+def flatten(grid):
+    if isinstance(grid, (bytes, bytearray)):
+        return bytes(grid)
+    return bytes(value for row in grid for value in row)
+
+
+'''
+Turns flat bytes back into a size x size 2D list
+'''
+
+def unflatten(flat, size):
+    return [list(flat[row * size:(row + 1) * size]) for row in range(size)]
+
+
+def grid_size(flat):
+    size = int(len(flat) ** 0.5)
+    box_length = int(size ** 0.5)
+    if size * size != len(flat) or box_length * box_length != size:
+        raise ValueError(f"a grid of {len(flat)} cells is not a sudoku")
+    return size
+
+
+'''
+Returns a random move of the columns, as the flat cell each new cell is taken from
+The columns are shuffled the way shuffled_lines does it, and half the time the grid is transposed first.
+
+Parameters:
+size is the number of rows/columns of the board
+rng is the random.Random to use
+
+Return: tuple of ints
+'''
+
+def random_col_move(size, rng):
+    cols = shuffled_lines(int(size ** 0.5), rng)
+    if rng.random() < 0.5:
+        return tuple(col * size + row for row in range(size) for col in cols)
+    return tuple(row * size + col for row in range(size) for col in cols)
+
+
+def random_row_order(size, rng):
+    return tuple(shuffled_lines(int(size ** 0.5), rng))
+
+
+'''
+Returns a random relabeling of the digits as a bytes.translate table (0, an empty cell, stays 0)
+'''
+
+def random_relabel(size, rng):
+    digits = list(range(1, size + 1))
+    rng.shuffle(digits)
+    return bytes([0] + digits + list(range(size + 1, 256)))
+
+
+'''
+Draws up to count different moves with make(size, rng), fewer if there aren't that many different ones
+'''
+
+def draw_moves(make, size, count, rng):
+    moves = {}
+    for attempt in range(count * 4):
+        moves[make(size, rng)] = None
+        if len(moves) == count:
+            break
+    return list(moves)
+
+
+def split_rows(flat, size):
+    return [flat[row * size:(row + 1) * size] for row in range(size)]
+
+
+'''
+Streams grids equivalent to puzzle (and solution, moved the same way)
+A pool of column moves (with or without transposing), row orders and relabelings is drawn up front and
+every item combines one of each. Each column move is done once for a block of items, then every item
+of the block only reorders the rows (joining row slices) and relabels (bytes.translate).
+The row orders and relabelings are walked in a scrambled order that never repeats inside a block, so the
+first len(cols) * len(rows) * len(relabels) items (16.7 million on a 9x9 board with the default pool) all
+come from different moves - after that a new pool is drawn. Different moves give different grids unless
+the grid happens to be symmetric, which random grids almost never are.
+
+Parameters:
+puzzle is a 2D list of ints or flat bytes (a solved grid works too)
+solution is optional - the solution of puzzle, moved along with it
+count is how many to make, None for no end
+rng is optional - a random.Random, so the same seed gives the same stream
+pool_bits is how big the pools are (2**pool_bits of each)
+
+Return: generator of flat bytes, or of (puzzle, solution) pairs of flat bytes if solution was given
+'''
+
+def expand(puzzle, solution=None, count=None, rng=None, pool_bits=POOL_BITS):
+    puzzle = flatten(puzzle)
+    size = grid_size(puzzle)
+    if solution is not None:
+        solution = flatten(solution)
+    rng = rng if rng is not None else random.Random()
+    join = b"".join
+    made = 0
+    while count is None or made < count:
+        pool = 1 << pool_bits
+        col_moves = [itemgetter(*move) for move in draw_moves(random_col_move, size, pool, rng)]
+        rows = [itemgetter(*order) for order in draw_moves(random_row_order, size, pool, rng)]
+        relabels = draw_moves(random_relabel, size, pool, rng)
+        row_count = len(rows)
+        combinations = row_count * len(relabels)  # per column move
+        step = rng.randrange(1, combinations)
+        while gcd(step, combinations) != 1:  # so index below goes through every combination once
+            step = rng.randrange(1, combinations)
+        # spread a short stream over all the column moves instead of using up the first one
+        block = combinations if count is None else min(combinations, -(-(count - made) // len(col_moves)))
+        for col_move in col_moves:
+            lines = split_rows(bytes(col_move(puzzle)), size)
+            if solution is not None:
+                solution_lines = split_rows(bytes(col_move(solution)), size)
+            index = rng.randrange(combinations)
+            for _ in range(block if count is None else min(block, count - made)):
+                index = (index + step) % combinations
+                row_order, table = rows[index % row_count], relabels[index // row_count]
+                if solution is None:
+                    yield join(row_order(lines)).translate(table)
+                else:
+                    yield join(row_order(lines)).translate(table), join(row_order(solution_lines)).translate(table)
+                made += 1
+            if count is not None and made >= count:
+                break
+
+
+'''
+Streams puzzles made by expanding puzzles from SudokuGenerator, only one in every per_base puzzles
+costs a generator run. Like generate_sudoku, 9x9 puzzles have exactly one solution by default.
+
+Parameters:
+count is how many puzzles to make, None for no end
+removed is the number of empty cells in each puzzle
+size is the number of rows/columns of the board
+unique is whether the puzzles have exactly one solution (default: only for 9x9)
+per_base is how many puzzles are made from each generated one
+rng is optional - a random.Random for the generator and the moves
+
+Return: generator of (puzzle, solution) pairs of flat bytes
+'''
+
+def expand_generated(count, removed, size=9, unique=None, per_base=10000, rng=None):
+    rng = rng if rng is not None else random.Random()
+    if unique is None:
+        unique = size == 9
+    made = 0
+    while count is None or made < count:
+        sudoku = SudokuGenerator(size, removed, rng)
+        sudoku.fill_values()
+        solution = flatten(sudoku.board)
+        sudoku.remove(unique)
+        batch = per_base if count is None else min(per_base, count - made)
+        yield from expand(sudoku.board, solution, batch, rng)
+        made += batch
+
+
+# (1296, 9) - every column order that keeps the stacks together, and the position of each column in it
+column_orders = None
+column_positions = None
+column_weights = None  # 10 ** (8 - position): what a digit in that column adds to the row read as a number
+
+
+def load_column_orders():
+    global column_orders, column_positions, column_weights
+    if column_orders is None:
+        if np is None:
+            raise ImportError("the canonical form needs numpy (pip install numpy)")
+        orders = [[stack * 3 + col for stack, inside in zip(stacks, insides) for col in inside]
+                  for stacks in permutations(range(3))
+                  for insides in ((a, b, c) for a in permutations(range(3))
+                                  for b in permutations(range(3)) for c in permutations(range(3)))]
+        column_orders = np.array(orders, np.intp)
+        column_positions = np.argsort(column_orders, axis=1).astype(np.int32)
+        column_weights = (10 ** (8 - column_positions)).astype(np.int32)
+    return column_orders, column_positions, column_weights
+
+
+'''
+Finds the canonical form of a solved 9x9 grid: the smallest (reading the rows one after the other)
+of all the equivalent grids whose digits are numbered in order of first appearance.
+
+Numbering the digits that way makes the top row 1 to 9 whatever the moves were, so picking the top row
+(one of 18: 9 rows, or 9 columns when transposed) and the column order (1296 that keep the stacks
+together) fixes the numbering. Of the rows left, the second one has to come from the top row's band,
+and is worked out for all 18 x 2 x 1296 choices at once with numpy. Only the few choices that give
+the smallest second row are finished: every row left then gets its smallest spot by sorting the rows
+of each band and the bands by their first row.
+
+Parameters:
+grid is a solved 9x9 grid (2D list or flat bytes)
+
+Return: (canonical, moves) - canonical is flat bytes, moves is a list of every
+(transpose, rows, cols, relabel) that turns grid into it (see apply_move), usually just one
+'''
+
+def canonical_moves(grid):
+    orders, positions, weights = load_column_orders()
+    flat = flatten(grid)
+    cells = np.frombuffer(flat, np.uint8).astype(np.intp)
+    if cells.size != 81 or not validate_grids(cells.reshape(1, 9, 9))[0][0]:
+        raise ValueError("the canonical form needs a solved 9x9 grid")
+    grids = np.stack([cells.reshape(9, 9), cells.reshape(9, 9).T])  # (transpose, row, col)
+    where = np.empty((2, 9, 10), np.intp)  # where[t, r, d] is the column of digit d in row r
+    where[np.arange(2)[:, None, None], np.arange(9)[None, :, None], grids] = np.arange(9)
+    # sigma[t, top, r, c] is the column of the top row that has the digit at (r, c)
+    sigma = where[np.arange(2)[:, None, None, None], np.arange(9)[None, :, None, None], grids[:, None]]
+    # the new number of a digit is the new position of its column in the top row, plus 1, so with
+    # column order p the renumbered row (read as a 9 digit number) is the sum over the columns c of
+    # labels[p, sigma[c]] * weights[p, c]
+    labels = positions + 1
+
+    partners = np.array([[row for row in range(top // 3 * 3, top // 3 * 3 + 3) if row != top] for top in range(9)])
+    second = sigma[:, np.arange(9)[:, None], partners].reshape(36, 9)  # the rows that can come second
+    codes = np.einsum("pkc,pc->kp", labels[:, second], weights).reshape(2, 9, 2, len(orders))
+    smallest = codes.min(axis=2)
+    best_key, best_moves = None, []
+    for transpose, top, order in np.argwhere(smallest == smallest.min()):
+        row_codes = (labels[order, sigma[transpose, top]] * weights[order]).sum(axis=1)  # every row
+        band = top // 3
+        first_band = [top] + sorted(partners[top], key=row_codes.__getitem__)
+        other_bands = sorted((sorted(range(b * 3, b * 3 + 3), key=row_codes.__getitem__)
+                              for b in range(3) if b != band), key=lambda rows_in: row_codes[rows_in[0]])
+        row_order = first_band + other_bands[0] + other_bands[1]
+        key = tuple(row_codes[row_order])
+        if best_key is None or key < best_key:
+            best_key, best_moves = key, []
+        if key == best_key:
+            relabel = [0] * 10
+            for digit in range(1, 10):
+                relabel[digit] = int(positions[order, where[transpose, top, digit]]) + 1
+            best_moves.append((bool(transpose), [int(row) for row in row_order],
+                               [int(col) for col in orders[order]], relabel))
+    return apply_move(flat, best_moves[0]), best_moves
+
+
+'''
+Applies a move from canonical_moves to a 9x9 grid (or puzzle)
+
+Parameters:
+grid is a 2D list of ints or flat bytes
+move is (transpose, rows, cols, relabel): transpose the grid first if transpose is True, then new row i is
+old row rows[i], new column j is old column cols[j], and digit d becomes relabel[d] (0 stays 0)
+
+Return: bytes
+'''
+
+def apply_move(grid, move):
+    transpose, rows, cols, relabel = move
+    flat = flatten(grid)
+    size = grid_size(flat)
+    if transpose:
+        cells = [col * size + row for row in rows for col in cols]
+    else:
+        cells = [row * size + col for row in rows for col in cols]
+    table = bytes(relabel + list(range(len(relabel), 256)))
+    return bytes(itemgetter(*cells)(flat)).translate(table)
+
+
+def canonical_grid(grid):
+    return canonical_moves(grid)[0]
+
+
+'''
+Returns the canonical form of a 9x9 puzzle, the same for every puzzle equivalent to it
+It is the smallest of the puzzle moved by each of the moves that take its solution to the solution's
+canonical form (an equivalent puzzle has an equivalent solution, so it ends up with the same moves).
+
+Parameters:
+puzzle is the 9x9 puzzle (2D list or flat bytes, 0 for an empty cell)
+solution is its solution (needed, so a puzzle with more than one solution gets a well defined key)
+
+Return: bytes
+'''
+
+def canonical_puzzle(puzzle, solution):
+    canonical, moves = canonical_moves(solution)
+    return min(apply_move(puzzle, move) for move in moves)
+
+
+'''
+Yields the (puzzle, solution) pairs of puzzles that are not equivalent to one yielded before
+
+Parameters:
+puzzles is an iterable of (puzzle, solution) pairs of 9x9 grids (2D lists or flat bytes)
+
+Return: generator of the pairs that are kept, as they were given
+'''
+
+def dedupe(puzzles):
+    seen = set()
+    for puzzle, solution in puzzles:
+        key = canonical_puzzle(puzzle, solution)
+        if key not in seen:
+            seen.add(key)
+            yield puzzle, solution
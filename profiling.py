@@ -0,0 +1,250 @@
+# Opt-in profiling counters, timing histograms and trace export for the generator and the game loop.
+#
+# Nothing is measured unless a Profiler is switched on: code that can be profiled looks at
+# profiling.active (or a profiler it was given) and does its normal thing when that is None,
+# so leaving profiling off costs an `is None` check per generated board or per frame.
+#
+#   python sudoku.py --profile game        # play, then look at game.json and game.trace.json
+#   python profiling.py --count 200 gen    # generate 200 boards, writes gen.json and gen.trace.json
+#
+# The .json file has the counters and the histograms. The .trace.json file is a Chrome trace
+# (open it in chrome://tracing or https://ui.perfetto.dev) with one span per generation phase,
+# event and frame, on the thread it ran on.
+
+import json, os, threading, time
+from contextlib import nullcontext
+
+MAX_TRACE_EVENTS = 200000  # spans kept for the trace, later ones are only counted in the histograms
+
+active = None  # the Profiler switched on with enable(), None when profiling is off
+
+
+class Histogram:
+    '''
+    Counts durations in power of two buckets of microseconds (bucket i holds durations under 2**i us)
+
+    Parameters: None
+    '''
+    __slots__ = ("buckets", "count", "total", "smallest", "largest")
+
+    def __init__(self):
+        self.buckets = []
+        self.count = 0
+        self.total = 0.0  # seconds
+        self.smallest = None
+        self.largest = 0.0
+
+    def add(self, seconds):
+        bucket = int(seconds * 1000000).bit_length()
+        if bucket >= len(self.buckets):
+            self.buckets.extend([0] * (bucket + 1 - len(self.buckets)))
+        self.buckets[bucket] += 1
+        self.count += 1
+        self.total += seconds
+        if self.smallest is None or seconds < self.smallest:
+            self.smallest = seconds
+        if seconds > self.largest:
+            self.largest = seconds
+
+    ''' for percentile(self, pct)
+    Returns the upper edge of the bucket the pct-th percentile falls in, in microseconds.
+    '''
+    def percentile(self, pct):
+        wanted = max(1, -(-self.count * pct // 100))
+        seen = 0
+        for bucket, count in enumerate(self.buckets):
+            seen += count
+            if seen >= wanted:
+                return 1 << bucket
+        return 0
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "total_ms": round(self.total * 1000, 3),
+            "mean_us": round(self.total * 1000000 / self.count, 1) if self.count else 0,
+            "min_us": round((self.smallest or 0) * 1000000, 1),
+            "max_us": round(self.largest * 1000000, 1),
+            "p50_us": self.percentile(50),
+            "p90_us": self.percentile(90),
+            "p99_us": self.percentile(99),
+            # "<2^i us" -> how many took less than 2**i microseconds (and at least half that)
+            "buckets": {f"<{1 << bucket}us": count for bucket, count in enumerate(self.buckets) if count},
+        }
+
+
+class Profiler:
+    '''
+    Collects counters, duration histograms and trace spans. Safe to use from several threads
+    (the puzzle prefetcher generates on its own thread while the game loop runs).
+
+    Parameters:
+    max_trace_events is how many spans are kept for the Chrome trace
+    '''
+    def __init__(self, max_trace_events=MAX_TRACE_EVENTS):
+        self.lock = threading.Lock()
+        self.start = time.perf_counter()
+        self.counters = {}
+        self.histograms = {}
+        self.trace_events = []
+        self.max_trace_events = max_trace_events
+        self.dropped = 0  # spans that didn't fit in the trace
+
+    def count(self, name, amount=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    ''' for maximum(self, name, value)
+    Keeps the biggest value seen for a counter (e.g. the deepest the search got).
+    '''
+    def maximum(self, name, value):
+        with self.lock:
+            if value > self.counters.get(name, value - 1):
+                self.counters[name] = value
+
+    ''' for record(self, name, start, end, category)
+    Adds a span that ran from start to end (time.perf_counter() values) to the name histogram and the trace.
+    '''
+    def record(self, name, start, end, category="sudoku"):
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.add(end - start)
+            if len(self.trace_events) < self.max_trace_events:
+                self.trace_events.append((name, category, start, end, threading.get_ident()))
+            else:
+                self.dropped += 1
+
+    ''' for span(self, name, category)
+    Context manager that records how long its block took.
+    '''
+    def span(self, name, category="sudoku"):
+        return Span(self, name, category)
+
+    ''' for timed(self, items, name_of, category)
+    Yields the items one by one and records how long the caller spent on each one,
+    under the name name_of(item) - e.g. each event of a frame. Works with continue in the caller's loop.
+    '''
+    def timed(self, items, name_of, category="sudoku"):
+        for item in items:
+            start = time.perf_counter()
+            yield item
+            self.record(name_of(item), start, time.perf_counter(), category)
+
+    def to_dict(self):
+        with self.lock:
+            return {
+                "seconds": round(time.perf_counter() - self.start, 3),
+                "counters": dict(sorted(self.counters.items())),
+                "histograms": {name: histogram.to_dict() for name, histogram in sorted(self.histograms.items())},
+                "trace_events_dropped": self.dropped,
+            }
+
+    ''' for trace(self)
+    Returns the spans in the Chrome trace event format ("X" complete events, times in microseconds).
+    '''
+    def trace(self):
+        with self.lock:
+            spans = list(self.trace_events)
+        pid = os.getpid()
+        threads = {}
+        events = []
+        for name, category, start, end, ident in spans:
+            tid = threads.setdefault(ident, len(threads) + 1)
+            events.append({"name": name, "cat": category, "ph": "X", "pid": pid, "tid": tid,
+                           "ts": round((start - self.start) * 1000000, 3),
+                           "dur": round((end - start) * 1000000, 3)})
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, tid in threads.items():
+            events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid,
+                           "args": {"name": names.get(ident, f"thread {tid}")}})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write_json(self, path):
+        with open(path, "w") as file:
+            json.dump(self.to_dict(), file, indent=2)
+
+    def write_trace(self, path):
+        with open(path, "w") as file:
+            json.dump(self.trace(), file, separators=(",", ":"))
+
+    ''' for write(self, prefix)
+    Writes prefix.json (counters and histograms) and prefix.trace.json (Chrome trace).
+    '''
+    def write(self, prefix):
+        self.write_json(prefix + ".json")
+        self.write_trace(prefix + ".trace.json")
+
+
+class Span:
+    __slots__ = ("profiler", "name", "category", "start")
+
+    def __init__(self, profiler, name, category):
+        self.profiler = profiler
+        self.name = name
+        self.category = category
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.record(self.name, self.start, time.perf_counter(), self.category)
+        return False
+
+
+'''
+Returns profiler.span(name) or, when profiler is None, a context manager that does nothing
+'''
+
+def span(profiler, name, category="sudoku"):
+    if profiler is None:
+        return nullcontext()
+    return profiler.span(name, category)
+
+
+'''
+Switches profiling on for everything that looks at profiling.active, returns the Profiler
+'''
+
+def enable(profiler=None):
+    global active
+    active = profiler if profiler is not None else Profiler()
+    return active
+
+
+def disable():
+    global active
+    profiler, active = active, None
+    return profiler
+
+
+def main(argv=None):
+    import argparse
+    from sudoku_generator import generate_sudoku
+    parser = argparse.ArgumentParser(description="Profile Sudoku generation")
+    parser.add_argument("prefix", help="writes PREFIX.json and PREFIX.trace.json")
+    parser.add_argument("--count", type=int, default=100, help="boards to generate")
+    parser.add_argument("--size", type=int, default=9)
+    parser.add_argument("--removed", type=int, default=40)
+    parser.add_argument("--unique", action="store_true", help="only remove cells while the solution stays unique")
+    args = parser.parse_args(argv)
+
+    import profiling  # run as a script this file is __main__, the generator looks at the imported module
+    profiler = profiling.enable()
+    for _ in range(args.count):
+        with profiler.span("generate_sudoku"):
+            generate_sudoku(args.size, args.removed, unique=args.unique)
+    profiling.disable()
+    profiler.write(args.prefix)
+    for name, value in sorted(profiler.counters.items()):
+        print(f"{name}: {value}")
+    for name, histogram in sorted(profiler.histograms.items()):
+        print(f"{name}: {histogram.count} x mean {histogram.total * 1000000 / histogram.count:.0f}us "
+              f"p50 <{histogram.percentile(50)}us p99 <{histogram.percentile(99)}us")
+
+
+if __name__ == '__main__':
+    import sys
+    main(sys.argv[1:])
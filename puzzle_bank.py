@@ -0,0 +1,204 @@
+# puzzle bank file - a file full of pre-generated puzzles so starting a game never has to wait on the generator
+#
+# File layout (all numbers little endian):
+#   header   - magic b"FSPB", version (1 byte), board size (1 byte), record size (2 bytes), group count (2 bytes)
+#   groups   - one entry per removed-cell count: removed (2 bytes), first record (4 bytes), record count (4 bytes)
+#   records  - fixed size, grouped by removed-cell count:
+#              givens (4 bits per cell), solution (4 bits per cell), removed-cell count (1 byte), padding
+#
+# Because every record is the same size, record i of a group is at a known offset and can be
+# read straight out of the mmap without looking at the rest of the file.
+
+import mmap, random, struct, sys
+from sudoku_generator import generate_sudoku_batch
+
+MAGIC = b"FSPB"
+VERSION = 1
+HEADER = struct.Struct("<4sBBHH")
+GROUP = struct.Struct("<HII")
+
+
+'''
+Packs a 2D list of digits into bytes, two cells per byte (high nibble first)
+
+Parameters:
+grid is a 2D list of ints from 0 to 15
+
+Return: bytes
+'''
+
+def pack_grid(grid):
+    values = [value for row in grid for value in row]
+    if len(values) % 2:
+        values.append(0)
+    return bytes((values[i] << 4) | values[i + 1] for i in range(0, len(values), 2))
+
+
+'''
+Unpacks bytes made by pack_grid back into a size x size 2D list
+
+Parameters:
+data is the packed bytes
+size is the number of rows/columns of the board
+
+Return: list[list]
+'''
+
+def unpack_grid(data, size):
+    values = []
+    for byte in data:
+        values.append(byte >> 4)
+        values.append(byte & 0x0F)
+    return [values[row * size:(row + 1) * size] for row in range(size)]
+
+
+def packed_length(size):
+    return (size * size + 1) // 2
+
+
+def record_length(size):
+    # givens + solution + removed count, padded to an even number of bytes
+    length = 2 * packed_length(size) + 1
+    return length + length % 2
+
+
+class PuzzleBank:
+    '''
+    Read-only view of a puzzle bank file
+    Only the header and group table are read when the bank is opened - the records stay in the
+    mmap and a puzzle is only unpacked when it is asked for.
+
+    Parameters:
+    path is the puzzle bank file to open
+    '''
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, self.size, self.record_size, group_count = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a puzzle bank file")
+
+        # removed count -> (first record, record count)
+        self.groups = {}
+        for i in range(group_count):
+            removed, first, count = GROUP.unpack_from(self.data, HEADER.size + i * GROUP.size)
+            self.groups[removed] = (first, count)
+        self.records_start = HEADER.size + group_count * GROUP.size
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return sum(count for first, count in self.groups.values())
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+    ''' for count(self, removed)
+    Returns how many puzzles in the bank have removed empty cells.
+    '''
+    def count(self, removed):
+        return self.groups.get(removed, (0, 0))[1]
+
+    ''' for get_record(self, number)
+    Returns (board, solution, removed) for record number (counting across the whole file).
+    Raises IndexError for a number outside the bank, the mmap would otherwise hand back whatever is there.
+    '''
+    def get_record(self, number):
+        if not 0 <= number < len(self):
+            raise IndexError(f"record {number} is out of range, the bank has {len(self)} puzzles")
+        offset = self.records_start + number * self.record_size
+        grid_bytes = packed_length(self.size)
+        record = self.data[offset:offset + self.record_size]
+        board = unpack_grid(record[:grid_bytes], self.size)
+        solution = unpack_grid(record[grid_bytes:2 * grid_bytes], self.size)
+        return board, solution, record[2 * grid_bytes]
+
+    ''' for random_puzzle(self, removed)
+    Returns (board, solution) for a random puzzle with removed empty cells,
+    or None if the bank has no puzzles with that many empty cells.
+    '''
+    def random_puzzle(self, removed):
+        first, count = self.groups.get(removed, (0, 0))
+        if count == 0:
+            return None
+        board, solution, removed = self.get_record(first + random.randrange(count))
+        return board, solution
+
+
+'''
+Writes a puzzle bank file
+
+Parameters:
+path is the file to write
+puzzles is an iterable of (board, solution) pairs of 2D lists
+size is the number of rows/columns of the boards (4 bits per cell means at most 15)
+
+Return: int (the number of puzzles written)
+'''
+
+def write_bank(path, puzzles, size=9):
+    if size > 15:
+        raise ValueError("puzzle bank cells are 4 bits, so boards can be at most 15x15")
+
+    groups = {}  # removed count -> bytearray of records
+    padding = bytes(record_length(size) - 2 * packed_length(size) - 1)
+    for board, solution in puzzles:
+        removed = sum(value == 0 for row in board for value in row)
+        records = groups.setdefault(removed, bytearray())
+        records += pack_grid(board) + pack_grid(solution) + bytes((removed,)) + padding
+
+    with open(path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, VERSION, size, record_length(size), len(groups)))
+        first = 0
+        for removed in sorted(groups):
+            count = len(groups[removed]) // record_length(size)
+            file.write(GROUP.pack(removed, first, count))
+            first += count
+        for removed in sorted(groups):
+            file.write(groups[removed])
+    return first
+
+
+'''
+Command line tool to build a puzzle bank with SudokuGenerator, e.g.
+    python puzzle_bank.py puzzles.bank --count 10000 --removed 30 40 50
+builds 10000 unique-solution puzzles for each removed count.
+With --dedupe, puzzles equivalent to one already in the bank (the same puzzle with the digits relabeled,
+rows/columns swapped and so on, see grid_symmetry) are left out, so a count can come out a little short.
+'''
+
+def main(argv=None):
+    import argparse, time
+
+    parser = argparse.ArgumentParser(description="Build a puzzle bank file for the Sudoku game")
+    parser.add_argument("path", help="puzzle bank file to write")
+    parser.add_argument("--count", type=int, default=1000, help="puzzles per removed count")
+    parser.add_argument("--removed", type=int, nargs="+", default=[30, 40, 50], help="removed cell counts")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--seed", type=int, default=0, help="base seed")
+    parser.add_argument("--dedupe", action="store_true", help="leave out puzzles equivalent to earlier ones (needs numpy)")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    puzzles = []
+    for i, removed in enumerate(args.removed):
+        batch = generate_sudoku_batch(args.count, removed, workers=args.workers, seed=f"{args.seed}:{i}", unique=True)
+        puzzles.extend((board, solution) for index, board, solution in sorted(batch))
+    if args.dedupe:
+        from grid_symmetry import dedupe
+        generated = len(puzzles)
+        puzzles = list(dedupe(puzzles))
+        print(f"left out {generated - len(puzzles)} equivalent puzzles")
+    written = write_bank(args.path, puzzles)
+    print(f"wrote {written} puzzles to {args.path} in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,93 @@
+# Background puzzle prefetching - keeps a few ready puzzles for each difficulty so starting a game is
+# just taking one off a queue. A daemon thread refills the queues whenever one drops below its depth,
+# so generating happens while the player is on the welcome screen or in the middle of a game.
+
+import threading
+from collections import deque
+from sudoku_generator import generate_sudoku
+
+
+class PuzzlePrefetcher:
+    '''
+    Keeps depth puzzles ready for every (size, removed) pair it has been asked to prefetch
+    (the keys, and pairs added later with want). Any other pair is generated when it is asked for
+    and never queued, so callers that pass through whatever they are sent (e.g. the session server)
+    can't make the queues or the background work grow.
+
+    Parameters:
+    keys is a list of (size, removed) pairs to start prefetching straight away
+    depth is how many ready puzzles to keep per pair
+    bank is an optional PuzzleBank - pairs it has puzzles for are served from it and never generated
+    '''
+    def __init__(self, keys=(), depth=2, bank=None):
+        self.depth = depth
+        self.bank = bank
+        self.queues = {}  # (size, removed) -> deque of ready boards
+        self.condition = threading.Condition()
+        self.stopped = False
+        for size, removed in keys:
+            self.want(size, removed)
+        self.thread = threading.Thread(target=self.run, name="puzzle-prefetcher", daemon=True)
+        self.thread.start()
+
+    ''' for want(self, size, removed)
+    Starts prefetching puzzles for this size and removed count (does nothing if it already is).
+    '''
+    def want(self, size, removed):
+        with self.condition:
+            if (size, removed) not in self.queues and not self.in_bank(size, removed):
+                self.queues[(size, removed)] = deque()
+                self.condition.notify()
+
+    def in_bank(self, size, removed):
+        return self.bank is not None and self.bank.size == size and self.bank.count(removed) > 0
+
+    ''' for get(self, size, removed)
+    Returns a puzzle (2D list) for this size and removed count.
+    Takes a ready one if there is one, otherwise generates it right here.
+    '''
+    def get(self, size, removed):
+        if self.in_bank(size, removed):
+            return self.bank.random_puzzle(removed)[0]
+        with self.condition:
+            queue = self.queues.get((size, removed))
+            board = queue.popleft() if queue else None
+            if queue is not None:
+                self.condition.notify()  # a queue just got shorter
+        if board is None:
+            board = self.generate(size, removed)
+        return board
+
+    ''' for ready(self, size, removed)
+    Returns how many puzzles are waiting for this size and removed count.
+    '''
+    def ready(self, size, removed):
+        with self.condition:
+            return len(self.queues.get((size, removed), ()))
+
+    def generate(self, size, removed):
+        # same as Board: unique puzzles on 9x9 only (see generate_sudoku)
+        return generate_sudoku(size, removed, unique=size == 9)
+
+    def close(self):
+        with self.condition:
+            self.stopped = True
+            self.condition.notify()
+
+    ''' for run(self)
+    The background thread: waits until some queue is below depth, then generates for the emptiest one.
+    '''
+    def run(self):
+        while True:
+            with self.condition:
+                while not self.stopped and not self.hungry():
+                    self.condition.wait()
+                if self.stopped:
+                    return
+                key = min(self.queues, key=lambda key: len(self.queues[key]))
+            board = self.generate(*key)  # outside the lock so get() never waits on generation
+            with self.condition:
+                self.queues[key].append(board)
+
+    def hungry(self):
+        return any(len(queue) < self.depth for queue in self.queues.values())
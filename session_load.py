@@ -0,0 +1,117 @@
+# Load generator for session_server.py - opens many connections, starts many games on them and plays
+# random moves, then reports how long the server took to answer (round trip, measured here).
+#
+#   python session_server.py --port 8765 &
+#   python session_load.py --port 8765 --connections 50 --sessions 2000 --moves 20000
+
+import asyncio, json, random, sys, time
+
+
+def percentile(ordered, pct):
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class Client:
+    '''
+    One connection to the server, sends a request and waits for its reply
+    '''
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    async def request(self, **request):
+        self.writer.write(json.dumps(request, separators=(",", ":")).encode() + b"\n")
+        await self.writer.drain()
+        reply = json.loads(await self.reader.readline())
+        if not reply["ok"]:
+            raise RuntimeError(reply["error"])
+        return reply
+
+    def close(self):
+        self.writer.close()
+
+
+async def connect(host, port, unix):
+    if unix is not None:
+        reader, writer = await asyncio.open_unix_connection(unix)
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+    return Client(reader, writer)
+
+
+''' for play(client, games, moves, latencies, rng)
+Plays moves random moves spread over the games ((session id, board) pairs) on one connection,
+appending the round trip time of each request in microseconds to latencies.
+'''
+async def play(client, games, moves, latencies, rng):
+    for _ in range(moves):
+        session, board = rng.choice(games)
+        size = len(board)
+        row, col = rng.randrange(size), rng.randrange(size)
+        start = time.perf_counter_ns()
+        await client.request(op="select", session=session, row=row, col=col)
+        latencies.append((time.perf_counter_ns() - start) / 1000)
+        if board[row][col]:
+            continue  # a given, nothing to do there
+        op = rng.choice(("sketch", "place", "place", "clear", "check"))
+        start = time.perf_counter_ns()
+        if op in ("sketch", "place"):
+            await client.request(op=op, session=session, value=rng.randint(1, size))
+        else:
+            await client.request(op=op, session=session)
+        latencies.append((time.perf_counter_ns() - start) / 1000)
+
+
+async def run(args):
+    rng = random.Random(args.seed)
+    clients = [await connect(args.host, args.port, args.unix) for _ in range(args.connections)]
+
+    # start the games, spread over the connections
+    start = time.perf_counter()
+    games = [[] for _ in clients]
+    per_client = [args.sessions // len(clients) + (i < args.sessions % len(clients)) for i in range(len(clients))]
+
+    async def start_games(client, count, mine):
+        for _ in range(count):
+            reply = await client.request(op="new", difficulty=args.difficulty)
+            mine.append((reply["session"], reply["board"]))
+
+    await asyncio.gather(*(start_games(client, count, mine) for client, count, mine in zip(clients, per_client, games)))
+    new_seconds = time.perf_counter() - start
+    print(f"started {args.sessions} sessions in {new_seconds:.2f}s ({args.sessions / new_seconds:.0f}/s)")
+
+    # play
+    latencies = []
+    moves = [args.moves // len(clients) + (i < args.moves % len(clients)) for i in range(len(clients))]
+    start = time.perf_counter()
+    await asyncio.gather(*(play(client, mine, count, latencies, random.Random(rng.random()))
+                           for client, mine, count in zip(clients, games, moves) if mine))
+    seconds = time.perf_counter() - start
+    for client in clients:
+        client.close()
+
+    latencies.sort()
+    print(f"{len(latencies)} requests in {seconds:.2f}s ({len(latencies) / seconds:.0f}/s) "
+          f"over {args.connections} connections")
+    print(f"round trip us: p50 {percentile(latencies, 50):.0f} p90 {percentile(latencies, 90):.0f} "
+          f"p99 {percentile(latencies, 99):.0f} max {latencies[-1]:.0f}")
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Load generator for the Sudoku session server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", help="connect to this Unix socket path instead of TCP")
+    parser.add_argument("--connections", type=int, default=50)
+    parser.add_argument("--sessions", type=int, default=1000, help="games to start, spread over the connections")
+    parser.add_argument("--moves", type=int, default=10000, help="random moves to play in total")
+    parser.add_argument("--difficulty", type=int, default=40)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
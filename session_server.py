@@ -0,0 +1,302 @@
+# Headless game server - hosts many games at once, one BoardModel per session, no pygame needed.
+# Clients talk JSON lines over a local TCP or Unix socket: one request object per line, one reply per line.
+#
+#   python session_server.py --port 8765              # TCP on 127.0.0.1:8765
+#   python session_server.py --unix /tmp/sudoku.sock  # Unix socket
+#
+# Requests (every one except "new" needs "session"):
+#   {"op": "new", "difficulty": 40, "size": 9}         -> {"ok": true, "session": "...", "board": [[...], ...]}
+#   {"op": "new", "id": "28CG0003NQK8NK"}              -> the puzzle with that ID (see make_puzzle_id), same reply
+#                                                         plus "id"; "id": "new" makes a fresh ID from size/difficulty
+#   {"op": "select", "session": "...", "row": 0, "col": 3}
+#   {"op": "sketch", "session": "...", "value": 5}     -> sketches in the selected cell
+#   {"op": "place", "session": "...", "value": 5}      -> places in the selected cell (no value = the sketched one)
+#   {"op": "clear", "session": "..."}                  -> clears the selected cell
+#   {"op": "reset", "session": "..."}                  -> back to the original board
+#   {"op": "check", "session": "..."}                  -> {"ok": true, "full": .., "solved": .., "conflicts": [[row, col], ...]}
+#   {"op": "end", "session": "..."}
+# Anything that goes wrong is answered with {"ok": false, "error": "..."} and the connection stays open
+# (except for a line too long to read, which is answered and then the connection is closed).
+# Sizes are 9, 16 or 25 and difficulty (removed cells) goes up to MAX_REMOVED for the size. Puzzles by
+# ID follow the same limits, and only 9x9 ones can be unique (see generate_sudoku).
+# Sessions nobody has touched for --idle seconds are dropped.
+# The moves follow the same rules as the game: givens can't be changed, and sketching or placing
+# replaces whatever was in the cell before.
+
+import asyncio, json, os, secrets, sys, time
+from board_model import BoardModel
+from puzzle_bank import PuzzleBank
+from puzzle_prefetcher import PuzzlePrefetcher
+from sudoku_generator import make_puzzle_id, parse_puzzle_id, generate_from_id
+
+PUZZLE_BANK_FILE = "puzzles.bank"  # same optional bank the game uses
+IDLE_TIMEOUT = 600  # seconds a session can go untouched before it is dropped
+# size -> most cells a client can ask to remove: 17 givens on 9x9 (the fewest a unique puzzle can have),
+# scaled to the bigger boards the way the game scales its difficulties
+MAX_REMOVED = {size: 64 * size * size // 81 for size in (9, 16, 25)}
+
+
+class GameError(Exception):
+    pass
+
+
+class Session:
+    '''
+    One game: the board plus the selected cell
+
+    Parameters:
+    model is the BoardModel of the game
+    '''
+    __slots__ = ("model", "row", "col", "last_active")
+
+    def __init__(self, model):
+        self.model = model
+        self.row = None  # nothing selected yet
+        self.col = None
+        self.last_active = time.monotonic()
+
+    def selected(self):
+        if self.row is None:
+            raise GameError("no cell selected")
+        return self.row, self.col
+
+
+class SessionServer:
+    '''
+    Keeps the sessions and answers requests for them
+
+    Parameters:
+    prefetcher is the PuzzlePrefetcher new games come from
+    idle_timeout is how many seconds a session can go untouched before it is dropped
+    '''
+    def __init__(self, prefetcher, idle_timeout=IDLE_TIMEOUT):
+        self.prefetcher = prefetcher
+        self.idle_timeout = idle_timeout
+        self.sessions = {}  # session id -> Session
+        self.operations = {
+            "select": self.select,
+            "sketch": self.sketch,
+            "place": self.place,
+            "clear": self.clear,
+            "reset": self.reset,
+            "check": self.check,
+            "end": self.end,
+        }
+
+    ''' for new_game(self, request)
+    Starts a session. Getting the puzzle can mean generating one, so it runs off the event loop
+    and the other sessions keep being answered in the meantime.
+    '''
+    async def new_game(self, request):
+        size = self.integer(request.get("size", 9), "size")
+        difficulty = self.integer(request.get("difficulty", 40), "difficulty")
+        self.check_puzzle(size, difficulty)
+        loop = asyncio.get_running_loop()
+        puzzle_id = request.get("id")
+        if puzzle_id is None:
+            puzzle = await loop.run_in_executor(None, self.prefetcher.get, size, difficulty)
+        else:
+            if puzzle_id == "new":
+                puzzle_id = make_puzzle_id(None, size, difficulty, unique=size == 9)
+            try:
+                params = parse_puzzle_id(str(puzzle_id))
+            except ValueError as error:
+                raise GameError(str(error))
+            self.check_puzzle(params["size"], params["removed"], params["unique"])
+            puzzle, solution = await loop.run_in_executor(None, generate_from_id, str(puzzle_id))
+        session_id = secrets.token_hex(8)
+        self.sessions[session_id] = Session(BoardModel(puzzle))
+        reply = {"session": session_id, "board": puzzle}
+        if puzzle_id is not None:
+            reply["id"] = puzzle_id
+        return reply
+
+    ''' for check_puzzle(self, size, removed, unique)
+    Raises GameError unless the server makes puzzles like this: the size is 9, 16 or 25, removed is
+    at most MAX_REMOVED for the size, and unique puzzles are 9x9 (see generate_sudoku).
+    '''
+    def check_puzzle(self, size, removed, unique=False):
+        if size not in MAX_REMOVED:
+            raise GameError("size must be 9, 16 or 25")
+        if not 0 <= removed <= MAX_REMOVED[size]:
+            raise GameError(f"difficulty must be from 0 to {MAX_REMOVED[size]} for size {size}")
+        if unique and size != 9:
+            raise GameError("only 9x9 puzzles can be unique")
+
+    def select(self, session, request):
+        size = session.model.size
+        row, col = self.integer(request["row"], "row"), self.integer(request["col"], "col")
+        if not (0 <= row < size and 0 <= col < size):
+            raise GameError("cell is off the board")
+        session.row, session.col = row, col
+        return {}
+
+    def editable(self, session):
+        row, col = session.selected()
+        if session.model.is_given(row, col):
+            raise GameError("cell is given")
+        return row, col
+
+    ''' for integer(self, value, name)
+    Returns a request field as an int. JSON numbers can be 1.5 or 1e400 (inf), those are a GameError.
+    '''
+    def integer(self, value, name):
+        if isinstance(value, float) and not value.is_integer():
+            raise GameError(f"{name} must be a whole number")
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            raise GameError(f"{name} must be a whole number")
+
+    def number(self, session, value):
+        value = self.integer(value, "value")
+        if not 1 <= value <= session.model.size:
+            raise GameError("bad value")
+        return value
+
+    def sketch(self, session, request):
+        row, col = self.editable(session)
+        value = self.number(session, request["value"])
+        session.model.clear(row, col)
+        session.model.set_sketch(row, col, value)
+        return {}
+
+    def place(self, session, request):
+        row, col = self.editable(session)
+        model = session.model
+        value = request.get("value") or model.sketch_value(row, col)
+        if not value:
+            raise GameError("nothing to place")
+        value = self.number(session, value)
+        model.clear(row, col)
+        model.set_value(row, col, value)
+        return {"full": model.is_full()}
+
+    def clear(self, session, request):
+        row, col = self.editable(session)
+        session.model.clear(row, col)
+        return {}
+
+    def reset(self, session, request):
+        session.model.reset_to_original()
+        return {}
+
+    def check(self, session, request):
+        model = session.model
+        return {
+            "full": model.is_full(),
+            "solved": model.check_board(),
+            "conflicts": sorted(model.conflicts()),
+        }
+
+    def end(self, session, request):
+        self.sessions.pop(request["session"], None)
+        return {}
+
+    ''' for handle(self, request)
+    Answers one request (a dict), returns the reply dict.
+    '''
+    async def handle(self, request):
+        try:
+            op = request.get("op")
+            if op == "new":
+                reply = await self.new_game(request)
+            elif op in self.operations:
+                session = self.sessions.get(request.get("session"))
+                if session is None:
+                    raise GameError("unknown session")
+                session.last_active = time.monotonic()
+                reply = self.operations[op](session, request)
+            else:
+                raise GameError(f"unknown op {op!r}")
+        except GameError as error:
+            return {"ok": False, "error": str(error)}
+        except (KeyError, TypeError, ValueError, OverflowError) as error:
+            return {"ok": False, "error": f"bad request: {error}"}
+        reply["ok"] = True
+        return reply
+
+    ''' for serve_client(self, reader, writer)
+    Reads request lines from one connection until it closes. Replies go out in request order.
+    '''
+    async def serve_client(self, reader, writer):
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:  # longer than the reader's limit, there is no telling where the next request starts
+                    writer.write(json.dumps({"ok": False, "error": "request line too long"}).encode() + b"\n")
+                    await writer.drain()
+                    break
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError("request must be an object")
+                except ValueError as error:
+                    reply = {"ok": False, "error": f"bad request: {error}"}
+                else:
+                    reply = await self.handle(request)
+                writer.write(json.dumps(reply, separators=(",", ":")).encode() + b"\n")
+                if writer.transport.get_write_buffer_size() > 65536:
+                    await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    ''' for expire(self)
+    Drops every session that has been idle for longer than idle_timeout. Returns how many went.
+    '''
+    def expire(self):
+        cutoff = time.monotonic() - self.idle_timeout
+        stale = [session_id for session_id, session in self.sessions.items() if session.last_active < cutoff]
+        for session_id in stale:
+            del self.sessions[session_id]
+        return len(stale)
+
+    async def expire_forever(self):
+        while True:
+            await asyncio.sleep(min(60, self.idle_timeout / 4))
+            self.expire()
+
+
+async def serve(server, host="127.0.0.1", port=8765, unix=None):
+    if unix is not None:
+        listener = await asyncio.start_unix_server(server.serve_client, path=unix)
+        print(f"listening on {unix}")
+    else:
+        listener = await asyncio.start_server(server.serve_client, host, port)
+        print(f"listening on {host}:{port}")
+    expiry = asyncio.create_task(server.expire_forever())
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        expiry.cancel()
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Headless Sudoku session server (JSON lines)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", help="listen on this Unix socket path instead of TCP")
+    parser.add_argument("--idle", type=float, default=IDLE_TIMEOUT, help="seconds before an idle session is dropped")
+    parser.add_argument("--bank", default=PUZZLE_BANK_FILE, help="puzzle bank file to serve puzzles from, if it exists")
+    args = parser.parse_args(argv)
+
+    bank = PuzzleBank(args.bank) if os.path.exists(args.bank) else None
+    prefetcher = PuzzlePrefetcher([(9, level) for level in (30, 40, 50)], depth=8, bank=bank)
+    server = SessionServer(prefetcher, args.idle)
+    try:
+        asyncio.run(serve(server, args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        prefetcher.close()
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
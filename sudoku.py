@@ -4,154 +4,348 @@
 # progress), and will form a cohesive project together with
 # the rest of the code
 
-import pygame, sys
+import pygame, sys, os, time
+from collections import deque
 from sudoku_generator import *
+from puzzle_bank import PuzzleBank
+from puzzle_prefetcher import PuzzlePrefetcher
+from sudoku_solver import SudokuSolver, get_unit_tables
+from board_model import BoardModel, CellView, UndoLog
+import game_save
+import profiling
+
+PUZZLE_BANK_FILE = "puzzles.bank"  # optional, build it with: python puzzle_bank.py puzzles.bank
 
 cell_value_list = [
             ['-' for j in range(9)]
             for i in range(9)]
 
-class Cell:
-    #represents a single cell (there are 81 total cells)
-
-    def __init__(self, value, row, col, screen):
-        self.value = value
-        self.row = row
-        self.col = col
-        self.screen = screen
-        self.sketched_value = None
-
-    def set_cell_value(self, value): # cell's value
-        self.value = value
-
-    def set_sketched_value(self, value): # cell's sketched value
-        self.sketched_value = value
+# colors used to draw the numbers in the cells
+GIVEN_COLOR = 'black'  # numbers that came with the puzzle
+PLACED_COLOR = 'black'  # numbers the player entered
+SKETCHED_COLOR = 'azure4'  # sketched numbers in the corner of the cell
+MARKS_COLOR = 'azure4'  # the player's pencil marks
+CANDIDATES_COLOR = 'hotpink4'  # auto candidates (F2)
+
+# font size -> pygame Font (the default font), so buttons and titles don't load the font every time they are drawn
+font_cache = {}
+
+def get_font(font_size):
+    font = font_cache.get(font_size)
+    if font is None:
+        font = font_cache[font_size] = pygame.font.Font(None, font_size)
+    return font
+
+# (font size, color) -> list of rendered number surfaces, index 1 is "1" and so on (index 0 is unused)
+glyph_cache = {}
+
+''' for get_glyphs(font_size, color, count)
+Returns the rendered surfaces for the numbers 1 to count (at least 1 to 9) in this font size and color.
+The font is only created and the numbers only rendered the first time a size and color is asked for,
+after that drawing a number is just a blit.
+'''
+def get_glyphs(font_size, color, count=9):
+    glyphs = glyph_cache.get((font_size, color))
+    if glyphs is None or len(glyphs) <= count:
+        font = get_font(font_size)
+        glyphs = [None] + [font.render(str(number), True, color) for number in range(1, max(count, 9) + 1)]
+        glyph_cache[(font_size, color)] = glyphs
+    return glyphs
+
+
+# (cell size, box length, marks, color) -> surface with the small numbers of that bitset laid out in a grid
+marks_cache = {}
+
+''' for get_marks_surface(cell_size, box_length, marks, color)
+Returns a transparent cell-sized surface with the numbers in marks (bit num set = num is marked) drawn small,
+in a box_length x box_length grid like a phone keypad. Each bitset is only rendered once, after that
+drawing a cell's marks is a single blit.
+'''
+def get_marks_surface(cell_size, box_length, marks, color):
+    key = (cell_size, box_length, marks, color)
+    surface = marks_cache.get(key)
+    if surface is None:
+        if len(marks_cache) > 4096:  # only happens with lots of different marks on the big boards
+            marks_cache.clear()
+        slot = cell_size // box_length
+        glyphs = get_glyphs(slot * 4 // 5, color, box_length * box_length)
+        surface = pygame.Surface((cell_size, cell_size), pygame.SRCALPHA)
+        for number in range(1, box_length * box_length + 1):
+            if marks >> number & 1:
+                i, j = divmod(number - 1, box_length)
+                surface.blit(glyphs[number], glyphs[number].get_rect(center=(j * slot + slot // 2, i * slot + slot // 2)))
+        marks_cache[key] = surface
+    return surface
+
+
+class Cell(CellView):
+    #represents a single cell (there are 81 total cells on a 9x9 board)
+    # value, sketched_value and given live in the board's BoardModel, the cell only knows how to draw them
+
+    __slots__ = ("board", "cell_size")
+
+    def __init__(self, board, row, col):
+        CellView.__init__(self, board.model, row, col)
+        self.board = board
+        self.cell_size = board.cell_size  # width/height of the cell in pixels
 
     '''
-    Draws this cell, along with the value inside it.
+    Draws this cell again, along with the value inside it.
     If this cell has a nonzero value, that value is displayed.
     Otherwise, no value is displayed in the cell.
     The cell is outlined red if it is currently selected.
+    Returns the area of the screen that changed.
     '''
     def draw(self):
-        #make a variable to keep track of whether it is sketched or real
+        return self.board.redraw_cell(self.row, self.col)
 
+    '''
+    Draws the number of a given cell onto surface (the board's givens layer), nothing for the other cells.
+    '''
+    def draw_given(self, surface):
+        model, row, col = self.model, self.row, self.col
+        if model.is_given(row, col):
+            size = self.cell_size
+            glyph = get_glyphs(size * 40 // 68, GIVEN_COLOR, model.size)[model.value(row, col)]
+            surface.blit(glyph, glyph.get_rect(center=(col * size + size / 2, row * size + size / 2)))
+
+    '''
+    Draws what the player put in this cell onto surface (the board's entries layer): a placed number,
+    the sketched number in the corner, and the pencil marks (or auto candidates) of an empty cell.
+    '''
+    def draw_entry(self, surface):
+        #make a variable to keep track of whether it is sketched or real
 
-        real_value_font = pygame.font.Font(None, 40)
-        real_value_surf = real_value_font.render(f'{self.value}', True, 'black')
 
-        sketched_value_font = pygame.font.Font(None, 40)
-        sketched_value_surf = sketched_value_font.render(f'{self.sketched_value}', True, 'azure4')
+        size = self.cell_size
+        font_size = size * 40 // 68  # 40 on the 68 pixel cells of a 9x9 board
 
-        if self.value != 0:
+        model, row, col = self.model, self.row, self.col
+        value = model.value(row, col)
+        if value != 0 and not model.is_given(row, col):
             #draw cell's absolute values on screen in middle
-            real_value_rect = real_value_surf.get_rect(center=(self.col * 68 + 68/2, self.row * 68 + 68/2))
-            self.screen.blit(real_value_surf, real_value_rect)
+            real_value_surf = get_glyphs(font_size, PLACED_COLOR, value)[value]
+            real_value_rect = real_value_surf.get_rect(center=(self.col * size + size/2, self.row * size + size/2))
+            surface.blit(real_value_surf, real_value_rect)
 
-        if self.sketched_value != None:
+        sketched = model.sketch_value(row, col)
+        if sketched:
             #draw sketched cell's value on top left corner of cell
-            sketched_value_rect = sketched_value_surf.get_rect(center=(self.col * 68 + 15, self.row * 68 + 20))
-            self.screen.blit(sketched_value_surf, sketched_value_rect)
+            sketched_value_surf = get_glyphs(font_size, SKETCHED_COLOR, sketched)[sketched]
+            sketched_value_rect = sketched_value_surf.get_rect(
+                center=(self.col * size + size * 15 // 68, self.row * size + size * 20 // 68))
+            surface.blit(sketched_value_surf, sketched_value_rect)
+
+        elif value == 0:
+            # pencil marks, or the auto candidates when they are switched on
+            if model.candidates is not None:
+                marks, color = model.candidates[row * model.size + col], CANDIDATES_COLOR
+            else:
+                marks, color = model.marks(row, col), MARKS_COLOR
+            if marks:
+                surface.blit(get_marks_surface(size, model.box_length, marks, color), (col * size, row * size))
+
+
+# (screen size, board size) -> surface with the parts of the in-game screen that never change:
+# the pink background, the grid lines and the buttons under the board
+static_layers = {}
 
 class Board:
-    def __init__(self, width, height, screen, difficulty):
+    def __init__(self, width, height, screen, difficulty, bank=None, size=9, puzzle=None, model=None):
         self.width = width
         self.height = height
         self.screen = screen
         self.difficulty = difficulty
-
-        # this list is the 9x9 2d list that contains the original sudoku board
-        self.board = generate_sudoku(9, difficulty)
-
-        #this list contains 81 cell objects
+        self.size = size  # rows/columns on the board (9, 16 or 25)
+        self.box_length = int(size ** 0.5)
+
+        # the board is a square of width pixels split into size cells each way
+        self.cell_size = width // size
+        self.board_pixels = self.cell_size * size
+        self.thin_line = max(1, self.cell_size // 20)  # 3 pixels on a 9x9 board
+        self.thick_line = self.thin_line * 2 + 1  # 7 pixels on a 9x9 board
+
+        # the original sudoku board is the puzzle passed in (e.g. from PuzzlePrefetcher), or comes from the puzzle bank if there
+        # is one (no waiting on the generator), otherwise it is generated - with unique=True on 9x9 so
+        # the board only has one solution (not on the bigger boards, see generate_sudoku)
+        # (or a whole BoardModel can be passed in, e.g. a game loaded from a GameSave)
+        if model is None and puzzle is None and bank is not None and bank.size == size:
+            puzzle = bank.random_puzzle(difficulty)
+            puzzle = puzzle[0] if puzzle is not None else None
+        if model is None and puzzle is None:
+            puzzle = generate_sudoku(size, difficulty, unique=size == 9)
+
+        # everything about the game (givens, values, sketches and the running counts that make is_full,
+        # check_board and conflicts instant) is in the model, the board only draws it
+        # values should only be changed through place_number, clear and reset_to_original (or the model)
+        self.model = model if model is not None else BoardModel(puzzle)
+        self.save = None  # GameSave the moves get journaled to, if the game is being saved
+        self.history = UndoLog(self.model)  # undo/redo, every change to the model is recorded in it
+        self.dirty_rects = []  # areas redrawn outside of the cell being edited (see take_dirty)
+
+        #this list contains size x size cell objects, views onto the model that can draw themselves
         self.cells = [
-            [Cell(self.board[i][j], i, j, screen) for j in range(9)]
-            for i in range(9)
+            [Cell(self, i, j) for j in range(size)]
+            for i in range(size)
         ]
 
-    ''' for def draw(self)
-    Draws an outline of the Sudoku grid, with bold lines to delineate the 3x3 boxes.
-    Draws every cell on this board.
+        # the screen is put together from layers, so drawing it again is a couple of blits whatever is on the board:
+        #   static    - background, grid lines and buttons, drawn once per screen and board size (static_layer)
+        #   givens    - the static layer with the givens drawn on, made once per puzzle
+        #   entries   - the givens layer with the player's numbers, sketches and marks drawn on,
+        #               a changed cell is copied back from the givens layer and drawn again on its own
+        #   selection - the red box, blitted over the selected cell
+        # the layers are opaque copies of each other, so putting the screen back is a plain copy, no alpha blending
+        self.selected = None  # (row, col) of the cell with the selection box, None if there isn't one
+        self.givens = self.static_layer().copy()
+        for row in self.cells:
+            for cell in row:
+                cell.draw_given(self.givens)
+        self.entries = self.givens.copy()
+        self.draw_entries()
+        self.selection = self.selection_overlay()
+
+    ''' for board
+    The original sudoku board as a 2D list (0 = empty), built from the model when asked for.
     '''
-    def draw(self):
+    @property
+    def board(self):
+        return self.model.original_values()
+
+    @property
+    def empty_count(self):
+        return self.model.empty_count
+
+    ''' for static_layer(self)
+    Returns the surface with the background, grid lines and buttons for this screen and board size,
+    drawing it the first time it is asked for (it is shared by every board of that size).
+    '''
+    def static_layer(self):
+        key = (self.screen.get_size(), self.size)
+        layer = static_layers.get(key)
+        if layer is None:
+            layer = pygame.Surface(self.screen.get_size(), 0, self.screen)  # same pixel format, so blits are plain copies
+            layer.fill('pink')
+            self.draw_grid(layer)
+            in_game_buttons(layer)
+            static_layers[key] = layer
+        return layer
+
+    ''' for def draw_grid(self, surface)
+    Draws an outline of the Sudoku grid, with bold lines to delineate the boxes.
+    '''
+    def draw_grid(self, surface):
+        size, box_pixels, edge = self.cell_size, self.cell_size * self.box_length, self.board_pixels
         # draw thick horizontal lines
-        for i in range(1, 4):
+        for i in range(1, self.box_length + 1):
             pygame.draw.line(
-                self.screen,
+                surface,
                 'black',
-                (0, i * 204),
-                (612, i * 204),
-                7
+                (0, i * box_pixels),
+                (edge, i * box_pixels),
+                self.thick_line
             )
         # draw thick vertical lines
-        for i in range(1, 3):
+        for i in range(1, self.box_length):
             pygame.draw.line(
-                self.screen,
+                surface,
                 'black',
-                (i * 204, 0),
-                (i * 204, 612),
-                7
+                (i * box_pixels, 0),
+                (i * box_pixels, edge),
+                self.thick_line
             )
 
         # draw thin horizontal lines
-        for i in range(1, 10):
+        for i in range(1, self.size + 1):
             pygame.draw.line(
-                self.screen,
+                surface,
                 'black',
-                (0, i * 68),
-                (612, i * 68),
-                3
+                (0, i * size),
+                (edge, i * size),
+                self.thin_line
             )
         # draw thin vertical lines
-        for i in range(1, 10):
+        for i in range(1, self.size + 1):
             pygame.draw.line(
-                self.screen,
+                surface,
                 'black',
-                (i * 68, 0),
-                (i * 68, 612),
-                3
+                (i * size, 0),
+                (i * size, edge),
+                self.thin_line
             )
 
+    ''' for def selection_overlay(self)
+    Returns a surface the size of cell_rect with the red selection box on it (the rest is see-through),
+    blitted at cell_rect(row, col).topleft it covers the same pixels for any cell.
+    '''
+    def selection_overlay(self):
+        size = self.cell_size
+        rect = self.cell_rect(0, 0)
+        overlay = pygame.Surface(rect.size)
+        overlay.set_colorkey('black', pygame.RLEACCEL)  # only the red lines get copied (they have no soft edges)
+        left, top = -rect.x, -rect.y  # where the cell's top left corner ends up on the overlay
+        for start, end in (((0, 0), (size, 0)), ((0, size), (size, size)),  # upper and bottom lines
+                           ((0, 0), (0, size)), ((size, 0), (size, size))):  # left and right lines
+            pygame.draw.line(overlay, 'red', (left + start[0], top + start[1]), (left + end[0], top + end[1]),
+                             self.thin_line)
+        return overlay
+
+    ''' for def draw_entries(self)
+    Draws the player's numbers of every cell onto the entries layer again, e.g. after a reset.
+    '''
+    def draw_entries(self):
+        self.entries.blit(self.givens, (0, 0))
+        for row in self.cells:
+            for cell in row:
+                cell.draw_entry(self.entries)
+
+    ''' for def compose(self, rect)
+    Puts the area rect of the screen together from the layers. Returns rect.
+    '''
+    def compose(self, rect):
+        screen = self.screen
+        screen.blit(self.entries, rect, rect)
+        if self.selected is not None:
+            selected_rect = self.cell_rect(*self.selected)
+            if selected_rect.colliderect(rect):
+                screen.set_clip(rect)
+                screen.blit(self.selection, selected_rect)
+                screen.set_clip(None)
+        return rect
+
+    ''' for def draw(self)
+    Draws the whole in-game screen: the grid, every cell, the selection box and the buttons.
+    '''
+    def draw(self):
+        return self.compose(self.screen.get_rect())
+
+    ''' for def cell_rect(self, row, col)
+    Returns the area of the screen covered by the cell at (row, col), including the grid lines around it.
+    This is the area that has to be updated on the display when the cell or its selection box changes.
+    '''
+    def cell_rect(self, row, col):
+        size = self.cell_size
+        return pygame.Rect(col * size, row * size, size, size).inflate(self.thick_line, self.thick_line)
+
+    ''' for def unselect(self, row, col)
+    Removes the red selection box from the cell at (row, col). Only that cell's area is redrawn.
+    Returns the area that changed.
+    '''
+    def unselect(self, row, col):
+        if self.selected == (row, col):
+            self.selected = None
+        return self.compose(self.cell_rect(row, col))
+
     ''' for def select(self, row, col)
     Marks the cell at (row, col) in the board as the current selected cell.
     Once a cell has been selected, the user can edit its value or sketched value.
+    Returns the area of the screen that changed.
     '''
     def select(self, row, col):
-        #upper line
-        pygame.draw.line(
-            self.screen,
-            'red',
-            (col * 68, row * 68),
-            ((col+1) * 68, row * 68),
-            3
-        )
-
-        #bottom line
-        pygame.draw.line(
-            self.screen,
-            'red',
-            (col * 68, (row+1) * 68),
-            ((col+1) * 68, (row+1) * 68),
-            3
-        )
-
-        #left line
-        pygame.draw.line(
-            self.screen,
-            'red',
-            (col * 68, row * 68),
-            (col * 68, (row+1) * 68),
-            3
-        )
-
-        #right line
-        pygame.draw.line(
-            self.screen,
-            'red',
-            ((col+1) * 68, row * 68),
-            ((col+1) * 68, (row+1) * 68),
-            3
-        )
+        if self.selected is not None and self.selected != (row, col):
+            self.unselect(*self.selected)  # there is only ever one selection box
+        self.selected = (row, col)
+        return self.compose(self.cell_rect(row, col))
 
     ''' for def click(self, x, y)
     If a tuple of (x, y) coordinates is within the displayed board, this function returns a tuple of the (row, col)
@@ -159,34 +353,60 @@ class Board:
     '''
 
     def click(self, x, y):
-        if 0 <= x <= 612 and 0 <= y <= 612:
-            row = y // 68
-            col = x // 68
+        if 0 <= x < self.board_pixels and 0 <= y < self.board_pixels:
+            row = y // self.cell_size
+            col = x // self.cell_size
             position = (row, col)
             return position
         else:
             return None
 
+    ''' for set_value(self, row, col, value)
+    Changes the value of the cell at (row, col) and updates the running counts.
+    '''
+    def set_value(self, row, col, value):
+        self.model.set_value(row, col, value)
+        self.update_entry(row, col)
+
     ''' for clear(self)
     Clears the value cell. Note that the user can only remove the cell values and sketched value that are
     filled by themselves.
     '''
     def clear(self, row, col):
-        if self.board[row][col] == 0:
-            # Fill the cell with the background color
-            cell_rect = pygame.Rect(col * 69, row * 69, 50, 55)
-            pygame.draw.rect(self.screen, 'pink', cell_rect)
-
-            self.cells[row][col].value = 0  # i don't know if the sketched affects the value or not, so just in case
-            self.cells[row][col].sketched_value = None
-            self.cells[row][col].draw()
+        if not self.model.is_given(row, col):
+            self.model.clear(row, col)  # clears the sketched value too
+            if self.save is not None:
+                self.save.record(game_save.CLEAR, row, col)
+            self.redraw_cell(row, col)
+            self.redraw_peers(row, col)
+
+    ''' for update_entry(self, row, col)
+    Draws the player's numbers of the cell at (row, col) on the entries layer again, so the layer always
+    matches the model. The screen itself only changes when the cell is drawn (redraw_cell).
+    '''
+    def update_entry(self, row, col):
+        size = self.cell_size
+        area = pygame.Rect(col * size, row * size, size, size)
+        self.entries.blit(self.givens, area, area)
+        self.cells[row][col].draw_entry(self.entries)
+
+    ''' for redraw_cell(self, row, col)
+    Draws a cell again from scratch: its numbers on the entries layer, then its area of the screen from the layers.
+    Returns the area that changed.
+    '''
+    def redraw_cell(self, row, col):
+        self.update_entry(row, col)
+        return self.compose(self.cell_rect(row, col))
 
     ''' for sketch(self, value)
     Sets the sketched value of the current selected cell equal to user entered value.
     It will be displayed at the top left corner of the cell using the draw() function.
     '''
     def sketch(self, value, row, col):
-        self.cells[row][col].sketched_value = value
+        self.model.set_sketch(row, col, int(value) if value else 0)
+        if self.save is not None:
+            self.save.record(game_save.SKETCH, row, col, int(value) if value else 0)
+        self.update_entry(row, col)
 
     ''' for place_number(self, value)
     Sets the value of the current selected cell equal to user entered value.
@@ -195,50 +415,154 @@ class Board:
     def place_number(self, value, row, col):
         # self.cells[row][col].value = value
         # Convert the value to an integer before assigning
-        self.cells[row][col].value = int(value)
+        self.model.set_value(row, col, int(value))
+        if self.save is not None:
+            self.save.record(game_save.PLACE, row, col, int(value))
+        self.update_entry(row, col)
+        if self.model.candidates is not None:
+            self.redraw_peers(row, col)  # the candidates of the empty peers change
+
+    ''' for toggle_mark(self, value, row, col)
+    Puts a pencil mark for value in the cell, or takes it out if it is there already.
+    '''
+    def toggle_mark(self, value, row, col):
+        marked = self.model.toggle_mark(value, row, col)
+        if self.save is not None:
+            self.save.record(game_save.MARK if marked else game_save.UNMARK, row, col, int(value))
+        self.redraw_cell(row, col)
+
+    ''' for show_candidates(self, on)
+    Switches the auto candidates on or off (the screen has to be drawn again afterwards).
+    '''
+    def show_candidates(self, on):
+        self.model.show_candidates(on)
+        self.draw_entries()
+
+    ''' for redraw_peers(self, row, col)
+    With auto candidates on, a number placed or cleared changes the candidates of the cell's peers,
+    so the empty ones are drawn again (their areas go to dirty_rects).
+    '''
+    def redraw_peers(self, row, col):
+        if self.model.candidates is None:
+            return
+        size = self.size
+        for peer in get_unit_tables(size)[1][row * size + col]:
+            peer_row, peer_col = divmod(peer, size)
+            if self.model.value(peer_row, peer_col) == 0:
+                self.dirty_rects.append(self.redraw_cell(peer_row, peer_col))
+
+    ''' for take_dirty(self)
+    Returns the areas in dirty_rects and empties it.
+    '''
+    def take_dirty(self):
+        rects, self.dirty_rects = self.dirty_rects, []
+        return rects
 
     ''' for reset_to_original(self)
     Reset all cells in the board to their original values 
     (0 if cleared, otherwise the corresponding digit).
     '''
     def reset_to_original(self):
-        # Reset user-modified cell values and sketched values
-        for i in range(9):
-            for j in range(9):
-                if self.board[i][j] == 0:  # Check if the cell is user-modified
-                    self.cells[i][j].value = 0
-                    self.cells[i][j].sketched_value = None
+        # Reset user-modified cell values and sketched values by undoing every move,
+        # so the moves can still be redone afterwards
+        if not self.history.rewind():
+            self.model.reset_to_original()  # the undo log doesn't go back far enough
+        if self.save is not None:
+            self.save.record(game_save.RESET)
+        self.draw_entries()  # the screen has to be drawn again afterwards
+
+    ''' for begin_move(self)
+    Starts a new move for undo: everything changed until the next begin_move is undone in one go.
+    '''
+    def begin_move(self):
+        self.history.begin_move()
+
+    ''' for undo(self)
+    Undoes the last move and redraws the cells it changed. Returns the areas of the screen that changed.
+    '''
+    def undo(self):
+        return self.redraw_changed(self.history.undo())
+
+    ''' for redo(self)
+    Redoes the last undone move and redraws the cells it changed. Returns the areas of the screen that changed.
+    '''
+    def redo(self):
+        return self.redraw_changed(self.history.redo())
+
+    def redraw_changed(self, changed):
+        rects = []
+        for row, col in set(changed):
+            if self.save is not None:
+                # the journal gets the cell as it is now
+                self.save.record(game_save.PLACE, row, col, self.model.value(row, col))
+                self.save.record(game_save.SKETCH, row, col, self.model.sketch_value(row, col))
+                self.save.record(game_save.CLEAR_MARKS, row, col)
+                marks = self.model.marks(row, col)
+                for number in range(1, self.size + 1):
+                    if marks >> number & 1:
+                        self.save.record(game_save.MARK, row, col, number)
+            rects.append(self.redraw_cell(row, col))
+            self.redraw_peers(row, col)
+        return rects + self.take_dirty()
 
     ''' for is_full(self)
     Returns a Boolean value indicating whether the board is full or not.
     '''
 
     def is_full(self):
-        for i in self.cells:
-            for j in i:
-                if j.value == 0:
-                    return False
-        return True
+        return self.model.empty_count == 0
 
     ''' for update_board(self)
-    Updates the underlying 2D board with the values in all cells.
+    The cells write straight through to the model, so there is nothing to copy back any more.
+    Returns the values on the board as a 2D list.
     '''
 
     def update_board(self):
-        return [
-            [Cell(self.cells[i][j], i, j, self.screen) for j in range(9)]
-            for i in range(9)
-        ]
+        return self.model.current_values()
 
     ''' for find_empty(self)
     Finds an empty cell and returns its row and col as a tuple (x, y).
+    Returns None if there are no empty cells.
     '''
 
     def find_empty(self):
-        pass
+        return self.model.find_empty()
+
+    ''' for current_values(self)
+    Returns the values in the cells right now (givens and the player's numbers) as a 2D list.
+    '''
+
+    def current_values(self):
+        return self.model.current_values()
+
+    ''' for hint(self)
+    Returns the next logical step from the current position as (row, col, value, technique),
+    or None if the board is full or the numbers placed so far can't lead to a solution.
+    '''
+
+    def hint(self):
+        return SudokuSolver(self.current_values()).next_hint()
+
+    ''' for solve_from_here(self)
+    Returns the solved board reachable from the current position as a 2D list, or None if there isn't one.
+    The cells are not changed.
+    '''
+
+    def solve_from_here(self):
+        return SudokuSolver(self.current_values()).solve()
+
+    ''' for is_solvable(self)
+    Returns True if the numbers placed so far can still be completed to a solution.
+    '''
+
+    def is_solvable(self):
+        return SudokuSolver(self.current_values()).is_solvable()
 
     ''' for check_board(self)
     Check whether the Sudoku board is solved correctly.
+    The board is solved when it is full and no digit repeats in any row, column or box,
+    which the running counts already know, so this doesn't look at the cells.
+    is_valid_row, is_valid_col and is_valid_box still check a single unit by scanning it.
     '''
 
     #def check_board(self):
@@ -253,56 +577,60 @@ class Board:
         # return True
 
     def check_board(self):
-        # Check rows
-        for row in range(9):
-            if not self.is_valid_row(row): # if this is not true
-                return False # return this function as false
-
-        # Check columns
-        for col in range(9):
-            if not self.is_valid_col(col): # if this is not true
-                return False # return this function as false
-
-        # Check 3x3 boxes
-        for row in range(0, 9, 3):
-            for col in range(0, 9, 3):
-                if not self.is_valid_box(row, col): # if this is not true
-                    return False # return this function as false
+        return self.model.check_board()
 
-        return True
+    ''' for conflicts(self)
+    Returns a set of (row, col) for every cell whose value is repeated in its row, column or box.
+    Only the units that have a repeat get looked at.
+    '''
+    def conflicts(self):
+        return self.model.conflicts()
 
     def is_valid_row(self, row):
         seen = set() # This set will be used to keep track of the values seen in the row to ensure no duplicates.
-        for col in range(9): # loops through each col index in the range from 0 to 8
-            value = self.cells[row][col].value # Gets the cell value
+        for col in range(self.size): # loops through each col index in the range from 0 to size - 1
+            value = self.model.value(row, col) # Gets the cell value
             if value in seen: return False # if it is seen, it finds that the sudoku rule wasn't met
             seen.add(value) # adds the number to the list (basically updates it)
         return True # complete and no duplicates??????? returns True!!! WHOOP WHOOP
 
     def is_valid_col(self, col):
         seen = set()
-        for row in range(9):
-            value = self.cells[row][col].value
+        for row in range(self.size):
+            value = self.model.value(row, col)
             if value in seen: return False
             seen.add(value)
         return True
 
     def is_valid_box(self, row, col):
         seen = set()
-        for i in range(3):
-            for j in range(3):
-                value = self.cells[row + i][col + j].value # row/col change the box and i/j change cell
+        for i in range(self.box_length):
+            for j in range(self.box_length):
+                value = self.model.value(row + i, col + j) # row/col change the box and i/j change cell
                 if value in seen:
                     return False
                 seen.add(value)
         return True
 
 
+''' for key_number(key, size)
+Returns the number a key stands for on a board of this size (1-9 on the number row or keypad,
+a = 10, b = 11, ... on the bigger boards), or None if it isn't a number key.
+'''
+def key_number(key, size):
+    if pygame.K_1 <= key <= pygame.K_9:
+        return key - pygame.K_0
+    if pygame.K_KP1 <= key <= pygame.K_KP9:
+        return key - pygame.K_KP1 + 1
+    if pygame.K_a <= key <= pygame.K_z and key - pygame.K_a + 10 <= size:
+        return key - pygame.K_a + 10
+    return None
+
 def difficulty_button(x_size, y_size, x_coord, y_coord, text, screen):
     button_surf = pygame.Surface((x_size, y_size))
     button_surf.fill('magenta3')
     button_rect = button_surf.get_rect(topleft = (x_coord, y_coord))
-    button_text = pygame.font.Font(None, 30)
+    button_text = get_font(30)
     button_text_surf = button_text.render(text, True, 'lightpink1')
     button_text_rect = button_text_surf.get_rect(center = button_rect.center)
     screen.blit(button_surf, button_rect)
@@ -312,13 +640,118 @@ def in_game_button(x_size, y_size, x_coord, y_coord, text, screen):
     in_game_button_surf = pygame.Surface((x_size, y_size))
     in_game_button_surf.fill('darkgoldenrod1')
     button_rect = in_game_button_surf.get_rect(topleft = (x_coord, y_coord))
-    button_text = pygame.font.Font(None, 30)
+    button_text = get_font(30)
     button_text_surf = button_text.render(text, True, 'white')
     button_text_rect = button_text_surf.get_rect(center = button_rect.center)
     screen.blit(in_game_button_surf, button_rect)
     screen.blit(button_text_surf, button_text_rect)
 
-def main():
+class AssetManager:
+    '''
+    Loads the Frenchie pictures once and keeps them ready to blit.
+    Each image is decoded a single time, converted to the display's pixel format (so blits don't
+    convert every time) and scaled once to cover the window, keeping its aspect ratio.
+    Needs the display to be set up first (convert() needs to know the display format).
+    '''
+    def __init__(self, screen, folder=os.path.dirname(os.path.abspath(__file__))):
+        self.screen = screen
+        self.folder = folder
+        self.images = {}  # file name -> ready to blit surface
+
+    ''' for image(self, name)
+    Returns the surface for the image file name, loading it the first time it is asked for.
+    '''
+    def image(self, name):
+        surface = self.images.get(name)
+        if surface is None:
+            surface = pygame.image.load(os.path.join(self.folder, name)).convert()
+            width, height = surface.get_size()
+            scale = max(self.screen.get_width() / width, self.screen.get_height() / height)
+            surface = pygame.transform.smoothscale(surface, (round(width * scale), round(height * scale)))
+            self.images[name] = surface
+        return surface
+
+    ''' for preload(self, *names)
+    Loads images ahead of time so the first screen that needs them does not have to wait.
+    '''
+    def preload(self, *names):
+        for name in names:
+            self.image(name)
+
+# the strip under the board that holds the RESET, RESTART and EXIT buttons
+BUTTON_STRIP = pygame.Rect(0, 612, 612, 68)
+
+''' for in_game_buttons(screen)
+Draws the RESET, RESTART and EXIT buttons under the board and returns the area of the screen they cover.
+'''
+def in_game_buttons(screen):
+    in_game_button(80, 40, 120, 630, "RESET", screen)  # reset
+    in_game_button(100, 40, 260, 630, "RESTART", screen)  # restart
+    in_game_button(80, 40, 420, 630, "EXIT", screen)  # exit
+    return BUTTON_STRIP
+
+''' for draw_game(board, screen)
+Draws the whole in-game screen: background, grid, every cell and the buttons.
+The board puts it together from its layers, so this is a few blits however full the board is.
+'''
+def draw_game(board, screen):
+    return board.draw()
+
+# longest main() sleeps waiting for an event before waking up anyway (only matters for the stats report)
+IDLE_TIMEOUT_MS = 1000
+
+class FrameStats:
+    '''
+    Keeps track of how main() spends its time: how long each frame (handling events + drawing) takes,
+    how much time is spent asleep waiting for events, and how much CPU the process uses overall.
+
+    Parameters:
+    report_every is how many seconds apart report_due() returns True
+    '''
+    def __init__(self, report_every=10):
+        self.start_wall = time.perf_counter()
+        self.start_cpu = time.process_time()
+        self.frames = 0
+        self.frame_times = deque(maxlen=1000)  # seconds, the most recent frames only
+        self.idle = 0.0  # seconds spent waiting for events
+        self.report_every = report_every
+        self.last_report = self.start_wall
+
+    def add_frame(self, seconds):
+        self.frames += 1
+        self.frame_times.append(seconds)
+
+    def add_idle(self, seconds):
+        self.idle += seconds
+
+    def report_due(self):
+        now = time.perf_counter()
+        if now - self.last_report >= self.report_every:
+            self.last_report = now
+            return True
+        return False
+
+    ''' for report(self)
+    Returns a one line summary: frames, frame time percentiles, time spent idle and CPU use.
+    '''
+    def report(self):
+        wall = max(time.perf_counter() - self.start_wall, 1e-9)
+        cpu = time.process_time() - self.start_cpu
+        times = sorted(self.frame_times) or [0.0]
+        p50 = times[len(times) // 2] * 1000
+        p99 = times[min(len(times) - 1, len(times) * 99 // 100)] * 1000
+        return (f"frames {self.frames} | frame ms p50 {p50:.2f} p99 {p99:.2f} max {times[-1] * 1000:.2f} | "
+                f"idle {self.idle / wall:.0%} | cpu {cpu / wall:.1%}")
+
+def event_profile_name(event):
+    return "event." + pygame.event.event_name(event.type)
+
+''' for main(max_fps=60, show_stats=False, profile=None)
+Runs the game. max_fps caps the frame rate, show_stats prints FrameStats reports every few seconds.
+profile is a file name prefix: if given, profiling is switched on (the generator's counters, the time
+each event takes to handle and each frame to render) and written to profile.json and profile.trace.json on exit.
+'''
+def main(max_fps=60, show_stats=False, profile=None):
 
     pygame.init()
     pygame.display.set_caption("Sudoku")
@@ -328,233 +761,387 @@ def main():
     game_over_screen = False
     my_board = None
     in_game_button_used = False
+    bank = PuzzleBank(PUZZLE_BANK_FILE) if os.path.exists(PUZZLE_BANK_FILE) else None
+    assets = AssetManager(screen)
+    assets.preload("start_frenchie.png", "happy_frenchie.png", "side_eye_frenchie.png")
+    profiler = profiling.enable() if profile else None  # on before the prefetcher starts generating
+    # generates puzzles in the background so clicking a difficulty doesn't wait on the generator
+    prefetcher = PuzzlePrefetcher([(9, level) for level in (30, 40, 50)], bank=bank)
+    save = game_save.GameSave()  # the game in progress is saved as it is played, RESUME on the welcome screen loads it
 
     var = 0  # This variable checks that the user selects a cell before a sketched value can be added
     value = 0
     row, col = 0, 0  # > for arrow keys
-
-    while True:
-
-        # event loop
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:  # if user exists out of the window
-                pygame.quit()
-                sys.exit()
-
-            if game_start_screen:  # welcome screen
-                game_start_image = pygame.image.load("start_frenchie.png")
-                screen.blit(game_start_image, (0, 0))
-
-                # welcome text
-                welcome_font = pygame.font.Font(None, 70)
-                welcome_surf = welcome_font.render("Welcome to Sudoku", True, 'magenta3')
-                welcome_rect = welcome_surf.get_rect(center=(306, 150))
-                screen.blit(welcome_surf, welcome_rect)
-
-                # buttons
-                difficulty_button(80, 40, 120, 455, "Easy", screen)  # easy
-                difficulty_button(100, 40, 260, 455, "Medium", screen)  # medium
-                difficulty_button(80, 40, 420, 455, "Hard", screen)  # hard
-
-                # checking for if any buttons clicked
-                if event.type == pygame.MOUSEBUTTONDOWN:
-                    x, y = pygame.mouse.get_pos()
-                    if 120 <= x <= 200 and 455 <= y <= 495:  # easy >> Generate Sudoku board with difficulty 30
-                        difficulty_level = 30
-
-                    elif 260 <= x <= 340 and 455 <= y <= 495:  # medium >> Generate Sudoku board with difficulty 40
-                        difficulty_level = 40
-
-                    elif 420 <= x <= 500 and 455 <= y <= 495:  # hard >> Generate Sudoku board with difficulty 50
-                        difficulty_level = 50
-                    elif 0 <= x <= 100 and 0 <= y <= 100: # just to make checking easier
-                        difficulty_level = 1 # delete both of these lines later
-
-                    else:
-                        continue
-
-                    my_board = Board(612, 680, screen, difficulty_level)
-                    screen.fill('pink')  # background turns pink
-                    my_board.draw()  # board gets drawn in
-                    # this actually draws the characters on the screen
-                    for i in range(9):
-                        for j in range(9):
-                            my_board.cells[i][j].draw()
-                    in_game_button(80, 40, 120, 630, "RESET", screen)  # reset
-                    in_game_button(100, 40, 260, 630, "RESTART", screen)  # restart
-                    in_game_button(80, 40, 420, 630, "EXIT", screen)  # exit
-                    game_start_screen = False  # bye-bye frenchie
-
-
-
-            # Sabrina >> we can delete/modify later >> what I was working on
-            elif event.type == pygame.MOUSEBUTTONDOWN:  # if the user clicks on the board
-                var = 1 #variable making sure that a cell was selected before the user can type in a value
-                x, y = pygame.mouse.get_pos()  # Get the mouse position
-                #clicked_position = my_board.click(x, y)  # mouse position >> board position
-                if my_board is not None and y <= 612:
-                    row, col = my_board.click(x, y)
-                    my_board.draw()
-                    my_board.select(row, col)
-                if y > 612:
-                    in_game_button_used = True
-
-            if event.type == pygame.KEYDOWN and var != 0:  # var checks that a cell has been selected before putting in a sketched value
-                value = my_board.cells[row][col].sketched_value
-                if my_board.board[row][col] == 0:
-                    if event.key == pygame.K_1 or event.key == pygame.K_KP1:
-                        my_board.clear(row, col)
-                        my_board.sketch("1", row, col)
-
-                    elif event.key == pygame.K_BACKSPACE:
-                        my_board.clear(row, col)
-                    # checks for the row of numbers and the keypad numbers
-
-                    elif event.key == pygame.K_2 or event.key == pygame.K_KP2:
-                        my_board.clear(row, col)
-                        my_board.sketch("2", row, col)
-
-                    elif event.key == pygame.K_3 or event.key == pygame.K_KP3:
-                        my_board.clear(row, col)
-                        my_board.sketch("3", row, col)
-
-                    elif event.key == pygame.K_4 or event.key == pygame.K_KP4:
-                        my_board.clear(row, col)
-                        my_board.sketch("4", row, col)
-
-
-                    elif event.key == pygame.K_5 or event.key == pygame.K_KP5:
-                        my_board.clear(row, col)
-                        my_board.sketch("5", row, col)
-
-                    elif event.key == pygame.K_6 or event.key == pygame.K_KP6:
-                        my_board.clear(row, col)
-                        my_board.sketch("6", row, col)
-
-                    elif event.key == pygame.K_7 or event.key == pygame.K_KP7:
-                        my_board.clear(row, col)
-                        my_board.sketch("7", row, col)
-
-                    elif event.key == pygame.K_8 or event.key == pygame.K_KP8:
-                        my_board.clear(row, col)
-                        my_board.sketch("8", row, col)
-
-                    elif event.key == pygame.K_9 or event.key == pygame.K_KP9:
-                        my_board.clear(row, col)
-                        my_board.sketch("9", row, col)
-
-                    my_board.cells[row][col].draw()  # layers the number and the pink bg color on top of the old one
-                    my_board.select(row, col)  # this is here because we want the selection box to still show
-
-                    if event.key == pygame.K_RETURN or event.key == pygame.K_KP_ENTER:
-                        if value != None:
-                            if my_board.cells[row][col].sketched_value != None:
-                                my_board.clear(row, col)
-                                my_board.place_number(str(value), row, col)
-                                my_board.cells[row][col].draw()
-
-            if event.type == pygame.KEYDOWN:  # if a key is pressed
-                # my_board.draw() >> can't put here because it'll clear the box for any key pressed
-                if event.key == pygame.K_UP:
-                    # Move the selection box up
-                    var = 1
-                    if row > 0:
-                        row -= 1
-                    my_board.draw()
-                    my_board.select(row, col)
-                elif event.key == pygame.K_DOWN:
-                    # Move the selection box down
-                    var = 1
-                    if row < 8:
-                        row += 1
-                    my_board.draw()
-                    my_board.select(row, col)
-                elif event.key == pygame.K_LEFT:
-                    # Move the selection box left
-                    var = 1
-                    if col > 0:
-                        col -= 1
-                    my_board.draw()
-                    my_board.select(row, col)
-                elif event.key == pygame.K_RIGHT:
-                    # Move the selection box right
-                    var = 1
-                    if col < 8:
-                        col += 1
-                    my_board.draw()
-                    my_board.select(row, col)
-
-            if event.type == pygame.MOUSEBUTTONDOWN and in_game_button_used:
-                x, y = pygame.mouse.get_pos()
-                # If the user selects the RESET button
-                if 120 <= x <= 200 and 630 <= y <= 670:
-                    my_board.reset_to_original()
-                    screen.fill('pink')
-                    my_board.draw()
-                    for i in range(9):
-                        for j in range(9):
-                            my_board.cells[i][j].draw()
-                    in_game_button(80, 40, 120, 630, "RESET", screen)  # reset
-                    in_game_button(100, 40, 260, 630, "RESTART", screen)  # restart
-                    in_game_button(80, 40, 420, 630, "EXIT", screen)  # exit
-
-                # If the user selects the RESTART button
-                if 260 <= x <= 360 and 630 <= y <= 670:
-                    game_start_screen = True
-                    screen.fill('pink')  # Clear the screen
-                    my_board = None  # Reset the board object
-
-                # If the user selects the EXIT button
-                if 420 <= x <= 500 and 630 <= y <= 670:
+    board_size = 9  # picked with the 9x9 / 16x16 / 25x25 buttons on the welcome screen
+
+    # only the parts of the screen that changed get sent to the display:
+    # handlers add the areas they drew to dirty_rects, or set full_update when the whole screen changed
+    screen_drawn = False  # False when the current screen (welcome, game won or game over) still has to be drawn
+
+    clock = pygame.time.Clock()
+    stats = FrameStats()
+    pygame.event.post(pygame.event.Event(pygame.USEREVENT))  # so the welcome screen gets drawn straight away
+
+    try:
+        while True:
+            # sleep until something happens instead of spinning (the timeout just lets the stats report run)
+            idle_start = time.perf_counter()
+            events = [pygame.event.wait(IDLE_TIMEOUT_MS)]
+            frame_start = time.perf_counter()
+            stats.add_idle(frame_start - idle_start)
+            events += pygame.event.get()  # everything that piled up is handled together and drawn once
+
+            dirty_rects = []
+            full_update = False
+
+            # event loop (when profiling, each event is timed under its type, e.g. "event.KeyDown")
+            if profiler is not None:
+                events = profiler.timed(events, event_profile_name, "event")
+            for event in events:
+                if event.type == pygame.NOEVENT:  # wait timed out
+                    continue
+                if event.type == pygame.QUIT:  # if user exists out of the window
                     pygame.quit()
                     sys.exit()
-
+                if my_board is not None:
+                    my_board.begin_move()  # whatever this event changes is undone in one go
+
+                if game_start_screen:  # welcome screen
+                    # checking for if any buttons clicked
+                    difficulty_level = None
+                    loaded = None
+                    if event.type == pygame.MOUSEBUTTONDOWN:
+                        x, y = pygame.mouse.get_pos()
+                        if 510 <= y <= 550:  # size buttons
+                            if 120 <= x <= 200:
+                                board_size = 9
+                            elif 260 <= x <= 360:
+                                board_size = 16
+                            elif 420 <= x <= 500:
+                                board_size = 25
+                            screen_drawn = False  # draw the welcome screen again to move the > < marker
+                            for level in (30, 40, 50):
+                                prefetcher.want(board_size, level * board_size * board_size // 81)
+
+                        elif 120 <= x <= 200 and 455 <= y <= 495:  # easy >> Generate Sudoku board with difficulty 30
+                            difficulty_level = 30
+
+                        elif 260 <= x <= 340 and 455 <= y <= 495:  # medium >> Generate Sudoku board with difficulty 40
+                            difficulty_level = 40
+
+                        elif 420 <= x <= 500 and 455 <= y <= 495:  # hard >> Generate Sudoku board with difficulty 50
+                            difficulty_level = 50
+                        elif 0 <= x <= 100 and 0 <= y <= 100: # just to make checking easier
+                            difficulty_level = 1 # delete both of these lines later
+
+                        elif 260 <= x <= 360 and 565 <= y <= 605 and save.exists():  # resume the saved game
+                            loaded = save.load()
+
+                    if loaded is not None:
+                        model, saved_row, saved_col = loaded
+                        my_board = Board(612, 680, screen, 0, bank, model.size, model=model)
+                        my_board.save = save
+                        draw_game(my_board, screen)
+                        row, col, var = 0, 0, 0
+                        if saved_row is not None:
+                            row, col, var = saved_row, saved_col, 1
+                            my_board.select(row, col)
+                        full_update = True
+                        game_start_screen = False
+                        screen_drawn = False
+
+                    elif difficulty_level is not None:
+                        # bigger boards remove the same fraction of cells as the 9x9 difficulties
+                        difficulty_level = difficulty_level * board_size * board_size // 81
+                        puzzle = prefetcher.get(board_size, difficulty_level)
+                        my_board = Board(612, 680, screen, difficulty_level, bank, board_size, puzzle)
+                        save.start(my_board.model)
+                        my_board.save = save
+                        row, col = 0, 0
+                        draw_game(my_board, screen)
+                        full_update = True
+                        game_start_screen = False  # bye-bye frenchie
+                        screen_drawn = False
+
+                    elif not screen_drawn:
+                        screen.blit(assets.image("start_frenchie.png"), (0, 0))
+
+                        # welcome text
+                        welcome_font = get_font(70)
+                        welcome_surf = welcome_font.render("Welcome to Sudoku", True, 'magenta3')
+                        welcome_rect = welcome_surf.get_rect(center=(306, 150))
+                        screen.blit(welcome_surf, welcome_rect)
+
+                        # buttons
+                        difficulty_button(80, 40, 120, 455, "Easy", screen)  # easy
+                        difficulty_button(100, 40, 260, 455, "Medium", screen)  # medium
+                        difficulty_button(80, 40, 420, 455, "Hard", screen)  # hard
+
+                        # board size buttons, the chosen size is marked with > <
+                        for size_option, size_x in ((9, 120), (16, 260), (25, 420)):
+                            size_text = f"{size_option}x{size_option}"
+                            if size_option == board_size:
+                                size_text = f">{size_text}<"
+                            difficulty_button(100 if size_option == 16 else 80, 40, size_x, 510, size_text, screen)
+                        if save.exists():
+                            difficulty_button(100, 40, 260, 565, "Resume", screen)
+                        screen_drawn = True
+                        full_update = True
+
+                # Sabrina >> we can delete/modify later >> what I was working on
+                elif event.type == pygame.MOUSEBUTTONDOWN:  # if the user clicks on the board
+                    var = 1 #variable making sure that a cell was selected before the user can type in a value
+                    x, y = pygame.mouse.get_pos()  # Get the mouse position
+                    #clicked_position = my_board.click(x, y)  # mouse position >> board position
+                    position = my_board.click(x, y) if my_board is not None else None
+                    if position is not None:
+                        dirty_rects.append(my_board.unselect(row, col))  # the old selection box
+                        row, col = position
+                        dirty_rects.append(my_board.select(row, col))
+                    if y > 612:
+                        in_game_button_used = True
+
+                if event.type == pygame.KEYDOWN and var != 0 and my_board is not None:  # var checks that a cell has been selected before putting in a sketched value
+                    value = my_board.cells[row][col].sketched_value
+                    if not my_board.model.is_given(row, col):
+                        # Shift + number >> pencil mark (a cell can have any number of them)
+                        mark = key_number(event.key, my_board.size) if event.mod & pygame.KMOD_SHIFT else None
+                        if mark is not None:
+                            my_board.toggle_mark(mark, row, col)
+
+                        elif event.key == pygame.K_1 or event.key == pygame.K_KP1:
+                            my_board.clear(row, col)
+                            my_board.sketch("1", row, col)
+
+                        elif event.key == pygame.K_BACKSPACE:
+                            my_board.clear(row, col)
+                        # checks for the row of numbers and the keypad numbers
+
+                        elif event.key == pygame.K_2 or event.key == pygame.K_KP2:
+                            my_board.clear(row, col)
+                            my_board.sketch("2", row, col)
+
+                        elif event.key == pygame.K_3 or event.key == pygame.K_KP3:
+                            my_board.clear(row, col)
+                            my_board.sketch("3", row, col)
+
+                        elif event.key == pygame.K_4 or event.key == pygame.K_KP4:
+                            my_board.clear(row, col)
+                            my_board.sketch("4", row, col)
+
+
+                        elif event.key == pygame.K_5 or event.key == pygame.K_KP5:
+                            my_board.clear(row, col)
+                            my_board.sketch("5", row, col)
+
+                        elif event.key == pygame.K_6 or event.key == pygame.K_KP6:
+                            my_board.clear(row, col)
+                            my_board.sketch("6", row, col)
+
+                        elif event.key == pygame.K_7 or event.key == pygame.K_KP7:
+                            my_board.clear(row, col)
+                            my_board.sketch("7", row, col)
+
+                        elif event.key == pygame.K_8 or event.key == pygame.K_KP8:
+                            my_board.clear(row, col)
+                            my_board.sketch("8", row, col)
+
+                        elif event.key == pygame.K_9 or event.key == pygame.K_KP9:
+                            my_board.clear(row, col)
+                            my_board.sketch("9", row, col)
+
+                        # letters are the numbers past 9 on bigger boards: a = 10, b = 11, ...
+                        elif pygame.K_a <= event.key <= pygame.K_z and event.key - pygame.K_a + 10 <= my_board.size:
+                            my_board.clear(row, col)
+                            my_board.sketch(str(event.key - pygame.K_a + 10), row, col)
+
+                        my_board.cells[row][col].draw()  # draws the cell again with its new number
+                        dirty_rects.append(my_board.select(row, col))  # this is here because we want the selection box to still show
+
+                        if event.key == pygame.K_RETURN or event.key == pygame.K_KP_ENTER:
+                            if value != None:
+                                if my_board.cells[row][col].sketched_value != None:
+                                    my_board.clear(row, col)
+                                    my_board.place_number(str(value), row, col)
+                                    my_board.cells[row][col].draw()
+
+                if event.type == pygame.KEYDOWN and my_board is not None:  # if a key is pressed
+                    # my_board.draw() >> can't put here because it'll clear the box for any key pressed
+                    old_row, old_col = row, col
+
+                    # F2 >> switch the auto candidates on/off
+                    if event.key == pygame.K_F2:
+                        my_board.show_candidates(my_board.model.candidates is None)
+                        draw_game(my_board, screen)
+                        if var:
+                            my_board.select(row, col)
+                        full_update = True
+
+                    # Ctrl+Z >> undo, Ctrl+Y (or Ctrl+Shift+Z) >> redo
+                    if event.mod & pygame.KMOD_CTRL and event.key in (pygame.K_z, pygame.K_y):
+                        if event.key == pygame.K_y or event.mod & pygame.KMOD_SHIFT:
+                            dirty_rects.extend(my_board.redo())
+                        else:
+                            dirty_rects.extend(my_board.undo())
+                        if var:
+                            my_board.select(row, col)  # keeps the selection box on the current cell
+
+                    # F1 >> hint: select the next logical cell and sketch its number there
+                    if event.key == pygame.K_F1:
+                        hint = my_board.hint()
+                        if hint is not None:
+                            var = 1
+                            row, col, hint_value = hint[0], hint[1], hint[2]
+                            my_board.clear(row, col)
+                            my_board.sketch(str(hint_value), row, col)
+                            my_board.cells[row][col].draw()
+                            dirty_rects.append(my_board.cell_rect(row, col))
+                    if event.key == pygame.K_UP:
+                        # Move the selection box up
+                        var = 1
+                        if row > 0:
+                            row -= 1
+                    elif event.key == pygame.K_DOWN:
+                        # Move the selection box down
+                        var = 1
+                        if row < my_board.size - 1:
+                            row += 1
+                    elif event.key == pygame.K_LEFT:
+                        # Move the selection box left
+                        var = 1
+                        if col > 0:
+                            col -= 1
+                    elif event.key == pygame.K_RIGHT:
+                        # Move the selection box right
+                        var = 1
+                        if col < my_board.size - 1:
+                            col += 1
+                    if (row, col) != (old_row, old_col):
+                        dirty_rects.append(my_board.unselect(old_row, old_col))
+                        dirty_rects.append(my_board.select(row, col))
+
+                if event.type == pygame.MOUSEBUTTONDOWN and in_game_button_used and my_board is not None:
+                    x, y = pygame.mouse.get_pos()
+                    # If the user selects the RESET button
+                    if 120 <= x <= 200 and 630 <= y <= 670:
+                        my_board.reset_to_original()
+                        draw_game(my_board, screen)
+                        full_update = True
+
+                    # If the user selects the RESTART button
+                    if 260 <= x <= 360 and 630 <= y <= 670:
+                        game_start_screen = True
+                        screen.fill('pink')  # Clear the screen
+                        full_update = True
+                        my_board = None  # Reset the board object
+                        var = 0
+                        screen_drawn = False
+                        pygame.event.post(pygame.event.Event(pygame.USEREVENT))  # so the welcome screen gets drawn
+
+                    # If the user selects the EXIT button
+                    if 420 <= x <= 500 and 630 <= y <= 670:
+                        pygame.quit()
+                        sys.exit()
+
+                if my_board is not None:
+                    if my_board.is_full():
+                        if my_board.save is not None:  # the game is over either way, nothing to resume
+                            save.discard()
+                            my_board.save = None
+
+                        if my_board.check_board() is True:
+                            game_won_screen = True
+
+                        elif my_board.check_board() is False:
+                            game_over_screen = True
+
+                        # the end screens are only drawn once, so the board's clicks and keys must not draw over them
+                        my_board = None
+                        var = 0
+
+                if game_won_screen:
+                    if not screen_drawn:
+                        pygame.time.delay(500)
+                        screen.blit(assets.image("happy_frenchie.png"), (0, 0))
+                        game_over_font = get_font(80)
+                        game_won_surf = game_over_font.render("Game Won!", 0, 'magenta3')
+                        game_won_rect = game_won_surf.get_rect(center=(306, 200))
+                        screen.blit(game_won_surf, game_won_rect)
+
+                        difficulty_button(80, 40, 420, 630, "EXIT", screen)  # exit
+                        screen_drawn = True
+                        full_update = True
+                    x, y = pygame.mouse.get_pos()
+                    # If the user selects the EXIT button
+                    if 420 <= x <= 500 and 630 <= y <= 670:
+                        pygame.quit()
+                        sys.exit()
+
+
+                if game_over_screen:
+                    if not screen_drawn:
+                        pygame.time.delay(500)
+                        screen.blit(assets.image("side_eye_frenchie.png"), (0, 0))
+                        game_over_font = get_font(80)
+                        game_over_surf = game_over_font.render("Game Over...", 0, 'magenta3')
+                        game_over_rect = game_over_surf.get_rect(center=(200, 100))
+                        screen.blit(game_over_surf, game_over_rect)
+
+                        difficulty_button(100, 40, 260, 630, "RESTART", screen)  # restart
+                        screen_drawn = True
+                        full_update = True
+                    x, y = pygame.mouse.get_pos()
+                    if 260 <= x <= 360 and 630 <= y <= 670:
+                        game_over_screen = False
+                        game_won_screen = False
+                        game_start_screen = True
+                        my_board = None
+                        var = 0
+                        screen_drawn = False
+                        pygame.event.post(pygame.event.Event(pygame.USEREVENT))  # so the welcome screen gets drawn
+
+
+            # the events are handled and drawn onto the screen surface together (a handler draws what it changes)
+            draw_end = time.perf_counter()
             if my_board is not None:
-                if my_board.is_full():
-
-                    if my_board.check_board() is True:
-                        game_won_screen = True
-
-                    elif my_board.check_board() is False:
-                        game_over_screen = True
-
-            if game_won_screen:
-                pygame.time.delay(500)
-                game_won = pygame.image.load("happy_frenchie.png")
-                screen.blit(game_won, (0, 0))
-                game_over_font = pygame.font.Font(None, 80)
-                game_won_surf = game_over_font.render("Game Won!", 0, 'magenta3')
-                game_won_rect = game_won_surf.get_rect(center=(306, 200))
-                screen.blit(game_won_surf, game_won_rect)
-
-                difficulty_button(80, 40, 420, 630, "EXIT", screen)  # exit
-                x, y = pygame.mouse.get_pos()
-                # If the user selects the EXIT button
-                if 420 <= x <= 500 and 630 <= y <= 670:
-                    pygame.quit()
-                    sys.exit()
-
-
-            if game_over_screen:
-                pygame.time.delay(500)
-                game_over = pygame.image.load("side_eye_frenchie.png")
-                screen.blit(game_over, (0, 0))
-                game_over_font = pygame.font.Font(None, 80)
-                game_over_surf = game_over_font.render("Game Over...", 0, 'magenta3')
-                game_over_rect = game_over_surf.get_rect(center=(200, 100))
-                screen.blit(game_over_surf, game_over_rect)
-
-                difficulty_button(100, 40, 260, 630, "RESTART", screen)  # restart
-                x, y = pygame.mouse.get_pos()
-                if 260 <= x <= 360 and 630 <= y <= 670:
-                    game_over_screen = False
-                    game_won_screen = False
-                    game_start_screen = True
-                    my_board = None
-
-
-            pygame.display.update()
+                dirty_rects.extend(my_board.take_dirty())  # e.g. candidates of the peers of a changed cell
+            if my_board is not None and my_board.save is not None:
+                if var:
+                    save.select(row, col)
+                else:
+                    save.select(None, None)
+                save.flush()  # this frame's moves go to the journal in one append
+
+            render_start = time.perf_counter()
+            if full_update:
+                pygame.display.update()
+            elif dirty_rects:
+                pygame.display.update(dirty_rects)
+
+            frame_end = time.perf_counter()
+            stats.add_frame(frame_end - frame_start)
+            if profiler is not None:
+                profiler.record("draw", frame_start, draw_end, "frame")  # handling the events and drawing them
+                profiler.record("render", render_start, frame_end, "frame")  # pushing the drawn areas to the display
+                profiler.record("frame", frame_start, frame_end, "frame")
+            if show_stats and stats.report_due():
+                print(stats.report())
+            clock.tick(max_fps)  # frame cap, sleeps if this frame came too soon after the last one
+    finally:
+        save.close()  # the save stays on disk for RESUME
+        if show_stats:
+            print(stats.report())
+        if profiler is not None:
+            profiling.disable()
+            profiler.write(profile)
+            print(f"profile written to {profile}.json and {profile}.trace.json")
 
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    import argparse
+    parser = argparse.ArgumentParser(description="French Bulldog themed Sudoku")
+    parser.add_argument("--fps", type=int, default=60, help="frame cap (default 60)")
+    parser.add_argument("--stats", action="store_true", help="print frame time and CPU statistics")
+    parser.add_argument("--profile", metavar="PREFIX", help="profile the game, writes PREFIX.json and PREFIX.trace.json")
+    args = parser.parse_args()
+    main(args.fps, args.stats, args.profile)
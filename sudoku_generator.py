@@ -1,4 +1,11 @@
 import math, random
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from itertools import islice
+import os, sys, time
+import profiling
+from sudoku_grader import PuzzleGrader, LEVELS
+from sudoku_solver import SudokuSolver
 #from sudoku import *
 # Maddy - I commented this so you guys can test that this code works
 #if line 2 is not commented, it won't print anything
@@ -11,22 +18,36 @@ class SudokuGenerator:
     self.removed_cells	- the total number of cells to be removed
     self.board			- a 2D list of ints to represent the board
     self.box_length		- the square root of row_length
+    self.row_masks		- bitmask of the digits used in each row (bit num is set if num is used)
+    self.col_masks		- bitmask of the digits used in each column
+    self.box_masks		- bitmask of the digits used in each box (boxes are numbered left to right, top to bottom)
+    self.rng			- where the random numbers come from
+    self.profiler		- the profiling.Profiler counting what the generator does, None when profiling is off
 
     Parameters:
-    row_length is the number of rows/columns of the board (always 9 for this project)
+    row_length is the number of rows/columns of the board (9, 16 or 25 - it has to be a perfect square)
     removed_cells is an integer value - the number of cells to be removed
+    rng is optional - a random.Random to generate with, so the same seed always gives the same board
+    (defaults to the global random module)
+    profiler is optional - a profiling.Profiler to count into (defaults to profiling.active)
 
     Return:
     None
     """
-    def __init__(self, row_length, removed_cells):
+    def __init__(self, row_length, removed_cells, rng=None, profiler=None):
         self.row_length = row_length
         self.removed_cells = removed_cells
-        self.grid = [[0] * 9 for _ in range(9)]  # done by Sabrina for the valid_in_col and _row functions
+        self.rng = rng if rng is not None else random
+        self.profiler = profiler if profiler is not None else profiling.active
 
-        self.board = [[0 for row in range(9)] for col in range(9)]
+        self.board = [[0 for row in range(row_length)] for col in range(row_length)]
         self.box_length = int((row_length) ** 0.5)
 
+        # the masks are kept up to date by place_value and remove_value so checking a candidate is O(1)
+        self.row_masks = [0] * row_length
+        self.col_masks = [0] * row_length
+        self.box_masks = [0] * row_length
+
     '''
 	Returns a 2D python list of numbers which represents the board
 
@@ -35,7 +56,7 @@ class SudokuGenerator:
     '''
 
     def get_board(self):
-        return [[self.board[row][col] for row in range(9)] for col in range(9)]
+        return [[self.board[row][col] for row in range(self.row_length)] for col in range(self.row_length)]
 
     '''
 	Displays the board to the console
@@ -64,7 +85,7 @@ class SudokuGenerator:
 
     # Check if num is already present in the specified row
     def valid_in_row(self, row, num):
-        return num not in self.grid[row]
+        return not self.row_masks[row] & (1 << num)
 
     '''
 	Determines if num is contained in the specified column (vertical) of the board
@@ -78,37 +99,75 @@ class SudokuGenerator:
     '''
 
     def valid_in_col(self, col, num):  # Check if num is already present in the specified column
-        for row in range(9):
-            if self.grid[row][col] == num:
-                return False
-        return True
+        return not self.col_masks[col] & (1 << num)
 
     '''
-	Determines if num is contained in the 3x3 box specified on the board
+	Determines if num is contained in the box specified on the board
     If num is in the specified box starting at (row_start, col_start), return False.
     Otherwise, return True
 
 	Parameters:
 	row_start and col_start are the starting indices of the box to check
-	i.e. the box is from (row_start, col_start) to (row_start+2, col_start+2)
+	i.e. the box is from (row_start, col_start) to (row_start+box_length-1, col_start+box_length-1)
 	num is the value we are looking for in the box
 
 	Return: boolean
     '''
 
     def valid_in_box(self, row_start, col_start, num):
-        for row in range(row_start, row_start + 3):
-            for col in range(col_start, col_start + 3):
-                if self.board[row][col] == num:
-                    return False
-        return True
+        return not self.box_masks[self.box_index(row_start, col_start)] & (1 << num)
 
     def unused_in_box(self, row_start, col_start, num):
-        for row in range(row_start, row_start + 3):
-            for col in range(col_start, col_start + 3):
-                if self.board[row][col] == num:
-                    return False
-        return True
+        return self.valid_in_box(row_start, col_start, num)
+
+    '''
+    Returns the index of the box that contains (row, col)
+    Boxes are numbered left to right, top to bottom starting at 0
+
+	Parameters:
+	row and col are the row index and col index of a cell in the board
+
+	Return: int
+    '''
+
+    def box_index(self, row, col):
+        return (row // self.box_length) * self.box_length + col // self.box_length
+
+    '''
+    Puts num at (row, col) in the board and marks it as used in the row, column and box masks
+
+	Parameters:
+	row and col are the row index and col index of the cell
+	num is the value to put in the cell
+
+	Return: None
+    '''
+
+    def place_value(self, row, col, num):
+        bit = 1 << num
+        self.board[row][col] = num
+        self.row_masks[row] |= bit
+        self.col_masks[col] |= bit
+        self.box_masks[self.box_index(row, col)] |= bit
+
+    '''
+    Sets (row, col) back to 0 and frees its old value in the row, column and box masks
+
+	Parameters:
+	row and col are the row index and col index of the cell
+
+	Return: None
+    '''
+
+    def remove_value(self, row, col):
+        num = self.board[row][col]
+        if num == 0:
+            return
+        bit = ~(1 << num)
+        self.board[row][col] = 0
+        self.row_masks[row] &= bit
+        self.col_masks[col] &= bit
+        self.box_masks[self.box_index(row, col)] &= bit
 
     '''
     Determines if it is valid to enter num at (row, col) in the board 
@@ -122,47 +181,19 @@ class SudokuGenerator:
     '''
 
     def is_valid(self, row, col, num):
-        if num < 1 or num > 9:
+        if num < 1 or num > self.row_length:
             return False
-        for r in range(9):
-            if self.board[r][col] == num:
-                return False
-        for c in range(9):
-            if self.board[row][c] == num:
-                return False
-        if 0 <= row <= 2 and 0 <= col <= 2:
-            row_start, col_start = 0, 0
-        elif 3 <= row <= 5 and 0 <= col <= 2:
-            row_start, col_start = 3, 0
-        elif 6 <= row <= 8 and 0 <= col <= 2:
-            row_start, col_start = 6, 0
-        elif 0 <= row <= 2 and 3 <= col <= 5:
-            row_start, col_start = 0, 3
-        elif 3 <= row <= 5 and 3 <= col <= 5:
-            row_start, col_start = 3, 3
-        elif 6 <= row <= 8 and 3 <= col <= 5:
-            row_start, col_start = 6, 3
-        elif 0 <= row <= 2 and 6 <= col <= 8:
-            row_start, col_start = 0, 6
-        elif 3 <= row <= 5 and 6 <= col <= 8:
-            row_start, col_start = 3, 6
-        elif 6 <= row <= 8 and 6 <= col <= 8:
-            row_start, col_start = 6, 6
-        else:
-            row_start, col_start = 10, 10  # this will never happen
-
-        if not self.unused_in_box(row_start, col_start, num):
-            return False
-
-        return True
+        used = self.row_masks[row] | self.col_masks[col] | self.box_masks[self.box_index(row, col)]
+        return not used & (1 << num)
 
     def generate_random_num(self):
-        num = random.randint(1, 9)
+        num = self.rng.randint(1, self.row_length)
         return num
 
     '''
-    Fills the specified 3x3 box with values
-    For each position, generates a random digit which has not yet been used in the box
+    Fills the specified box with values
+    The digits 1 to row_length are shuffled once and laid into the box in that order,
+    so every digit is used exactly once without drawing random numbers until an unused one comes up
 
 	Parameters:
 	row_start and col_start are the starting indices of the box to check
@@ -172,34 +203,73 @@ class SudokuGenerator:
     '''
 
     def fill_box(self, row_start, col_start):
-        for row in range(row_start, row_start + 3):
-            for col in range(col_start, col_start + 3):
-                num = self.generate_random_num()
-                while True:
-                    if self.unused_in_box(row_start, col_start, num):
-                        self.board[row][col] = num
-                        break
-                    else:
-                        num = self.generate_random_num()
+        digits = list(range(1, self.row_length + 1))
+        self.rng.shuffle(digits)
+        digits = iter(digits)
+        for row in range(row_start, row_start + self.box_length):
+            for col in range(col_start, col_start + self.box_length):
+                self.place_value(row, col, next(digits))
 
     '''
     Fills the three boxes along the main diagonal of the board
-    These are the boxes which start at (0,0), (3,3), and (6,6)
+    These are the boxes which start at (0,0), (3,3), and (6,6) on a 9x9 board
 
 	Parameters: None
 	Return: None
     '''
 
     def fill_diagonal(self):
-        for i in range(0, 9, 3):  # Loop over the main diagonal starting points
+        for i in range(0, self.row_length, self.box_length):  # Loop over the main diagonal starting points
             self.fill_box(i, i)
 
     '''
-    DO NOT CHANGE
-    Provided for students
+    Lists the cells fill_remaining has to fill, in the order it fills them
+    This walks the board the same way the original recursive fill_remaining did,
+    skipping over the boxes that fill_diagonal already filled
+
+	Parameters:
+	row, col specify the coordinates of the first empty (0) cell
+
+	Return: list[tuple] of (row, col, box index)
+    '''
+
+    def remaining_cells(self, row, col):
+        cells = []
+        while True:
+            if col >= self.row_length and row < self.row_length - 1:
+                row += 1
+                col = 0
+            if row >= self.row_length and col >= self.row_length:
+                return cells
+            if row < self.box_length:
+                if col < self.box_length:
+                    col = self.box_length
+            elif row < self.row_length - self.box_length:
+                if col == int(row // self.box_length * self.box_length):
+                    col += self.box_length
+            else:
+                if col == self.row_length - self.box_length:
+                    row += 1
+                    col = 0
+                    if row >= self.row_length:
+                        return cells
+            cells.append((row, col, self.box_index(row, col)))
+            col += 1
+
+    '''
+    Provided for students (rewritten to use the row/col/box masks)
     Fills the remaining cells of the board
     Should be called after the diagonal boxes have been filled
 
+    This is the same backtracking as before: cells are filled in the same order and
+    each cell tries its candidates from 1 up to row_length, so a given seed still
+    produces the same board. It just runs as a loop over an explicit stack of the
+    candidates left at each cell instead of recursing, and checks candidates with the masks.
+
+    When profiling, it counts its calls, backtracks (dead ends it had to step back from),
+    placements (digits tried), candidate checks (one mask check per cell entered, this is what
+    used to be an is_valid call per digit) and the deepest it got (what used to be the recursion depth).
+
 	Parameters:
 	row, col specify the coordinates of the first empty (0) cell
 
@@ -208,31 +278,73 @@ class SudokuGenerator:
     '''
 
     def fill_remaining(self, row, col):
-        if col >= self.row_length and row < self.row_length - 1:
-            row += 1
-            col = 0
-        if row >= self.row_length and col >= self.row_length:
-            return True
-        if row < self.box_length:
-            if col < self.box_length:
-                col = self.box_length
-        elif row < self.row_length - self.box_length:
-            if col == int(row // self.box_length * self.box_length):
-                col += self.box_length
-        else:
-            if col == self.row_length - self.box_length:
-                row += 1
-                col = 0
-                if row >= self.row_length:
-                    return True
+        cells = self.remaining_cells(row, col)
+        board, row_masks, col_masks, box_masks = self.board, self.row_masks, self.col_masks, self.box_masks
+        full = (1 << (self.row_length + 1)) - 2
+        total = len(cells)
+        left = [0] * total  # candidates still to try at each cell (lowest digit first)
+        placed = [0] * total  # bit of the digit currently placed at each cell
+        k = 0
+        backtracks = 0
+        fresh = True  # True when we just moved forward onto cells[k]
+        while k < total:
+            r, c, b = cells[k]
+            if fresh:
+                candidates = full & ~(row_masks[r] | col_masks[c] | box_masks[b])
+            else:  # we came back here after a dead end, so undo this cell first
+                bit = placed[k]
+                row_masks[r] ^= bit
+                col_masks[c] ^= bit
+                box_masks[b] ^= bit
+                candidates = left[k]
+            if not candidates:
+                board[r][c] = 0
+                k -= 1
+                backtracks += 1
+                if k < 0:
+                    if self.profiler is not None:
+                        self.count_fill(total, placed, backtracks, False)
+                    return False
+                fresh = False
+                continue
+            bit = candidates & -candidates
+            left[k] = candidates ^ bit
+            placed[k] = bit
+            board[r][c] = bit.bit_length() - 1
+            row_masks[r] |= bit
+            col_masks[c] |= bit
+            box_masks[b] |= bit
+            k += 1
+            fresh = True
+        if self.profiler is not None:
+            self.count_fill(total, placed, backtracks, True)
+        return True
 
-        for num in range(1, self.row_length + 1):
-            if self.is_valid(row, col, num):
-                self.board[row][col] = num
-                if self.fill_remaining(row, col + 1):
-                    return True
-                self.board[row][col] = 0
-        return False
+    '''
+    Adds the counters of one fill_remaining run to the profiler
+    Everything is worked out from what the loop keeps anyway, so the loop itself only counts backtracks:
+    every step forward places a digit and every backtrack steps back one cell, so the placements are
+    the backtracks plus how far it ended up (total cells, or -1 when it failed). placed[i] is only
+    ever set once cell i has been reached, so the deepest cell reached is the last one that is set.
+
+	Parameters:
+	total is the number of cells fill_remaining had to fill
+	placed is its list of the digit bits placed at each cell
+	backtracks is how many times it stepped back
+	solved is whether it filled the board
+
+	Return: None
+    '''
+
+    def count_fill(self, total, placed, backtracks, solved):
+        profiler = self.profiler
+        placements = backtracks + (total if solved else -1)
+        depth = total if solved else next((i + 1 for i in range(total - 1, -1, -1) if placed[i]), 0)
+        profiler.count("fill_remaining.calls")
+        profiler.count("fill_remaining.backtracks", backtracks)
+        profiler.count("fill_remaining.placements", placements)
+        profiler.count("fill_remaining.candidate_checks", placements + (0 if solved else 1))
+        profiler.maximum("fill_remaining.max_depth", depth)
 
     '''
     DO NOT CHANGE
@@ -244,8 +356,40 @@ class SudokuGenerator:
     '''
 
     def fill_values(self):
-        self.fill_diagonal()
-        self.fill_remaining(0, self.box_length)
+        if self.row_length > 9:
+            with profiling.span(self.profiler, "fill_pattern"):
+                self.fill_pattern()  # backtracking blows up on 16x16 and 25x25 boards
+            return
+        with profiling.span(self.profiler, "fill_diagonal"):
+            self.fill_diagonal()
+        with profiling.span(self.profiler, "fill_remaining"):
+            self.fill_remaining(0, self.box_length)
+
+    '''
+    Fills the whole board without any backtracking, used for boards bigger than 9x9
+    Starts from the standard pattern solution (each row is the row above shifted by box_length,
+    and each band shifted by one more), then shuffles it with moves that keep it a valid sudoku:
+    relabeling the digits, swapping rows inside a band, swapping whole bands, the same for columns
+    and stacks, and transposing. This costs O(row_length^2) however big the board is.
+    The price is variety: every 16x16 and 25x25 solution is one of the shuffles of that single
+    pattern grid, a tiny corner of all the valid grids of that size (9x9 boards still backtrack).
+
+	Parameters: None
+	Return: None
+    '''
+
+    def fill_pattern(self):
+        n, b = self.row_length, self.box_length
+
+        rng = self.rng
+        digits = list(range(1, n + 1))
+        rng.shuffle(digits)
+        rows, cols = shuffled_lines(b, rng), shuffled_lines(b, rng)
+        transpose = rng.random() < 0.5
+        for row in range(n):
+            for col in range(n):
+                r, c = (cols[col], rows[row]) if transpose else (rows[row], cols[col])
+                self.place_value(row, col, digits[(b * (r % b) + r // b + c) % n])
 
     '''
     Removes the appropriate number of cells from the board
@@ -265,14 +409,138 @@ class SudokuGenerator:
         cells_to_remove = self.removed_cells
         cells_already_removed = set()
         while len(cells_already_removed) < cells_to_remove:
-            row = random.randint(0, len(self.board) - 1)  # Generate random coordinates
-            col = random.randint(0, len(self.board[0]) - 1)
+            row = self.rng.randint(0, len(self.board) - 1)  # Generate random coordinates
+            col = self.rng.randint(0, len(self.board[0]) - 1)
 
             if (row, col) not in cells_already_removed:  # Check if the cell is not already removed
-                self.board[row][col] = 0  # Remove the cell by setting its value to 0
+                self.remove_value(row, col)  # Remove the cell by setting its value to 0
                 cells_already_removed.add((row, col))  # Add the removed cell to the set
 
 
+    '''
+    Counts the solutions of the current board, stopping as soon as limit solutions are found
+    Always picks the empty cell with the fewest candidates next, so cells with only one
+    possible digit get filled straight away and the search stays small.
+    The board and the masks are left exactly as they were.
+
+	Parameters:
+	limit is how many solutions to look for before giving up (2 is enough to tell if a puzzle is unique)
+
+	Return: int (the number of solutions found, at most limit)
+    '''
+
+    def count_solutions(self, limit=2):
+        board, row_masks, col_masks, box_masks = self.board, self.row_masks, self.col_masks, self.box_masks
+        full = (1 << (self.row_length + 1)) - 2
+        empty = [(r, c, self.box_index(r, c))
+                 for r in range(self.row_length) for c in range(self.row_length) if board[r][c] == 0]
+
+        def search(count):
+            if not empty:
+                return count + 1
+            # find the most constrained empty cell
+            best_index, best_candidates, best_size = -1, 0, self.row_length + 1
+            for i, (r, c, b) in enumerate(empty):
+                candidates = full & ~(row_masks[r] | col_masks[c] | box_masks[b])
+                size = candidates.bit_count()
+                if size < best_size:
+                    best_index, best_candidates, best_size = i, candidates, size
+                    if size <= 1:
+                        break
+            if best_size == 0:
+                return count
+            r, c, b = empty[best_index]
+            empty[best_index] = empty[-1]  # swap-remove the chosen cell
+            empty.pop()
+            candidates = best_candidates
+            while candidates and count < limit:
+                bit = candidates & -candidates
+                candidates ^= bit
+                row_masks[r] |= bit
+                col_masks[c] |= bit
+                box_masks[b] |= bit
+                count = search(count)
+                row_masks[r] ^= bit
+                col_masks[c] ^= bit
+                box_masks[b] ^= bit
+            # put the cell back where it was so the caller sees the list unchanged
+            if best_index < len(empty):
+                empty.append(empty[best_index])
+                empty[best_index] = (r, c, b)
+            else:
+                empty.append((r, c, b))
+            return count
+
+        return search(0)
+
+    '''
+    Removes cells like remove_cells, but only keeps a removal if the puzzle still has exactly one solution
+    Cells are tried in a random order. If a removal would allow a second solution the value is put back
+    and that cell is never tried again. If every cell has been tried before reaching removed_cells
+    (only happens when asking for a lot of removed cells) the board is left with as many as could be removed.
+    Only practical on 9x9 boards (see generate_sudoku).
+
+	Parameters: None
+	Return: int (the number of cells actually removed)
+    '''
+
+    def remove_cells_unique(self):
+        positions = [(row, col) for row in range(self.row_length) for col in range(self.row_length)]
+        self.rng.shuffle(positions)
+        removed = 0
+        for row, col in positions:
+            if removed >= self.removed_cells:
+                break
+            num = self.board[row][col]
+            self.remove_value(row, col)
+            if self.count_solutions(2) == 1:
+                removed += 1
+            else:
+                self.place_value(row, col, num)
+        return removed
+
+    '''
+    Removes cells with remove_cells_unique if unique is True, remove_cells otherwise
+    (timed as a phase when profiling)
+
+	Parameters:
+	unique is whether the puzzle has to keep exactly one solution
+
+	Return: None
+    '''
+
+    def remove(self, unique=False):
+        if unique:
+            with profiling.span(self.profiler, "remove_cells_unique"):
+                self.remove_cells_unique()
+        else:
+            with profiling.span(self.profiler, "remove_cells"):
+                self.remove_cells()
+
+
+'''
+Returns a random order of the rows (or columns) of a board that keeps it a valid sudoku:
+the bands are shuffled, then the rows inside each band
+Used by fill_pattern and grid_symmetry
+
+Parameters:
+box_length is the square root of the board size
+rng is the random.Random (or the random module) to shuffle with
+
+Return: list[int] (the old row at each new position)
+'''
+
+def shuffled_lines(box_length, rng):
+    bands = list(range(box_length))
+    rng.shuffle(bands)
+    lines = []
+    for band in bands:
+        inside = list(range(box_length))
+        rng.shuffle(inside)
+        lines.extend(band * box_length + line for line in inside)
+    return lines
+
+
 '''
 DO NOT CHANGE
 Provided for students
@@ -283,16 +551,500 @@ Given a number of rows and number of cells to remove, this function:
 4. returns the representative 2D Python Lists of the board and solution
 
 Parameters:
-size is the number of rows/columns of the board (9 for this project)
+size is the number of rows/columns of the board (9, 16 or 25)
 removed is the number of cells to clear (set to 0)
+unique is optional - if True, cells are only removed while the puzzle keeps exactly one solution
+(see SudokuGenerator.remove_cells_unique). Only practical on 9x9 boards: on 16x16 and 25x25 boards every
+removal runs a solution count that can search for minutes, so the big boards don't finish in any reasonable time.
+grade is optional - one of the sudoku_grader levels ("easy", "medium", "hard", "expert", "evil");
+if given, unique puzzles are generated until one grades at that level (9x9 only, see generate_graded_sudoku)
+rng is optional - a random.Random to generate with (see SudokuGenerator)
 
 Return: list[list] (a 2D Python list to represent the board)
 '''
 
-def generate_sudoku(size, removed):
-    sudoku = SudokuGenerator(size, removed)
+def generate_sudoku(size, removed, unique=False, grade=None, rng=None):
+    if grade is not None:
+        return generate_graded_sudoku(size, removed, grade, rng)
+    sudoku = SudokuGenerator(size, removed, rng)
     sudoku.fill_values()
-    board = sudoku.get_board()
-    sudoku.remove_cells()
+    sudoku.remove(unique)
     board = sudoku.get_board()
     return board
+
+
+# how many puzzles generate_graded_sudoku tries before giving up
+GRADE_ATTEMPTS = 500
+
+'''
+Generates unique puzzles until one grades at the requested level
+Not every level can be reached with every removed count (e.g. 30 removed cells
+almost never needs more than singles), so this gives up after GRADE_ATTEMPTS tries.
+Only 9x9 boards can be graded, they are the only ones that can be unique (see generate_sudoku).
+
+Parameters:
+size is the number of rows/columns of the board (must be 9)
+removed is the number of cells to clear (set to 0)
+grade is the level wanted, one of sudoku_grader.LEVELS
+rng is optional - a random.Random to generate with (see SudokuGenerator)
+
+Return: list[list] (a 2D Python list to represent the board)
+'''
+
+def generate_graded_sudoku(size, removed, grade, rng=None):
+    if grade not in LEVELS:
+        raise ValueError(f"grade must be one of {LEVELS}, not {grade!r}")
+    if size != 9:
+        raise ValueError(f"only 9x9 puzzles can be graded, not {size}x{size}")
+    grader = PuzzleGrader(size)
+    for attempt in range(GRADE_ATTEMPTS):
+        board = generate_sudoku(size, removed, unique=True, rng=rng)
+        if grader.grade(board)["level"] == grade:
+            return board
+    raise ValueError(f"no {grade} puzzle with {removed} removed cells found in {GRADE_ATTEMPTS} tries")
+
+
+'''
+Builds one puzzle from a batch, reproducibly
+The puzzle gets its own random.Random seeded from (seed, index), so puzzle number index always
+comes out the same no matter which process builds it or what was generated before it.
+
+Parameters:
+seed is the base seed of the batch
+index is the position of this puzzle in the batch
+size is the number of rows/columns of the board
+removed is an int, a list/tuple of ints to pick from evenly, or a dict of {removed: weight}
+unique is passed through to remove_cells_unique (see generate_sudoku)
+
+Return: tuple (index, board, solution) where board and solution are 2D Python lists
+'''
+
+def generate_seeded_sudoku(seed, index, size, removed, unique=False):
+    rng = random.Random(f"{seed}:{index}")
+    if isinstance(removed, dict):
+        removed = rng.choices(list(removed), weights=list(removed.values()))[0]
+    elif isinstance(removed, (list, tuple)):
+        removed = rng.choice(removed)
+    sudoku = SudokuGenerator(size, removed, rng)
+    sudoku.fill_values()
+    solution = sudoku.get_board()
+    sudoku.remove(unique)
+    return index, sudoku.get_board(), solution
+
+
+# puzzle IDs: everything needed to build a puzzle again, packed into 14 characters
+# the number is version (2 bits) | size (2 bits: 9, 16, 25) | unique (1 bit) | removed (10 bits) | seed (48 bits),
+# written in Crockford base32 (no I, L, O or U, so it reads back even if typed in wrong case) plus a check character
+ID_ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+ID_VERSION = 1
+ID_SIZES = (9, 16, 25)
+ID_SEED_BITS = 48
+ID_LENGTH = 13  # characters before the check character
+
+def id_check_character(text):
+    return ID_ALPHABET[sum((position + 1) * ID_ALPHABET.index(char) for position, char in enumerate(text)) % 32]
+
+
+'''
+Makes the ID of the puzzle that generate_from_id builds from these parameters
+
+Parameters:
+seed is an int from 0 to 2**48 - 1 (None picks a random one)
+size is the number of rows/columns of the board (9, 16 or 25)
+removed is the number of cells to clear
+unique is whether the puzzle only has one solution (see generate_sudoku)
+
+Return: str
+'''
+
+def make_puzzle_id(seed=None, size=9, removed=40, unique=True):
+    if seed is None:
+        seed = random.SystemRandom().getrandbits(ID_SEED_BITS)
+    if not 0 <= seed < 1 << ID_SEED_BITS:
+        raise ValueError(f"seed must be from 0 to 2**{ID_SEED_BITS} - 1")
+    if size not in ID_SIZES:
+        raise ValueError(f"size must be one of {ID_SIZES}")
+    if not 0 <= removed < min(size * size, 1024):
+        raise ValueError("bad removed count")
+    number = ID_VERSION << 61 | ID_SIZES.index(size) << 59 | int(unique) << 58 | removed << 48 | seed
+    text = ""
+    for _ in range(ID_LENGTH):
+        number, digit = divmod(number, 32)
+        text = ID_ALPHABET[digit] + text
+    return text + id_check_character(text)
+
+
+'''
+Reads a puzzle ID made by make_puzzle_id back into its parameters
+Lower case and the look-alike letters I, L and O are accepted, and so are dashes and spaces.
+
+Parameters:
+puzzle_id is the ID
+
+Return: dict with seed, size, removed and unique (raises ValueError if the ID is not valid)
+'''
+
+def parse_puzzle_id(puzzle_id):
+    text = puzzle_id.upper().replace("-", "").replace(" ", "")
+    text = text.replace("I", "1").replace("L", "1").replace("O", "0")
+    if len(text) != ID_LENGTH + 1 or any(char not in ID_ALPHABET for char in text):
+        raise ValueError(f"not a puzzle ID: {puzzle_id!r}")
+    if id_check_character(text[:-1]) != text[-1]:
+        raise ValueError(f"puzzle ID {puzzle_id!r} has a typo in it")
+    number = 0
+    for char in text[:-1]:
+        number = number * 32 + ID_ALPHABET.index(char)
+    size_code = number >> 59 & 3
+    if number >> 61 != ID_VERSION or size_code >= len(ID_SIZES):
+        raise ValueError(f"not a puzzle ID: {puzzle_id!r}")
+    return {
+        "seed": number & ((1 << ID_SEED_BITS) - 1),
+        "size": ID_SIZES[size_code],
+        "removed": number >> 48 & 1023,
+        "unique": bool(number >> 58 & 1),
+    }
+
+
+'''
+Builds the puzzle a puzzle ID stands for - the same ID always gives the same puzzle, so puzzles can be
+shared or served (e.g. a daily challenge) by ID without storing them anywhere
+
+Parameters:
+puzzle_id is an ID from make_puzzle_id
+
+Return: tuple (board, solution) of 2D Python lists
+'''
+
+def generate_from_id(puzzle_id):
+    params = parse_puzzle_id(puzzle_id)
+    sudoku = SudokuGenerator(params["size"], params["removed"], random.Random(params["seed"]))
+    sudoku.fill_values()
+    solution = sudoku.get_board()
+    sudoku.remove(params["unique"])
+    return sudoku.get_board(), solution
+
+
+'''
+Returns the ID of the daily challenge for a date (everyone gets the same puzzle on the same day)
+
+Parameters:
+day is a datetime.date
+size and removed are as in make_puzzle_id
+
+Return: str
+'''
+
+def daily_puzzle_id(day, size=9, removed=45):
+    return make_puzzle_id(day.toordinal(), size, removed, unique=size == 9)
+
+
+def generate_seeded_chunk(seed, indices, size, removed, unique):
+    return [generate_seeded_sudoku(seed, index, size, removed, unique) for index in indices]
+
+
+'''
+Generates count puzzles spread across a pool of worker processes
+Puzzles are yielded as soon as their chunk finishes, so they do not come out in index order,
+but each (index, board, solution) only depends on seed and index - running with 1 worker or 16
+gives the same puzzles. Only a few chunks per worker are in flight at once so memory stays
+small even for very large batches.
+
+Parameters:
+count is the number of puzzles to build
+removed is an int, a list/tuple of ints to pick from evenly, or a dict of {removed: weight}
+workers is the number of processes to use (defaults to the number of cores, 1 runs in this process)
+seed is the base seed of the batch
+size is the number of rows/columns of the board
+unique is passed through to generate_seeded_sudoku
+chunk_size is how many puzzles each task builds (bigger chunks = less overhead between processes)
+
+Return: generator of tuple (index, board, solution)
+'''
+
+def generate_sudoku_batch(count, removed, workers=None, seed=0, size=9, unique=False, chunk_size=32):
+    if workers is None:
+        workers = os.cpu_count() or 1
+    chunks = (range(start, min(start + chunk_size, count)) for start in range(0, count, chunk_size))
+
+    if workers <= 1:
+        for indices in chunks:
+            yield from generate_seeded_chunk(seed, indices, size, removed, unique)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        for indices in chunks:
+            pending.add(pool.submit(generate_seeded_chunk, seed, indices, size, removed, unique))
+            if len(pending) >= workers * 2:  # wait for a chunk before queueing more
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield from future.result()
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield from future.result()
+
+
+# Command line tool for working on puzzle files in bulk, one 9x9 puzzle per line as 81 characters
+# (1-9, and . or 0 for an empty cell, row by row). Everything streams: lines are read and written a
+# chunk at a time, so files much bigger than memory can go through, e.g. in a shell pipeline:
+#
+#   python -m sudoku_generator generate --count 1000000 --removed 45 > puzzles.txt
+#   python -m sudoku_generator solve puzzles.txt | python -m sudoku_generator validate --summary
+#
+# generate - writes puzzles (with --solutions, "puzzle,solution" lines)
+# solve    - writes the solution of each puzzle, "unsolvable" or "invalid" (not a puzzle line)
+# validate - writes one of solved, invalid (clashing numbers, a wrong full grid or not a puzzle line),
+#            unsolvable, multiple (more than one solution) or unique for each line
+# solve and validate read "puzzle,solution" lines too (the puzzle is used), and can use several processes.
+# How many lines went through and how fast is reported on stderr.
+
+LINE_CHUNK = 1024  # lines read, worked on and written at a time
+OUTPUT_BUFFER = 1 << 20  # bytes buffered before a write when the output is a file
+REPORT_EVERY = 5  # seconds between --progress reports
+
+# characters of a puzzle line -> cell values (anything else is not valid in a puzzle line), and back
+LINE_CHARACTERS = b".0123456789"
+LINE_DIGITS = bytes.maketrans(LINE_CHARACTERS, bytes([0] + list(range(10))))
+CELL_CHARACTERS = bytes.maketrans(bytes(range(10)), b"0123456789")
+
+
+'''
+Turns a board into an 81 character line
+
+Parameters:
+board is a 9x9 2D list of ints, or flat bytes
+blank is the character written for an empty cell
+
+Return: str
+'''
+
+def puzzle_line(board, blank="."):
+    if not isinstance(board, (bytes, bytearray)):
+        board = bytes(value for row in board for value in row)
+    return bytes(board).translate(CELL_CHARACTERS).decode().replace("0", blank)
+
+
+'''
+Reads a puzzle line (the part before a comma, if there is one)
+
+Parameters:
+line is a str
+
+Return: flat bytes of the 81 cell values, or None if it isn't a puzzle line
+'''
+
+def read_puzzle_line(line):
+    text = line.split(",", 1)[0].strip().encode()
+    if len(text) != 81 or text.translate(None, LINE_CHARACTERS):
+        return None
+    return text.translate(LINE_DIGITS)
+
+
+def rows_of(flat):
+    return [list(flat[row * 9:(row + 1) * 9]) for row in range(9)]
+
+
+'''
+Solves a chunk of puzzle lines (runs in the worker processes)
+
+Return: tuple (output text, counts)
+'''
+
+def solve_lines(lines, blank="."):
+    output = []
+    counts = {"solved": 0, "unsolvable": 0, "invalid": 0}
+    for line in lines:
+        puzzle = read_puzzle_line(line)
+        if puzzle is None:
+            status = "invalid"
+        else:
+            solution = SudokuSolver(rows_of(puzzle)).solve()
+            status = "solved" if solution is not None else "unsolvable"
+        counts[status] += 1
+        output.append(puzzle_line(solution, blank) if status == "solved" else status)
+    output.append("")
+    return "\n".join(output), counts
+
+
+'''
+Checks a chunk of lines (runs in the worker processes)
+Full grids are checked all together with validate_grids when numpy is there.
+
+Return: tuple (output text, counts)
+'''
+
+def validate_lines(lines):
+    from bulk_validator import validate_grids, np
+    statuses = [None] * len(lines)
+    full = []  # (index, grid) of the lines that are full grids
+    for index, line in enumerate(lines):
+        puzzle = read_puzzle_line(line)
+        if puzzle is None:
+            statuses[index] = "invalid"
+        elif 0 not in puzzle and np is not None:
+            full.append((index, puzzle))
+        else:
+            solver = SudokuSolver(rows_of(puzzle))
+            if not solver.consistent:
+                statuses[index] = "invalid"
+            elif 0 not in puzzle:
+                statuses[index] = "solved"
+            else:
+                statuses[index] = ("unsolvable", "unique", "multiple")[solver.count_solutions(2)]
+    if full:
+        grids = np.frombuffer(b"".join(grid for index, grid in full), np.uint8).reshape(-1, 9, 9)
+        for (index, grid), valid in zip(full, validate_grids(grids)[0]):
+            statuses[index] = "solved" if valid else "invalid"
+    counts = {}
+    for status in statuses:
+        counts[status] = counts.get(status, 0) + 1
+    return "\n".join(statuses) + "\n", counts
+
+
+'''
+Calls function on every chunk and yields the results in the same order as the chunks
+With more than one worker the chunks are spread over a pool of processes, with only a few
+chunks per worker in flight at once so memory stays bounded however many chunks there are.
+
+Parameters:
+function is a top level function (so it can be sent to the worker processes)
+chunks is an iterable of argument tuples
+workers is the number of processes to use (1 runs in this process)
+
+Return: generator of the results
+'''
+
+def map_chunks(function, chunks, workers):
+    if workers <= 1:
+        for chunk in chunks:
+            yield function(*chunk)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        in_flight = deque()
+        for chunk in chunks:
+            in_flight.append(pool.submit(function, *chunk))
+            if len(in_flight) >= workers * 2:
+                yield in_flight.popleft().result()
+        while in_flight:
+            yield in_flight.popleft().result()
+
+
+class Throughput:
+    '''
+    Counts the lines that went through and reports how fast on stderr
+
+    Parameters:
+    verb is what is being done, e.g. "solved"
+    progress is True to report every REPORT_EVERY seconds and not just at the end
+    '''
+    def __init__(self, verb, progress=False):
+        self.verb = verb
+        self.progress = progress
+        self.start = self.last_report = time.perf_counter()
+        self.lines = 0
+        self.counts = {}
+
+    def add(self, lines, counts=None):
+        self.lines += lines
+        for status, count in (counts or {}).items():
+            self.counts[status] = self.counts.get(status, 0) + count
+        if self.progress and time.perf_counter() - self.last_report >= REPORT_EVERY:
+            self.last_report = time.perf_counter()
+            self.report()
+
+    def report(self):
+        seconds = max(time.perf_counter() - self.start, 1e-9)
+        details = ", ".join(f"{status} {count}" for status, count in sorted(self.counts.items()) if count)
+        print(f"{self.verb} {self.lines} lines in {seconds:.1f}s ({self.lines / seconds:.0f}/s)"
+              + (f": {details}" if details else ""), file=sys.stderr)
+
+
+def generate_lines(args):
+    blank = args.blank
+    removed = args.removed[0] if len(args.removed) == 1 else args.removed
+    if args.expand:
+        from grid_symmetry import expand_generated
+        pairs = expand_generated(args.count, removed, unique=args.unique, per_base=args.expand,
+                                 rng=random.Random(args.seed))
+    else:
+        pairs = ((board, solution) for index, board, solution in
+                 generate_sudoku_batch(args.count, removed, args.workers, args.seed, unique=args.unique))
+    for puzzle, solution in pairs:
+        if args.solutions:
+            yield puzzle_line(puzzle, blank) + "," + puzzle_line(solution, blank) + "\n"
+        else:
+            yield puzzle_line(puzzle, blank) + "\n"
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(prog="python -m sudoku_generator",
+                                     description="Generate, solve and validate 9x9 puzzle files (one 81 character puzzle per line)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    generate = commands.add_parser("generate", help="write puzzles")
+    generate.add_argument("--count", type=int, default=1000, help="puzzles to write")
+    generate.add_argument("--removed", type=int, nargs="+", default=[45], help="empty cells (several = picked evenly)")
+    generate.add_argument("--unique", action=argparse.BooleanOptionalAction, default=True,
+                          help="only puzzles with exactly one solution (default)")
+    generate.add_argument("--seed", type=int, default=0, help="the same seed writes the same puzzles")
+    generate.add_argument("--solutions", action="store_true", help='write "puzzle,solution" lines')
+    generate.add_argument("--expand", type=int, metavar="N",
+                          help="make N puzzles from each generated one with grid_symmetry (much faster, but each group of N is equivalent)")
+
+    for name, help_text in (("solve", "write the solution of every puzzle"), ("validate", "check every line")):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument("input", nargs="?", default="-", help="puzzle file (default: stdin)")
+        if name == "validate":
+            command.add_argument("--summary", action="store_true", help="only report the counts, don't write a line per puzzle")
+
+    for command in commands.choices.values():
+        command.add_argument("-o", "--output", default="-", help="file to write (default: stdout)")
+        command.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes (default: all cores)")
+        command.add_argument("--blank", default=".", choices=(".", "0"), help="character written for an empty cell")
+        command.add_argument("--progress", action="store_true", help="report throughput every few seconds, not just at the end")
+        command.add_argument("--quiet", action="store_true", help="don't report throughput")
+    args = parser.parse_args(argv)
+    if args.command == "generate" and args.expand and len(args.removed) > 1:
+        parser.error("--expand works with a single --removed count")
+
+    output = sys.stdout if args.output == "-" else open(args.output, "w", buffering=OUTPUT_BUFFER)
+    throughput = Throughput({"generate": "generated", "solve": "solved", "validate": "validated"}[args.command],
+                            args.progress and not args.quiet)
+    try:
+        if args.command == "generate":
+            lines = generate_lines(args)
+            while True:
+                chunk = list(islice(lines, LINE_CHUNK))
+                if not chunk:
+                    break
+                output.write("".join(chunk))
+                throughput.add(len(chunk))
+        else:
+            source = sys.stdin if args.input == "-" else open(args.input)
+            with source:
+                if args.command == "solve":
+                    chunks = ((chunk, args.blank) for chunk in iter(lambda: list(islice(source, LINE_CHUNK)), []))
+                    function = solve_lines
+                else:
+                    chunks = ((chunk,) for chunk in iter(lambda: list(islice(source, LINE_CHUNK)), []))
+                    function = validate_lines
+                for text, counts in map_chunks(function, chunks, args.workers):
+                    if not getattr(args, "summary", False):
+                        output.write(text)
+                    throughput.add(sum(counts.values()), counts)
+        output.flush()
+    except BrokenPipeError:
+        # the reader went away (e.g. piped into head): stop, and point stdout somewhere that can't fail at exit
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        sys.exit(1)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    if not args.quiet:
+        throughput.report()
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,472 @@
+# Difficulty grading - solves a puzzle the way a person would, with a fixed ladder of techniques,
+# and reports the hardest technique that was needed and a score.
+# At every step the easiest technique that makes progress is used, so a puzzle only counts as needing
+# X-wings if nothing easier would have worked at that point.
+# Candidates are bitmasks like in sudoku_solver: bit num is set if num can still go in the cell.
+
+import re
+from itertools import combinations
+from sudoku_solver import get_unit_tables
+
+# the ladder, easiest first: (technique, weight added to the score each time it is used, level)
+TECHNIQUES = [
+    ("hidden single", 1, "easy"),
+    ("naked single", 2, "easy"),
+    ("pointing", 5, "medium"),
+    ("claiming", 5, "medium"),
+    ("naked pair", 8, "hard"),
+    ("hidden pair", 10, "hard"),
+    ("naked triple", 12, "hard"),
+    ("x-wing", 20, "expert"),
+    ("swordfish", 25, "expert"),
+    ("guess", 50, "evil"),  # none of the techniques above gets any further
+]
+WEIGHTS = {name: weight for name, weight, level in TECHNIQUES}
+LEVEL_OF = {name: level for name, weight, level in TECHNIQUES}
+RANK = {name: rank for rank, (name, weight, level) in enumerate(TECHNIQUES)}
+LEVELS = ["easy", "medium", "hard", "expert", "evil"]
+PLACED = 128  # a number's count in a unit once it is placed there (see PuzzleGrader.unit_counts)
+LOW_COUNT = re.compile(rb"[\x00\x01]")  # a count that hidden singles has to look at
+
+
+class CountFields(dict):
+    '''
+    Candidate masks spread out to one byte per number, so that adding up the masks of a unit's cells
+    counts the cells each number can go in. Filled in as masks come up, bigger boards have too many to list.
+    '''
+    def __missing__(self, mask):
+        fields = 0
+        for num in range(mask.bit_length()):
+            if mask >> num & 1:
+                fields |= 1 << 8 * num
+        self[mask] = fields
+        return fields
+
+
+class PuzzleGrader:
+    '''
+    Grades puzzles of one size, the unit tables are worked out once and reused for every puzzle
+
+    Parameters:
+    size is the number of rows/columns of the boards to grade
+    '''
+    def __init__(self, size=9):
+        self.size = size
+        self.box_length = int(size ** 0.5)
+        self.full = (1 << (size + 1)) - 2
+        self.units, self.peers = get_unit_tables(size)
+        self.rows = self.units[:size]
+        self.cols = self.units[size:2 * size]
+        self.boxes = self.units[2 * size:]
+        self.row_of = [cell // size for cell in range(size * size)]
+        self.col_of = [cell % size for cell in range(size * size)]
+        self.box_of = [(row // self.box_length) * self.box_length + col // self.box_length
+                       for row, col in zip(self.row_of, self.col_of)]
+        # for pointing and claiming: each box split into the segments it shares with rows (or columns),
+        # and each row and column into the segments it shares with boxes (see locked)
+        self.box_rows = [self.segments(box, self.rows, self.row_of) for box in self.boxes]
+        self.box_cols = [self.segments(box, self.cols, self.col_of) for box in self.boxes]
+        self.line_boxes = [self.segments(line, self.boxes, self.box_of) for line in self.rows + self.cols]
+        # for the counts (see unit_counts): the count of num in unit is at unit * stride + num, and
+        # for each cell where the counts of its units start, and of the units each peer doesn't share with it
+        self.stride = size + 1
+        self.fields = CountFields()
+        self.placed_fields = [0] + [PLACED << 8 * num for num in range(1, size + 1)]
+        self.unit_starts = [(row * self.stride, (size + col) * self.stride, (2 * size + box) * self.stride)
+                            for row, col, box in zip(self.row_of, self.col_of, self.box_of)]
+        self.peer_starts = [[(peer, tuple(start for start in self.unit_starts[peer] if start not in starts))
+                             for peer in self.peers[cell]]
+                            for cell, starts in enumerate(self.unit_starts)]
+
+    ''' for segments(self, unit, others, other_of)
+    Splits unit into the cells it shares with each crossing unit in others.
+    Returns a list of (cells inside unit, cells of the crossing unit outside unit) tuples.
+    '''
+    def segments(self, unit, others, other_of):
+        inside = set(unit)
+        pieces = {}
+        for cell in unit:
+            pieces.setdefault(other_of[cell], []).append(cell)
+        return [(tuple(cells), tuple(cell for cell in others[other] if cell not in inside))
+                for other, cells in pieces.items()]
+
+    ''' for grade(self, grid)
+    Grades a puzzle given as a 2D list (0 = empty).
+    Returns a dict with:
+        level - "easy", "medium", "hard", "expert" or "evil"
+        hardest - the hardest technique needed
+        score - the sum of the technique weights over every step
+        steps - how many times each technique was used
+    or None if the puzzle contradicts itself.
+    '''
+    def grade(self, grid):
+        values = [value for row in grid for value in row]
+        # the numbers already used in each unit, a number twice in one unit is a contradiction
+        used = []
+        for unit in self.units:
+            mask = 0
+            for cell in unit:
+                value = values[cell]
+                if value:
+                    bit = 1 << value
+                    if mask & bit:
+                        return None
+                    mask |= bit
+            used.append(mask)
+        size, full = self.size, self.full
+        rows, cols, boxes = used[:size], used[size:2 * size], used[2 * size:]
+        candidates = [0 if value else full & ~(rows[row] | cols[col] | boxes[box])
+                      for value, row, col, box in zip(values, self.row_of, self.col_of, self.box_of)]
+
+        steps = {}
+        # hidden singles a pass over every unit at a time first, that is all most easy puzzles need.
+        # A pass costs about as much as setting up the counts, so once one places less than a row's worth
+        # the counts take over and only the places where they went down get looked at.
+        placed = 0
+        while 0 in values:
+            swept = self.sweep(values, candidates)
+            placed += swept
+            if swept < size:
+                break
+        if placed:
+            steps["hidden single"] = placed
+        if 0 in values:
+            counts, pending = self.unit_counts(values, candidates)
+        ladder = [
+            ("naked single", lambda *state: self.naked_singles(values, *state)),
+            ("pointing", self.pointing),
+            ("claiming", self.claiming),
+            ("naked pair", self.naked_pairs),
+            ("hidden pair", self.hidden_pairs),
+            ("naked triple", self.naked_triples),
+            ("x-wing", lambda *state: self.fish(*state, 2)),
+            ("swordfish", lambda *state: self.fish(*state, 3)),
+        ]
+        while 0 in values:
+            # hidden singles first, they only need looking at where a count went down to 1 (or 0)
+            placed = self.hidden_singles(values, candidates, counts, pending)
+            if placed is None:  # contradiction
+                return None
+            if placed:
+                steps["hidden single"] = steps.get("hidden single", 0) + placed
+            if 0 not in values:
+                break
+            for name, technique in ladder:
+                progress = technique(candidates, counts, pending)
+                if progress is None:
+                    return None
+                if progress:
+                    steps[name] = steps.get(name, 0) + progress
+                    break
+            else:
+                steps["guess"] = 1
+                break
+
+        hardest = max(steps, key=RANK.get) if steps else "hidden single"
+        return {
+            "level": LEVEL_OF[hardest],
+            "hardest": hardest,
+            "score": sum(WEIGHTS[name] * count for name, count in steps.items()),
+            "steps": steps,
+        }
+
+    ''' for unit_counts(self, values, candidates)
+    Counts the cells each number can go in, in every unit, so hidden singles don't need to look through
+    every unit again after each placement. The count of a number already placed in a unit is PLACED.
+    Returns the counts (see __init__ for where each one is) and the pending list of the places in the
+    counts that are already below 2, which place and remove add to as counts go down.
+    '''
+    def unit_counts(self, values, candidates):
+        fields, placed_fields, stride = self.fields, self.placed_fields, self.stride
+        cell_fields = [fields[mask] if mask else placed_fields[value] for mask, value in zip(candidates, values)]
+        # adding up the fields of a unit's cells gives a byte per number, there is no number 0 so it starts at PLACED
+        counts = b"".join(sum(map(cell_fields.__getitem__, unit), PLACED).to_bytes(stride, "little")
+                          for unit in self.units)
+        return list(counts), [low.start() for low in LOW_COUNT.finditer(counts)]
+
+    ''' for place(self, values, candidates, counts, pending, cell, bit)
+    Puts the number for bit in cell and removes it from the candidates of the cell's peers.
+    '''
+    def place(self, values, candidates, counts, pending, cell, bit):
+        num = bit.bit_length() - 1
+        values[cell] = num
+        starts = self.unit_starts[cell]
+        for start in starts:
+            counts[start + num] = PLACED
+        others = candidates[cell] ^ bit
+        candidates[cell] = 0
+        while others:
+            other = others & -others
+            others ^= other
+            other = other.bit_length() - 1
+            for start in starts:
+                counts[start + other] -= 1
+                if counts[start + other] < 2:
+                    pending.append(start + other)
+        for peer, peer_starts in self.peer_starts[cell]:
+            if candidates[peer] & bit:
+                candidates[peer] ^= bit
+                for start in peer_starts:
+                    counts[start + num] -= 1
+                    if counts[start + num] < 2:
+                        pending.append(start + num)
+
+    ''' for remove(self, candidates, counts, pending, cell, bits)
+    Takes the numbers in bits away from the candidates of cell, every technique past the singles does it this way.
+    Returns how many candidates went.
+    '''
+    def remove(self, candidates, counts, pending, cell, bits):
+        candidates[cell] ^= bits
+        removed = 0
+        while bits:
+            bit = bits & -bits
+            bits ^= bit
+            num = bit.bit_length() - 1
+            for start in self.unit_starts[cell]:
+                counts[start + num] -= 1
+                if counts[start + num] < 2:
+                    pending.append(start + num)
+            removed += 1
+        return removed
+
+    ''' for sweep(self, values, candidates)
+    One pass of hidden singles over every unit, placing them as it goes. Comes before the counts are set up,
+    so it doesn't keep them.
+    Returns how many numbers were placed.
+    '''
+    def sweep(self, values, candidates):
+        placed = 0
+        peers = self.peers
+        for unit in self.units:
+            once = more = 0
+            for cell in unit:
+                mask = candidates[cell]
+                more |= once & mask
+                once |= mask
+            singles = once & ~more
+            while singles:
+                bit = singles & -singles
+                singles ^= bit
+                for cell in unit:
+                    if candidates[cell] & bit:
+                        values[cell] = bit.bit_length() - 1
+                        candidates[cell] = 0
+                        keep = ~bit
+                        for peer in peers[cell]:
+                            candidates[peer] &= keep
+                        placed += 1
+                        break
+        return placed
+
+    # every technique below returns how much progress it made (0 for none) or None for a contradiction
+
+    ''' for hidden_singles(self, values, candidates, counts, pending)
+    Places every number that is left with one cell in a unit, until there are none.
+    A number with no cell left in a unit it isn't placed in is a contradiction.
+    '''
+    def hidden_singles(self, values, candidates, counts, pending):
+        placed = 0
+        while pending:
+            index = pending.pop()
+            count = counts[index]
+            if count == 1:
+                unit, num = divmod(index, self.stride)
+                bit = 1 << num
+                for cell in self.units[unit]:
+                    if candidates[cell] & bit:
+                        self.place(values, candidates, counts, pending, cell, bit)
+                        placed += 1
+                        break
+            elif count == 0:
+                return None
+        return placed
+
+    def naked_singles(self, values, candidates, counts, pending):
+        placed = 0
+        for cell, mask in enumerate(candidates):
+            if mask and not mask & (mask - 1):
+                self.place(values, candidates, counts, pending, cell, mask)
+                placed += 1
+            elif not mask and not values[cell]:
+                return None
+        return placed
+
+    ''' for pointing(self, candidates, counts, pending)
+    A number that can only go in one row (or column) of a box can't go anywhere else in that row.
+    '''
+    def pointing(self, candidates, counts, pending):
+        removed = 0
+        for rows, cols in zip(self.box_rows, self.box_cols):
+            removed += self.locked(candidates, counts, pending, rows)
+            removed += self.locked(candidates, counts, pending, cols)
+        return removed
+
+    ''' for claiming(self, candidates, counts, pending)
+    A number that can only go in one box of a row (or column) can't go anywhere else in that box.
+    '''
+    def claiming(self, candidates, counts, pending):
+        removed = 0
+        for segments in self.line_boxes:
+            removed += self.locked(candidates, counts, pending, segments)
+        return removed
+
+    ''' for locked(self, candidates, counts, pending, segments)
+    Shared part of pointing and claiming: for every number whose cells in a unit all sit in the same
+    segment (see segments), removes that number from the rest of the crossing unit.
+    Returns how many candidates went.
+    '''
+    def locked(self, candidates, counts, pending, segments):
+        # numbers seen in exactly one segment: once has every number seen, more the ones seen again
+        once = more = 0
+        masks = []
+        for inside, outside in segments:
+            mask = 0
+            for cell in inside:
+                mask |= candidates[cell]
+            more |= once & mask
+            once |= mask
+            masks.append(mask)
+        only = once & ~more
+        if not only:
+            return 0
+        removed = 0
+        for (inside, outside), mask in zip(segments, masks):
+            confined = mask & only
+            if confined:
+                for cell in outside:
+                    hit = candidates[cell] & confined
+                    if hit:
+                        removed += self.remove(candidates, counts, pending, cell, hit)
+        return removed
+
+    ''' for naked_pairs(self, candidates, counts, pending)
+    Two cells in a unit with the same two candidates take those two numbers away from the rest of the unit.
+    '''
+    def naked_pairs(self, candidates, counts, pending):
+        removed = 0
+        for unit in self.units:
+            pairs = {}
+            for cell in unit:
+                mask = candidates[cell]
+                if mask and mask.bit_count() == 2:
+                    pairs.setdefault(mask, []).append(cell)
+            for mask, cells in pairs.items():
+                if len(cells) == 2:
+                    removed += self.remove_from_unit(candidates, counts, pending, unit, cells, mask)
+        return removed
+
+    ''' for hidden_pairs(self, candidates, counts, pending)
+    Two numbers that can only go in the same two cells of a unit clear every other candidate from those cells.
+    '''
+    def hidden_pairs(self, candidates, counts, pending):
+        removed = 0
+        stride = self.stride
+        for start, unit in zip(range(0, len(self.units) * stride, stride), self.units):
+            unit_counts = counts[start:start + stride]
+            if unit_counts.count(2) < 2:  # a pair needs two numbers with two cells each
+                continue
+            twice = sum(1 << num for num, count in enumerate(unit_counts) if count == 2)
+            # the two cells of each of those numbers, they come out in the order of their first cells
+            twos = {}
+            for cell in unit:
+                mask = candidates[cell] & twice
+                while mask:
+                    bit = mask & -mask
+                    mask ^= bit
+                    twos.setdefault(bit, []).append(cell)
+            for (bit_a, cells_a), (bit_b, cells_b) in combinations(twos.items(), 2):
+                if cells_a == cells_b:
+                    keep = bit_a | bit_b
+                    for cell in cells_a:
+                        if candidates[cell] & ~keep:
+                            removed += self.remove(candidates, counts, pending, cell, candidates[cell] & ~keep)
+        return removed
+
+    ''' for naked_triples(self, candidates, counts, pending)
+    Three cells in a unit whose candidates only use three numbers take those numbers away from the rest of the unit.
+    '''
+    def naked_triples(self, candidates, counts, pending):
+        removed = 0
+        for unit in self.units:
+            small = [cell for cell in unit if candidates[cell] and candidates[cell].bit_count() <= 3]
+            for trio in combinations(small, 3):
+                mask = candidates[trio[0]] | candidates[trio[1]] | candidates[trio[2]]
+                if mask.bit_count() == 3:
+                    removed += self.remove_from_unit(candidates, counts, pending, unit, trio, mask)
+        return removed
+
+    def remove_from_unit(self, candidates, counts, pending, unit, keep_cells, mask):
+        removed = 0
+        for cell in unit:
+            if cell not in keep_cells and candidates[cell] & mask:
+                removed += self.remove(candidates, counts, pending, cell, candidates[cell] & mask)
+        return removed
+
+    ''' for fish(self, candidates, counts, pending, count)
+    X-wing (count = 2) and swordfish (count = 3): if a number can only go in the same count columns
+    in count different rows, it can't go in those columns in any other row (and the same the other way round).
+    '''
+    def fish(self, candidates, counts, pending, count):
+        size, stride = self.size, self.stride
+        for num in range(1, size + 1):
+            bit = 1 << num
+            for lines, crosses, first in ((self.rows, self.cols, 0), (self.cols, self.rows, size)):
+                # the lines with 2 to count places left for the number (going by the counts, so only
+                # those get looked at) and the crossing lines they are in, as a bitmask
+                line_counts = counts[first * stride + num:(first + size) * stride:stride]
+                indexes = [index for index, line_count in enumerate(line_counts) if 2 <= line_count <= count]
+                if len(indexes) < count:
+                    continue
+                spots = []
+                for index in indexes:
+                    where = 0
+                    for cross, cell in enumerate(lines[index]):
+                        if candidates[cell] & bit:
+                            where |= 1 << cross
+                    spots.append((index, where))
+                removed = 0
+                for in_group, where in fish_groups(spots, count):
+                    for cross in range(size):
+                        if where >> cross & 1:
+                            for index, cell in enumerate(crosses[cross]):
+                                if index not in in_group and candidates[cell] & bit:
+                                    removed += self.remove(candidates, counts, pending, cell, bit)
+                if removed:
+                    return removed
+        return 0
+
+
+'''
+Finds the fish for PuzzleGrader.fish: every count lines out of spots whose positions together
+cover only count crossing lines. There are only a handful of spots by the time fish are looked for,
+so going through every combination of them is quicker than building the groups up a line at a time.
+
+Parameters:
+spots is a list of (line index, positions bitmask) tuples
+count is the size of the fish (2 for x-wing, 3 for swordfish)
+
+Return: list of (tuple of line indexes, positions bitmask of the group) tuples
+'''
+
+def fish_groups(spots, count):
+    groups = []
+    for group in combinations(spots, count):
+        where = 0
+        for index, line_where in group:
+            where |= line_where
+        if where.bit_count() <= count:
+            groups.append((tuple(index for index, line_where in group), where))
+    return groups
+
+
+'''
+Grades a single puzzle, see PuzzleGrader.grade
+
+Parameters:
+grid is a 2D list (0 = empty)
+
+Return: dict or None
+'''
+
+def grade_puzzle(grid):
+    return PuzzleGrader(len(grid)).grade(grid)
@@ -0,0 +1,213 @@
+# Solver for a board in progress - works on any grid of numbers (0 = empty), e.g. the values in Board.cells
+# It fills in naked singles (a cell with only one possible number) and hidden singles (a number that only
+# fits in one cell of a row, column or box) and only guesses when neither is left, always guessing at the
+# cell with the fewest possible numbers. Candidates are bitmasks: bit num is set if num can go in the cell.
+
+# size -> (units, peers), built the first time a board of that size is solved
+unit_tables = {}
+
+'''
+Returns the units and peers of a size x size board, with cells numbered row * size + col
+
+Parameters:
+size is the number of rows/columns of the board
+
+Return: tuple (units, peers) where units is a list of the cells in every row, column and box
+and peers[cell] is a list of the cells that share a row, column or box with cell
+'''
+
+def get_unit_tables(size):
+    if size not in unit_tables:
+        box_length = int(size ** 0.5)
+        rows = [[row * size + col for col in range(size)] for row in range(size)]
+        cols = [[row * size + col for row in range(size)] for col in range(size)]
+        boxes = [[(row_start + i) * size + col_start + j for i in range(box_length) for j in range(box_length)]
+                 for row_start in range(0, size, box_length) for col_start in range(0, size, box_length)]
+        units = rows + cols + boxes
+        peers = [set() for _ in range(size * size)]
+        for unit in units:
+            for cell in unit:
+                peers[cell].update(unit)
+        for cell in range(size * size):
+            peers[cell].discard(cell)
+        unit_tables[size] = (units, [sorted(cell_peers) for cell_peers in peers])
+    return unit_tables[size]
+
+
+class SudokuSolver:
+    '''
+    Solver for one position
+
+    Parameters:
+    grid is a 2D list of ints (0 for an empty cell), it is not changed
+    '''
+    def __init__(self, grid):
+        self.size = len(grid)
+        self.full = (1 << (self.size + 1)) - 2  # every number from 1 to size
+        self.units, self.peers = get_unit_tables(self.size)
+        self.values = [value for row in grid for value in row]
+
+        # work out the candidates of every empty cell, and whether the filled in cells already clash
+        self.consistent = True
+        self.candidates = [0] * len(self.values)
+        used = [0] * len(self.units)
+        for index, unit in enumerate(self.units):
+            for cell in unit:
+                bit = 1 << self.values[cell] if self.values[cell] else 0
+                if used[index] & bit:
+                    self.consistent = False
+                used[index] |= bit
+        unit_of = [[] for _ in self.values]
+        for index, unit in enumerate(self.units):
+            for cell in unit:
+                unit_of[cell].append(index)
+        for cell, value in enumerate(self.values):
+            if value == 0:
+                row, col, box = unit_of[cell]
+                self.candidates[cell] = self.full & ~(used[row] | used[col] | used[box])
+
+        self.solution = None  # filled in by solve()
+        self.solved = False  # True once solve() has run
+
+    ''' for place(self, values, candidates, cell, bit)
+    Puts the number for bit in cell and removes it from the candidates of the cell's peers.
+    '''
+    def place(self, values, candidates, cell, bit):
+        values[cell] = bit.bit_length() - 1
+        candidates[cell] = 0
+        keep = ~bit
+        for peer in self.peers[cell]:
+            candidates[peer] &= keep
+
+    ''' for propagate(self, values, candidates)
+    Keeps filling in naked and hidden singles until there are none left.
+    Returns False if it runs into a contradiction (a cell or a number with nowhere to go).
+    '''
+    def propagate(self, values, candidates):
+        full = self.full
+        progress = True
+        while progress:
+            progress = False
+            # naked singles
+            for cell, mask in enumerate(candidates):
+                if mask and not mask & (mask - 1):
+                    self.place(values, candidates, cell, mask)
+                    progress = True
+                elif not mask and not values[cell]:
+                    return False
+            # hidden singles
+            for unit in self.units:
+                once = more = placed = 0
+                for cell in unit:
+                    value = values[cell]
+                    if value:
+                        placed |= 1 << value
+                    else:
+                        mask = candidates[cell]
+                        more |= once & mask
+                        once |= mask
+                if (once | placed) != full:
+                    return False
+                singles = once & ~more & ~placed
+                while singles:
+                    bit = singles & -singles
+                    singles ^= bit
+                    for cell in unit:
+                        if candidates[cell] & bit:
+                            if values[cell]:
+                                return False
+                            self.place(values, candidates, cell, bit)
+                            progress = True
+                            break
+                    else:
+                        return False
+        return True
+
+    ''' for search(self, values, candidates, limit, found)
+    Propagates, then guesses at the cell with the fewest candidates and recurses.
+    Appends every solution it finds to found, stopping once found has limit solutions.
+    '''
+    def search(self, values, candidates, limit, found):
+        if not self.propagate(values, candidates):
+            return
+        best, best_count = -1, self.size + 1
+        for cell, mask in enumerate(candidates):
+            if mask:
+                count = mask.bit_count()
+                if count < best_count:
+                    best, best_count = cell, count
+                    if count == 2:
+                        break
+        if best < 0:
+            found.append(values)
+            return
+        mask = candidates[best]
+        while mask and len(found) < limit:
+            bit = mask & -mask
+            mask ^= bit
+            next_values, next_candidates = values[:], candidates[:]
+            self.place(next_values, next_candidates, best, bit)
+            self.search(next_values, next_candidates, limit, found)
+
+    ''' for count_solutions(self, limit)
+    Returns the number of solutions of the position, stopping as soon as limit are found.
+    '''
+    def count_solutions(self, limit=2):
+        if not self.consistent:
+            return 0
+        found = []
+        self.search(self.values[:], self.candidates[:], limit, found)
+        return len(found)
+
+    ''' for solve(self)
+    Returns the solved board as a 2D list, or None if the position can't be solved.
+    '''
+    def solve(self):
+        if not self.solved:
+            self.solved = True
+            found = []
+            if self.consistent:
+                self.search(self.values[:], self.candidates[:], 1, found)
+            if found:
+                self.solution = [found[0][row * self.size:(row + 1) * self.size] for row in range(self.size)]
+        return self.solution
+
+    ''' for is_solvable(self)
+    Returns True if the numbers filled in so far can still be completed to a solution.
+    '''
+    def is_solvable(self):
+        return self.solve() is not None
+
+    ''' for next_hint(self)
+    Returns the next logical step as (row, col, value, technique), or None if the board is full or can't be solved.
+    technique is "naked single" or "hidden single" when one exists, otherwise "solution" for the
+    cell with the fewest candidates, taken from the solved board.
+    '''
+    def next_hint(self):
+        if not self.is_solvable():
+            return None
+        size, values, candidates = self.size, self.values, self.candidates
+
+        for cell, mask in enumerate(candidates):
+            if mask and not mask & (mask - 1):
+                return cell // size, cell % size, mask.bit_length() - 1, "naked single"
+
+        for unit in self.units:
+            once = more = 0
+            for cell in unit:
+                mask = candidates[cell]
+                more |= once & mask
+                once |= mask
+            singles = once & ~more
+            if singles:
+                bit = singles & -singles
+                for cell in unit:
+                    if candidates[cell] & bit:
+                        return cell // size, cell % size, bit.bit_length() - 1, "hidden single"
+
+        empty = [cell for cell in range(len(values)) if not values[cell]]
+        if not empty:
+            return None
+        cell = min(empty, key=lambda cell: candidates[cell].bit_count())
+        row, col = cell // size, cell % size
+        return row, col, self.solution[row][col], "solution"
@@ -0,0 +1,6 @@
+# the modules live at the top of the repo, not in a package
+import os, sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")  # tests that import sudoku never open a window
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
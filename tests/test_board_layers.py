@@ -0,0 +1,93 @@
+import pytest
+
+pygame = pytest.importorskip("pygame")
+from board_model import BoardModel
+from sudoku import Board
+
+PUZZLE = [[(row * 3 + row // 3 + col) % 9 + 1 if (row + col) % 3 else 0 for col in range(9)] for row in range(9)]
+
+
+@pytest.fixture(scope="module")
+def screen():
+    pygame.init()
+    yield pygame.display.set_mode((612, 680))
+    pygame.quit()
+
+
+def fresh_copy(board):
+    # a new model with the same numbers, sketches and marks, for a board that draws everything from scratch
+    old = board.model
+    model = BoardModel(board.board)
+    for row in range(9):
+        for col in range(9):
+            if not old.is_given(row, col):
+                model.set_value(row, col, old.value(row, col))
+            model.set_sketch(row, col, old.sketch_value(row, col))
+            model.set_marks(row, col, old.marks(row, col))
+    model.show_candidates(old.candidates is not None)
+    return model
+
+
+def assert_drawn_like_a_new_board(board, screen):
+    # the screen as the cached layers left it after only redrawing what changed
+    kept = pygame.image.tobytes(screen, "RGB")
+    other = pygame.Surface(screen.get_size(), 0, screen)
+    new = Board(612, 680, other, 0, model=fresh_copy(board))
+    if board.selected is not None:
+        new.select(*board.selected)
+    new.draw()
+    assert kept == pygame.image.tobytes(other, "RGB")
+    board.draw()
+    assert pygame.image.tobytes(screen, "RGB") == kept
+
+
+def test_layers_match_a_new_board(screen):
+    board = Board(612, 680, screen, 0, puzzle=PUZZLE)
+    board.draw()
+    assert_drawn_like_a_new_board(board, screen)
+    empty = [(row, col) for row in range(9) for col in range(9) if not PUZZLE[row][col]]
+
+    # sketch, then place the sketch like the enter key does
+    board.begin_move()
+    row, col = empty[0]
+    board.select(row, col)
+    board.clear(row, col)
+    board.sketch("4", row, col)
+    board.redraw_cell(row, col)
+    board.select(row, col)
+    assert_drawn_like_a_new_board(board, screen)
+    board.begin_move()
+    board.clear(row, col)
+    board.place_number("4", row, col)
+    board.redraw_cell(row, col)
+    assert_drawn_like_a_new_board(board, screen)
+
+    # pencil marks somewhere else, the selection moves with it
+    board.begin_move()
+    row, col = empty[5]
+    board.select(row, col)
+    for value in (1, 5, 9):
+        board.toggle_mark(value, row, col)
+    assert_drawn_like_a_new_board(board, screen)
+
+    # with auto candidates on a placed number redraws its peers too
+    board.show_candidates(True)
+    board.draw()
+    board.begin_move()
+    row, col = empty[10]
+    board.place_number("7", row, col)
+    board.redraw_cell(row, col)
+    board.take_dirty()
+    assert_drawn_like_a_new_board(board, screen)
+
+    board.begin_move()
+    board.undo()
+    assert_drawn_like_a_new_board(board, screen)
+    board.undo()
+    assert_drawn_like_a_new_board(board, screen)
+
+    board.show_candidates(False)
+    board.reset_to_original()
+    board.draw()
+    assert_drawn_like_a_new_board(board, screen)
+    assert board.model.current_values() == PUZZLE
@@ -0,0 +1,86 @@
+from board_model import BoardModel
+
+SOLUTION = [
+    [5, 3, 4, 6, 7, 8, 9, 1, 2],
+    [6, 7, 2, 1, 9, 5, 3, 4, 8],
+    [1, 9, 8, 3, 4, 2, 5, 6, 7],
+    [8, 5, 9, 7, 6, 1, 4, 2, 3],
+    [4, 2, 6, 8, 5, 3, 7, 9, 1],
+    [7, 1, 3, 9, 2, 4, 8, 5, 6],
+    [9, 6, 1, 5, 3, 7, 2, 8, 4],
+    [2, 8, 7, 4, 1, 9, 6, 3, 5],
+    [3, 4, 5, 2, 8, 6, 1, 7, 9],
+]
+
+
+def puzzle(empty):
+    # the solution with the first `empty` cells (row by row) taken out
+    board = [row[:] for row in SOLUTION]
+    for index in range(empty):
+        board[index // 9][index % 9] = 0
+    return board
+
+
+def test_values_round_trip():
+    model = BoardModel(puzzle(5))
+    assert model.original_values() == puzzle(5)
+    assert model.find_empty() == (0, 0)
+    assert not model.is_full()
+    for col in range(5):
+        model.place_number(SOLUTION[0][col], 0, col)
+    assert model.is_full() and model.check_board()
+    assert model.current_values() == SOLUTION
+    model.reset_to_original()
+    assert model.current_values() == puzzle(5)
+    assert model.data == BoardModel(puzzle(5)).data
+
+
+def test_givens_cannot_change():
+    model = BoardModel(puzzle(1))
+    model.place_number(1, 4, 4)
+    model.sketch(1, 4, 4)
+    model.clear(4, 4)
+    assert not model.toggle_mark(1, 4, 4)
+    assert model.value(4, 4) == SOLUTION[4][4]
+    assert model.sketch_value(4, 4) == 0 and model.marks(4, 4) == 0
+
+
+def test_conflicts_come_and_go():
+    model = BoardModel(puzzle(2))
+    model.place_number(3, 0, 0)  # 3 is already in column 0, at the bottom
+    assert model.conflicts() == {(0, 0), (8, 0)}
+    assert not model.check_board()
+    model.clear(0, 0)
+    assert model.conflicts() == set()
+    model.place_number(5, 0, 0)
+    model.place_number(3, 0, 1)
+    assert model.conflicts() == set() and model.check_board()
+
+
+def test_sketches_and_marks():
+    model = BoardModel(puzzle(3))
+    model.sketch(7, 0, 2)
+    assert model.sketch_value(0, 2) == 7
+    model.sketch(None, 0, 2)
+    assert model.sketch_value(0, 2) == 0
+    assert model.toggle_mark(4, 0, 0)
+    assert model.toggle_mark(9, 0, 0)
+    assert model.marks(0, 0) == 1 << 4 | 1 << 9
+    assert not model.toggle_mark(4, 0, 0)
+    assert model.marks(0, 0) == 1 << 9
+
+
+def test_candidates_follow_the_board():
+    model = BoardModel(puzzle(3))
+    model.show_candidates(True)
+    # row 0 is missing 5, 3 and 4, only the column and box decide which of them fit where
+    assert model.candidates[0] == 1 << 5
+    assert model.candidates[1] == 1 << 3
+    assert model.candidates[2] == 1 << 4
+    model.place_number(5, 0, 0)
+    assert model.candidates[0] == 0 and model.candidates[2] == 1 << 4
+    model.clear(0, 0)
+    assert model.candidates[0] == 1 << 5
+    fresh = BoardModel(puzzle(3))
+    fresh.show_candidates(True)
+    assert model.candidates == fresh.candidates
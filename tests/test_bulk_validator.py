@@ -0,0 +1,89 @@
+import random
+import pytest
+from sudoku_generator import SudokuGenerator
+
+np = pytest.importorskip("numpy")
+from bulk_validator import validate_grids
+
+
+def solution(seed, size=9):
+    sudoku = SudokuGenerator(size, 0, random.Random(seed))
+    sudoku.fill_values()
+    return sudoku.get_board()
+
+
+def first_bad(grid):
+    # the plain python version: the first row, column or box that doesn't have every number once
+    size = len(grid)
+    box = int(size ** 0.5)
+    units = [list(row) for row in grid] + [list(col) for col in zip(*grid)]
+    units += [[grid[r][c] for r in range(br, br + box) for c in range(bc, bc + box)]
+              for br in range(0, size, box) for bc in range(0, size, box)]
+    for index, unit in enumerate(units):
+        if sorted(unit) != list(range(1, size + 1)):
+            return index
+    return -1
+
+
+@pytest.mark.parametrize("size", [9, 16, 25])
+def test_valid_grids(size):
+    grids = [solution(seed, size) for seed in range(5)]
+    valid, bad = validate_grids(grids)
+    assert valid.tolist() == [True] * 5
+    assert bad.tolist() == [-1] * 5
+
+
+def test_duplicate_in_a_row():
+    grid = solution(1)
+    grid[4][7] = grid[4][2]  # row 4 has that number twice (column 7 and a box too, but rows come first)
+    valid, bad = validate_grids([grid])
+    assert not valid[0] and bad[0] == 4
+
+
+def test_duplicate_in_a_column():
+    grid = solution(2)
+    # swapping two cells of a row keeps every row right but puts a number twice in both columns
+    grid[0][1], grid[0][5] = grid[0][5], grid[0][1]
+    valid, bad = validate_grids([grid])
+    assert not valid[0] and bad[0] == 9 + 1
+
+
+def test_duplicate_in_a_box():
+    # every row and column is right, but the top left box has 2s and 3s twice
+    grid = [[(row + col) % 9 + 1 for col in range(9)] for row in range(9)]
+    valid, bad = validate_grids([grid])
+    assert not valid[0] and bad[0] == 18
+
+
+@pytest.mark.parametrize("value", [0, 10, -1, 300])
+def test_numbers_out_of_range(value):
+    grid = solution(3)
+    grid[8][8] = value
+    valid, bad = validate_grids([grid])
+    assert not valid[0] and bad[0] == 8
+
+
+def test_mixed_batch_matches_plain_python():
+    rng = random.Random(4)
+    grids = []
+    for seed in range(40):
+        grid = solution(seed)
+        for _ in range(rng.choice([0, 0, 1, 2])):  # about half stay solved
+            grid[rng.randrange(9)][rng.randrange(9)] = rng.randrange(10)
+        if rng.random() < 0.2:  # and some only go wrong in the columns
+            row, (one, two) = rng.randrange(9), rng.sample(range(9), 2)
+            grid[row][one], grid[row][two] = grid[row][two], grid[row][one]
+        grids.append(grid)
+    expected = [first_bad(grid) for grid in grids]
+    assert 0 < expected.count(-1) < len(grids)
+    for chunk in (1, 7, 4096):  # chunks that split the batch unevenly and one that holds it all
+        valid, bad = validate_grids(np.array(grids), chunk=chunk)
+        assert bad.tolist() == expected
+        assert valid.tolist() == [index == -1 for index in expected]
+
+
+def test_bad_shapes():
+    with pytest.raises(ValueError):
+        validate_grids(np.zeros((2, 9, 8), int))
+    with pytest.raises(ValueError):
+        validate_grids(np.zeros((2, 8, 8), int))
@@ -0,0 +1,99 @@
+import os
+import game_save
+from board_model import BoardModel
+from game_save import GameSave, COMPACT_EVERY, PLACE, SKETCH, CLEAR, MARK, UNMARK, RESET
+
+PUZZLE = [[(row * 3 + row // 3 + col) % 9 + 1 if (row + col) % 3 else 0 for col in range(9)] for row in range(9)]
+
+
+def empty_cells():
+    return [(row, col) for row in range(9) for col in range(9) if not PUZZLE[row][col]]
+
+
+def make_moves(model, save, count):
+    # a mix of every kind of move, each made on the model and recorded like the game does
+    cells = empty_cells()
+    for move in range(count):
+        row, col = cells[move % len(cells)]
+        value = move % 9 + 1
+        kind = move % 5
+        if kind == 0:
+            model.place_number(value, row, col)
+            save.record(PLACE, row, col, value)
+        elif kind == 1:
+            model.sketch(value, row, col)
+            save.record(SKETCH, row, col, value)
+        elif kind == 2:
+            model.toggle_mark(value, row, col)
+            save.record(MARK if model.marks(row, col) >> value & 1 else UNMARK, row, col, value)
+        elif kind == 3:
+            model.clear(row, col)
+            save.record(CLEAR, row, col)
+        else:
+            model.place_number(value, row, col)
+            save.record(PLACE, row, col, value)
+        save.select(row, col)
+        save.flush()
+    return row, col
+
+
+def test_load_after_compaction(tmp_path):
+    path = str(tmp_path / "sudoku.save")
+    save = GameSave(path)
+    model = BoardModel(PUZZLE)
+    save.start(model)
+    last = make_moves(model, save, 3 * COMPACT_EVERY + 5)
+    assert save.generation > 1  # it did compact
+    save.close()
+
+    loaded = GameSave(path).load()
+    assert loaded is not None
+    loaded_model, row, col = loaded
+    assert (row, col) == last
+    assert loaded_model.data == model.data
+
+
+def test_load_with_an_old_journal_left_behind(tmp_path):
+    # the game was killed after the new journal was started but before its snapshot was written
+    path = str(tmp_path / "sudoku.save")
+    save = GameSave(path)
+    model = BoardModel(PUZZLE)
+    save.start(model)
+    make_moves(model, save, COMPACT_EVERY - 1)
+    save.journal.close()
+    save.generation += 1
+    save.open_journal()
+    make_moves(model, save, 10)
+    save.journal.close()
+    save.journal, save.model = None, None
+
+    assert len(os.listdir(tmp_path)) == 3
+    loaded_model = GameSave(path).load()[0]
+    assert loaded_model.data == model.data
+
+
+def test_cut_off_record_and_reset(tmp_path):
+    path = str(tmp_path / "sudoku.save")
+    save = GameSave(path)
+    model = BoardModel(PUZZLE)
+    save.start(model, 0, 0)
+    last = make_moves(model, save, 7)
+    save.record(RESET)
+    model.reset_to_original()
+    save.flush()
+    save.journal.write(b"\x01\x00")  # half a record
+    save.close()
+
+    loaded_model, row, col = GameSave(path).load()
+    assert loaded_model.data == model.data
+    assert (row, col) == last  # a reset isn't a move on a cell, the selection stays where it was
+
+
+def test_discard(tmp_path):
+    path = str(tmp_path / "sudoku.save")
+    save = GameSave(path)
+    save.start(BoardModel(PUZZLE))
+    save.discard()
+    assert os.listdir(tmp_path) == []
+    assert GameSave(path).load() is None
+    assert game_save.replay(BoardModel(PUZZLE), b"") is None
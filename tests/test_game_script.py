@@ -0,0 +1,84 @@
+import pytest
+
+pygame = pytest.importorskip("pygame")
+import sudoku
+from game_save import GameSave
+
+
+def key(name, mod=0):
+    return pygame.event.Event(pygame.KEYDOWN, key=name, mod=mod, unicode="")
+
+
+def test_scripted_game_replays_from_its_save(tmp_path, monkeypatch):
+    # main() is run as it is, headless: the events come from the script below instead of the window, one per frame
+    monkeypatch.chdir(tmp_path)  # the save (and the puzzle bank, if there were one) are looked for here
+    for cache in ("font_cache", "glyph_cache", "marks_cache", "static_layers"):
+        monkeypatch.setattr(sudoku, cache, {})  # fonts left over from another test's pygame.init are no good
+    boards = []
+    board_class = sudoku.Board
+
+    class RecordedBoard(board_class):
+        def __init__(self, *args, **kwargs):
+            board_class.__init__(self, *args, **kwargs)
+            boards.append(self)
+
+    monkeypatch.setattr(sudoku, "Board", RecordedBoard)  # so the test gets to see the board main() plays on
+    mouse = [(0, 0)]
+    clicked = []  # the cells clicked on, (row, col)
+    monkeypatch.setattr(pygame.mouse, "get_pos", lambda: mouse[0])
+
+    def click(x, y):
+        mouse[0] = (x, y)
+        return pygame.event.Event(pygame.MOUSEBUTTONDOWN, pos=(x, y), button=1)
+
+    def cell(index):
+        # the index-th empty cell of the puzzle, clicked in the middle
+        model = boards[0].model
+        empty = [(row, col) for row in range(9) for col in range(9) if not model.is_given(row, col)]
+        row, col = empty[index]
+        clicked.append((row, col))
+        return click(col * 68 + 34, row * 68 + 34)
+
+    def script():
+        yield click(150, 470)  # easy
+        assert len(boards) == 1
+        yield cell(0)
+        yield key(pygame.K_4)  # sketch
+        yield key(pygame.K_RETURN)  # and place it
+        yield key(pygame.K_RIGHT)
+        yield cell(1)
+        yield key(pygame.K_1, pygame.KMOD_SHIFT)  # pencil marks
+        yield key(pygame.K_7, pygame.KMOD_SHIFT)
+        yield key(pygame.K_6)
+        yield cell(2)
+        yield key(pygame.K_2)
+        yield key(pygame.K_RETURN)
+        yield key(pygame.K_z, pygame.KMOD_CTRL)  # undo the 2
+        yield key(pygame.K_z, pygame.KMOD_CTRL)  # and the sketch under it
+        yield key(pygame.K_y, pygame.KMOD_CTRL)  # redo the sketch
+        yield cell(3)
+        yield key(pygame.K_9)
+        yield key(pygame.K_BACKSPACE)
+        yield key(pygame.K_5)
+        yield key(pygame.K_RETURN)
+        yield click(150, 650)  # reset
+        yield cell(4)
+        yield key(pygame.K_8)
+        yield key(pygame.K_RETURN)
+        yield cell(5)
+        yield key(pygame.K_3, pygame.KMOD_SHIFT)
+        yield pygame.event.Event(pygame.QUIT)
+
+    events = script()
+    monkeypatch.setattr(pygame.event, "wait", lambda timeout=0: next(events))
+    monkeypatch.setattr(pygame.event, "get", lambda *args, **kwargs: [])
+    with pytest.raises(SystemExit):
+        sudoku.main(max_fps=1000)
+
+    played = boards[0].model
+    # only the moves after the reset are left
+    assert played.value(*clicked[0]) == 0 and played.marks(*clicked[1]) == 0
+    assert played.value(*clicked[4]) == 8 and played.marks(*clicked[5]) == 1 << 3
+    loaded = GameSave().load()
+    assert loaded is not None
+    assert loaded[0].data == played.data
@@ -0,0 +1,26 @@
+import random
+from sudoku_generator import generate_sudoku_batch
+
+
+def solved(board):
+    lines = board + [list(col) for col in zip(*board)]
+    lines += [[board[r][c] for r in range(br, br + 3) for c in range(bc, bc + 3)]
+              for br in (0, 3, 6) for bc in (0, 3, 6)]
+    return all(sorted(line) == list(range(1, 10)) for line in lines)
+
+
+def test_batch_does_not_touch_global_random():
+    random.seed(1234)
+    state = random.getstate()
+    list(generate_sudoku_batch(5, 40, workers=1, seed=7))
+    assert random.getstate() == state
+
+
+def test_batch_is_the_same_for_any_worker_count():
+    one = sorted(generate_sudoku_batch(6, [30, 40], workers=1, seed=3, chunk_size=2))
+    two = sorted(generate_sudoku_batch(6, [30, 40], workers=2, seed=3, chunk_size=2))
+    assert one == two
+    assert [index for index, board, solution in one] == list(range(6))
+    for index, board, solution in one:
+        assert solved(solution)
+        assert all(value in (0, solution[r][c]) for r, row in enumerate(board) for c, value in enumerate(row))
@@ -0,0 +1,34 @@
+from sudoku_generator import main
+
+
+def run(tmp_path, name, *args):
+    path = tmp_path / name
+    main([*args, "-o", str(path), "--quiet"])
+    return path.read_text()
+
+
+def test_generate_is_the_same_for_the_same_seed(tmp_path):
+    default = run(tmp_path, "default.txt", "generate", "--count", "6", "--removed", "40", "--workers", "1")
+    seeded = run(tmp_path, "seeded.txt", "generate", "--count", "6", "--removed", "40", "--workers", "2", "--seed", "0")
+    other = run(tmp_path, "other.txt", "generate", "--count", "6", "--removed", "40", "--workers", "1", "--seed", "5")
+    assert default == seeded
+    assert default != other
+    lines = default.splitlines()
+    assert len(lines) == 6 and all(len(line) == 81 and line.count(".") == 40 for line in lines)
+
+
+def test_expand_is_the_same_for_the_same_seed(tmp_path):
+    args = ("generate", "--count", "20", "--removed", "45", "--expand", "10", "--seed", "3", "--solutions", "--workers", "1")
+    first = run(tmp_path, "first.txt", *args)
+    assert first == run(tmp_path, "second.txt", *args)
+    assert len(first.splitlines()) == 20
+
+
+def test_solve_and_validate_what_was_generated(tmp_path):
+    run(tmp_path, "puzzles.txt", "generate", "--count", "5", "--removed", "45", "--solutions", "--workers", "1")
+    pairs = [line.split(",") for line in (tmp_path / "puzzles.txt").read_text().splitlines()]
+    (tmp_path / "board.txt").write_text("".join(puzzle + "\n" for puzzle, solution in pairs))
+    solved = run(tmp_path, "solved.txt", "solve", str(tmp_path / "board.txt"), "--workers", "1")
+    assert solved.splitlines() == [solution for puzzle, solution in pairs]
+    assert run(tmp_path, "report.txt", "validate", str(tmp_path / "solved.txt"), "--workers", "1") == "solved\n" * 5
+    assert run(tmp_path, "report.txt", "validate", str(tmp_path / "board.txt"), "--workers", "1") == "unique\n" * 5
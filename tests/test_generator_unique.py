@@ -0,0 +1,78 @@
+import random
+import pytest
+from sudoku_generator import SudokuGenerator, generate_sudoku
+
+
+def count_solutions(board, limit):
+    # plain backtracking, nothing shared with the generator's masks, so it can check them
+    board = [row[:] for row in board]
+    empty = [(r, c) for r in range(9) for c in range(9) if board[r][c] == 0]
+
+    def fits(r, c):
+        br, bc = r - r % 3, c - c % 3
+        seen = set(board[r]) | {board[row][c] for row in range(9)}
+        seen |= {board[row][col] for row in range(br, br + 3) for col in range(bc, bc + 3)}
+        return [num for num in range(1, 10) if num not in seen]
+
+    def search(limit):
+        left = [(r, c) for r, c in empty if board[r][c] == 0]
+        if not left:
+            return 1
+        # the empty cell with the fewest numbers that fit next, or it takes seconds on the sparse boards
+        options = [(fits(r, c), r, c) for r, c in left]
+        nums, r, c = min(options, key=lambda option: len(option[0]))
+        found = 0
+        for num in nums:
+            board[r][c] = num
+            found += search(limit - found)
+            board[r][c] = 0
+            if found >= limit:
+                break
+        return found
+
+    return search(limit)
+
+
+def empty_cells(board):
+    return sum(row.count(0) for row in board)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_unique_puzzles_have_one_solution(seed):
+    board = generate_sudoku(9, 50, unique=True, rng=random.Random(seed))
+    assert empty_cells(board) == 50
+    assert count_solutions(board, 2) == 1
+
+
+def test_count_solutions_stops_at_the_limit():
+    sudoku = SudokuGenerator(9, 70, random.Random(1))
+    sudoku.fill_values()
+    sudoku.remove_cells()
+    board = [row[:] for row in sudoku.board]
+    assert count_solutions(board, 3) == 3  # plenty of solutions with only 11 clues
+    assert sudoku.count_solutions(2) == 2
+    assert sudoku.count_solutions(1) == 1
+    assert sudoku.board == board  # and the board is left as it was
+
+
+def test_count_solutions_on_a_full_board():
+    sudoku = SudokuGenerator(9, 0, random.Random(2))
+    sudoku.fill_values()
+    assert sudoku.count_solutions(2) == 1
+
+
+@pytest.mark.parametrize("removed", [0, 1, 30, 64])
+def test_removed_cells_as_asked(removed):
+    assert empty_cells(generate_sudoku(9, removed, rng=random.Random(removed))) == removed
+    if removed <= 30:
+        assert empty_cells(generate_sudoku(9, removed, unique=True, rng=random.Random(removed))) == removed
+
+
+def test_unique_removal_stops_where_it_has_to():
+    # no 9x9 puzzle with a single solution has fewer than 17 clues, so asking for all 81 gets as many as can go
+    sudoku = SudokuGenerator(9, 81, random.Random(3))
+    sudoku.fill_values()
+    removed = sudoku.remove_cells_unique()
+    assert removed == empty_cells(sudoku.board)
+    assert removed <= 81 - 17
+    assert count_solutions(sudoku.board, 2) == 1
@@ -0,0 +1,44 @@
+import pytest
+from sudoku_grader import grade_puzzle, PuzzleGrader
+
+PUZZLES = [
+    # (puzzle, level, hardest technique)
+    ("53..7....6..195....98....6.8...6...34..8.3..17...2...6.6....28....419..5....8..79", "easy", "hidden single"),
+    (".1.....6.........172.68.....4.5.8296.6.3.9....9.....5....8..3..6..752..89.......7", "medium", "pointing"),
+    ("...1..3.4....74.26.3..5.91.12...........39...3.98....5.41.6......5.83....6....4..", "hard", "naked pair"),
+    ("1.....569492.561.8.561.924...964.8.1.64.1....218.356.4.4.5...169.5.614.2621.....5", "expert", "x-wing"),
+    ("1....7.9..3..2...8..96..5....53..9...1..8...26....4...3......1..4......7..7...3..", "evil", "guess"),
+]
+
+
+def grid(text):
+    return [[0 if char == "." else int(char) for char in text[row * 9:(row + 1) * 9]] for row in range(9)]
+
+
+@pytest.mark.parametrize("puzzle, level, hardest", PUZZLES)
+def test_known_levels(puzzle, level, hardest):
+    result = grade_puzzle(grid(puzzle))
+    assert result["level"] == level
+    assert result["hardest"] == hardest
+
+
+def test_one_grader_for_many_puzzles():
+    grader = PuzzleGrader(9)
+    first = [grader.grade(grid(puzzle)) for puzzle, level, hardest in PUZZLES]
+    assert first == [grader.grade(grid(puzzle)) for puzzle, level, hardest in PUZZLES]
+    # up to expert the harder puzzles score more (a guess ends the grading, so evil is left out)
+    scores = [result["score"] for result in first[:4]]
+    assert scores == sorted(scores)
+
+
+def test_broken_puzzle():
+    broken = grid(PUZZLES[0][0])
+    broken[0][2] = 5  # a second 5 in the first row
+    assert grade_puzzle(broken) is None
+
+
+def test_number_with_nowhere_to_go():
+    # no number is repeated, but after this 2 some number has no cell left in one of its units
+    puzzle = grid(PUZZLES[1][0])
+    puzzle[1][3] = 2
+    assert grade_puzzle(puzzle) is None
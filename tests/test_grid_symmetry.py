@@ -0,0 +1,38 @@
+import random
+import pytest
+from sudoku_generator import generate_from_id, make_puzzle_id
+from grid_symmetry import expand, flatten, canonical_grid, canonical_puzzle, dedupe
+
+pytest.importorskip("numpy")  # the canonical form needs numpy, expand doesn't
+
+
+def test_expand_keeps_puzzle_and_solution_together():
+    board, solution = generate_from_id(make_puzzle_id(11, 9, 45))
+    items = list(expand(board, solution, count=50, rng=random.Random(1)))
+    assert len(items) == 50 and len(set(items)) == 50
+    for puzzle, moved in items:
+        assert sorted(moved) == sorted(flatten(solution))
+        assert puzzle.count(0) == 45
+        assert all(value in (0, moved[cell]) for cell, value in enumerate(puzzle))
+    assert items == list(expand(board, solution, count=50, rng=random.Random(1)))
+
+
+def test_canonical_form_is_the_same_under_expand():
+    board, solution = generate_from_id(make_puzzle_id(12, 9, 40))
+    key = canonical_puzzle(board, solution)
+    grid_key = canonical_grid(solution)
+    for puzzle, moved in expand(board, solution, count=40, rng=random.Random(2)):
+        assert canonical_puzzle(puzzle, moved) == key
+        assert canonical_grid(moved) == grid_key
+    other, other_solution = generate_from_id(make_puzzle_id(13, 9, 40))
+    assert canonical_puzzle(other, other_solution) != key
+
+
+def test_dedupe_keeps_one_of_each():
+    first = generate_from_id(make_puzzle_id(14, 9, 40))
+    second = generate_from_id(make_puzzle_id(15, 9, 40))
+    puzzles = [(flatten(first[0]), flatten(first[1]))]
+    puzzles += list(expand(*first, count=10, rng=random.Random(3)))
+    puzzles += [(flatten(second[0]), flatten(second[1]))]
+    puzzles += list(expand(*second, count=10, rng=random.Random(4)))
+    assert list(dedupe(puzzles)) == [puzzles[0], puzzles[11]]
@@ -0,0 +1,63 @@
+import random
+import pytest
+from puzzle_bank import PuzzleBank, write_bank, pack_grid, packed_length
+from sudoku_generator import generate_from_id, make_puzzle_id
+
+
+def puzzles():
+    # real puzzles, plus the edge cases for the 4 bit cells: a full board and the last (odd) cell a 0 or a 9
+    result = [generate_from_id(make_puzzle_id(seed, 9, removed)) for seed, removed in enumerate([30, 45, 30, 60, 45])]
+    board, solution = result[0]
+    result.append(([row[:] for row in solution], solution))
+    nines = [[9] * 9 for _ in range(9)]
+    result.append((nines, nines))
+    last_empty = [row[:] for row in solution]
+    last_empty[8][8] = 0
+    result.append((last_empty, solution))
+    return result
+
+
+def test_every_record_reads_back(tmp_path):
+    path = str(tmp_path / "puzzles.bank")
+    written = puzzles()
+    assert write_bank(path, written) == len(written)
+    # records are grouped by removed count, in the order they were written inside a group
+    expected = sorted(written, key=lambda puzzle: sum(row.count(0) for row in puzzle[0]))
+    with PuzzleBank(path) as bank:
+        assert len(bank) == len(written)
+        grid_bytes = packed_length(9)
+        for number, (board, solution) in enumerate(expected):
+            read_board, read_solution, removed = bank.get_record(number)
+            assert read_board == board and read_solution == solution
+            assert removed == sum(row.count(0) for row in board)
+            start = bank.records_start + number * bank.record_size
+            assert bank.data[start:start + 2 * grid_bytes] == pack_grid(board) + pack_grid(solution)
+        assert bank.count(30) == 2 and bank.count(0) == 2 and bank.count(1) == 1 and bank.count(50) == 0
+
+
+def test_random_puzzle_comes_from_the_right_group(tmp_path):
+    path = str(tmp_path / "puzzles.bank")
+    write_bank(path, puzzles())
+    random.seed(5)
+    with PuzzleBank(path) as bank:
+        for _ in range(20):
+            board, solution = bank.random_puzzle(45)
+            assert sum(row.count(0) for row in board) == 45
+        assert bank.random_puzzle(50) is None
+
+
+def test_record_past_the_end(tmp_path):
+    path = str(tmp_path / "puzzles.bank")
+    written = write_bank(path, puzzles())
+    with PuzzleBank(path) as bank:
+        bank.get_record(written - 1)
+        for number in (written, written + 100, -1):
+            with pytest.raises(IndexError):
+                bank.get_record(number)
+
+
+def test_not_a_bank(tmp_path):
+    path = tmp_path / "puzzles.bank"
+    path.write_bytes(b"not a bank at all")
+    with pytest.raises(ValueError):
+        PuzzleBank(str(path))
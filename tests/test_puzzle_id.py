@@ -0,0 +1,48 @@
+import datetime
+import pytest
+from sudoku_generator import make_puzzle_id, parse_puzzle_id, generate_from_id, daily_puzzle_id
+from sudoku_solver import SudokuSolver
+
+
+@pytest.mark.parametrize("seed, size, removed, unique", [
+    (0, 9, 40, True),
+    (123456789, 9, 55, False),
+    ((1 << 48) - 1, 16, 120, False),
+    (42, 25, 300, False),
+])
+def test_id_round_trip(seed, size, removed, unique):
+    puzzle_id = make_puzzle_id(seed, size, removed, unique)
+    assert parse_puzzle_id(puzzle_id) == {"seed": seed, "size": size, "removed": removed, "unique": unique}
+    # how people type IDs back in
+    sloppy = "-".join(puzzle_id[i:i + 4] for i in range(0, len(puzzle_id), 4)).lower()
+    assert parse_puzzle_id(sloppy) == parse_puzzle_id(puzzle_id)
+
+
+def test_same_id_same_puzzle():
+    puzzle_id = make_puzzle_id(2024, 9, 45, unique=True)
+    board, solution = generate_from_id(puzzle_id)
+    assert generate_from_id(puzzle_id) == (board, solution)
+    assert sum(row.count(0) for row in board) == 45
+    assert all(value in (0, solution[r][c]) for r, row in enumerate(board) for c, value in enumerate(row))
+    assert SudokuSolver(board).count_solutions() == 1
+    assert generate_from_id(make_puzzle_id(2025, 9, 45, unique=True)) != (board, solution)
+
+
+def test_bad_ids():
+    puzzle_id = make_puzzle_id(7)
+    typo = puzzle_id[:3] + ("2" if puzzle_id[3] != "2" else "3") + puzzle_id[4:]
+    with pytest.raises(ValueError):
+        parse_puzzle_id(typo)
+    with pytest.raises(ValueError):
+        parse_puzzle_id(puzzle_id[:-1])
+    with pytest.raises(ValueError):
+        make_puzzle_id(1 << 48)
+    with pytest.raises(ValueError):
+        make_puzzle_id(1, size=12)
+
+
+def test_daily_puzzle():
+    day = datetime.date(2024, 3, 1)
+    assert daily_puzzle_id(day) == daily_puzzle_id(datetime.date(2024, 3, 1))
+    assert daily_puzzle_id(day) != daily_puzzle_id(day + datetime.timedelta(days=1))
+    assert parse_puzzle_id(daily_puzzle_id(day))["seed"] == day.toordinal()
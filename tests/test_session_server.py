@@ -0,0 +1,125 @@
+import asyncio, json
+import pytest
+from puzzle_prefetcher import PuzzlePrefetcher
+from session_server import SessionServer
+
+
+@pytest.fixture
+def server():
+    prefetcher = PuzzlePrefetcher()
+    yield SessionServer(prefetcher)
+    prefetcher.close()
+
+
+def talk(server, lines):
+    # sends each line over a real connection and returns the replies, in order
+    async def run():
+        listener = await asyncio.start_server(server.serve_client, "127.0.0.1", 0)
+        port = listener.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        replies = []
+        for line in lines:
+            if callable(line):  # built from the replies so far, e.g. to use the session id
+                line = line(replies)
+            writer.write(line.encode() + b"\n")
+            await writer.drain()
+            replies.append(json.loads(await reader.readline()))
+        writer.close()
+        listener.close()
+        await listener.wait_closed()
+        return replies
+    return asyncio.run(run())
+
+
+def request(**fields):
+    # a request for the session the first reply started
+    return lambda replies: json.dumps({"session": replies[0]["session"], **fields})
+
+
+def empty_cell(replies):
+    board = replies[0]["board"]
+    return next((row, col) for row in range(9) for col in range(9) if not board[row][col])
+
+
+def test_a_game(server):
+    replies = talk(server, [
+        '{"op": "new", "difficulty": 30}',
+        lambda replies: request(op="select", row=empty_cell(replies)[0], col=empty_cell(replies)[1])(replies),
+        request(op="sketch", value=4),
+        request(op="place"),
+        request(op="check"),
+        request(op="end"),
+        request(op="check"),
+    ])
+    assert all(reply["ok"] for reply in replies[:6])
+    assert replies[4]["full"] is False
+    assert replies[6] == {"ok": False, "error": "unknown session"}
+    assert server.sessions == {}
+
+
+@pytest.mark.parametrize("bad", [
+    "{not json",
+    "[1, 2]",
+    '{"op": "launch"}',
+    '{"op": "new", "size": 12}',
+    '{"op": "new", "difficulty": 1e400}',
+    '{"op": "new", "difficulty": 40.5}',
+    '{"op": "new", "difficulty": "lots"}',
+    '{"op": "new", "difficulty": 200}',
+    '{"op": "new", "id": "nonsense"}',
+    request(op="select", col=0),
+    request(op="select", row=1e400, col=0),
+    request(op="select", row=-1e400, col=0),
+    request(op="select", row=0.5, col=0),
+    request(op="select", row=[0], col=0),
+    request(op="select", row=9, col=0),
+    request(op="select", row=0, col=-1),
+    request(op="place", value=5),  # nothing selected yet
+    request(op="bounce"),
+])
+def test_bad_requests_leave_the_session_usable(server, bad):
+    replies = talk(server, [
+        '{"op": "new", "difficulty": 30}',
+        bad,
+        lambda replies: request(op="select", row=empty_cell(replies)[0], col=empty_cell(replies)[1])(replies),
+        request(op="place", value=1e400),
+        request(op="place", value=10),
+        request(op="place", value=3),
+        request(op="check"),
+    ])
+    assert replies[0]["ok"]
+    assert replies[1]["ok"] is False and replies[1]["error"]
+    assert [reply["ok"] for reply in replies[2:]] == [True, False, False, True, True]
+    assert len(server.sessions) == 1
+
+
+def test_given_cells_cant_change(server):
+    def given_cell(replies):
+        board = replies[0]["board"]
+        return next((row, col) for row in range(9) for col in range(9) if board[row][col])
+    replies = talk(server, [
+        '{"op": "new", "difficulty": 30}',
+        lambda replies: request(op="select", row=given_cell(replies)[0], col=given_cell(replies)[1])(replies),
+        request(op="place", value=1),
+        request(op="clear"),
+    ])
+    assert replies[1]["ok"]
+    assert replies[2] == replies[3] == {"ok": False, "error": "cell is given"}
+
+
+def test_line_too_long(server):
+    async def run():
+        listener = await asyncio.start_server(server.serve_client, "127.0.0.1", 0, limit=1024)
+        port = listener.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(b'{"op": "' + b"x" * 4096 + b'"}\n')
+        await writer.drain()
+        reply = json.loads(await reader.readline())
+        closed = await reader.read() == b""
+        writer.close()
+        listener.close()
+        await listener.wait_closed()
+        return reply, closed
+    reply, closed = asyncio.run(run())
+    assert reply == {"ok": False, "error": "request line too long"}
+    assert closed
@@ -0,0 +1,92 @@
+import pytest
+from sudoku_solver import SudokuSolver
+
+# a 17 clue puzzle (the fewest a 9x9 puzzle with one solution can have) and its solution
+SEVENTEEN = "000000010400000000020000000000050407008000300001090000300400200050100000000806000"
+SOLUTION = "693784512487512936125963874932651487568247391741398625319475268856129743274836159"
+
+
+def grid(text):
+    return [[int(char) for char in text[row * 9:(row + 1) * 9]] for row in range(9)]
+
+
+def solved(board):
+    lines = board + [list(col) for col in zip(*board)]
+    lines += [[board[r][c] for r in range(br, br + 3) for c in range(bc, bc + 3)]
+              for br in (0, 3, 6) for bc in (0, 3, 6)]
+    return all(sorted(line) == list(range(1, 10)) for line in lines)
+
+
+def test_seventeen_clues():
+    puzzle = grid(SEVENTEEN)
+    solver = SudokuSolver(puzzle)
+    assert solver.solve() == grid(SOLUTION)
+    assert solver.count_solutions() == 1
+    assert puzzle == grid(SEVENTEEN)  # the grid it was given is left alone
+
+
+def test_solved_board():
+    solver = SudokuSolver(grid(SOLUTION))
+    assert solver.solve() == grid(SOLUTION)
+    assert solver.next_hint() is None
+
+
+@pytest.mark.parametrize("row, col, value", [
+    (0, 0, 1),  # a 1 already in the row
+    (1, 7, 1),  # in the column
+    (2, 2, 4),  # in the box
+])
+def test_invalid_grid(row, col, value):
+    puzzle = grid(SEVENTEEN)
+    puzzle[row][col] = value
+    solver = SudokuSolver(puzzle)
+    assert solver.solve() is None
+    assert not solver.is_solvable()
+    assert solver.count_solutions() == 0
+    assert solver.next_hint() is None
+
+
+def test_no_clash_but_no_solution():
+    # nothing is repeated, but the puzzle only has one solution and it has a 6 there
+    puzzle = grid(SEVENTEEN)
+    puzzle[0][0] = 5
+    solver = SudokuSolver(puzzle)
+    assert solver.consistent
+    assert solver.solve() is None
+    assert solver.count_solutions() == 0
+    assert solver.next_hint() is None
+
+
+def test_hints_follow_the_solution():
+    board = grid(SEVENTEEN)
+    techniques = set()
+    while True:
+        hint = SudokuSolver(board).next_hint()
+        if hint is None:
+            break
+        row, col, value, technique = hint
+        assert board[row][col] == 0
+        assert value == int(SOLUTION[row * 9 + col])
+        techniques.add(technique)
+        board[row][col] = value
+    assert board == grid(SOLUTION)
+    assert techniques <= {"naked single", "hidden single", "solution"}
+
+
+def test_hint_picks_a_naked_single():
+    board = grid(SOLUTION)
+    board[4][4] = 0
+    assert SudokuSolver(board).next_hint() == (4, 4, 4, "naked single")
+
+
+def test_hint_falls_back_to_the_solution():
+    # an empty band of three rows: no singles, so the hint comes from the solved board
+    board = grid(SOLUTION)
+    board[6:] = [[0] * 9 for _ in range(3)]
+    for row in board[:6]:
+        row[:] = row[:3] + [0] * 6
+    solver = SudokuSolver(board)
+    row, col, value, technique = solver.next_hint()
+    assert technique == "solution"
+    assert value == solver.solve()[row][col]
+    assert solved(solver.solve())
@@ -0,0 +1,86 @@
+from board_model import BoardModel, UndoLog
+
+SOLUTION = [
+    [5, 3, 4, 6, 7, 8, 9, 1, 2],
+    [6, 7, 2, 1, 9, 5, 3, 4, 8],
+    [1, 9, 8, 3, 4, 2, 5, 6, 7],
+    [8, 5, 9, 7, 6, 1, 4, 2, 3],
+    [4, 2, 6, 8, 5, 3, 7, 9, 1],
+    [7, 1, 3, 9, 2, 4, 8, 5, 6],
+    [9, 6, 1, 5, 3, 7, 2, 8, 4],
+    [2, 8, 7, 4, 1, 9, 6, 3, 5],
+    [3, 4, 5, 2, 8, 6, 1, 7, 9],
+]
+
+
+def new_model():
+    # the solution with its first row taken out
+    return BoardModel([[0] * 9] + [row[:] for row in SOLUTION[1:]])
+
+
+def play(model, log, moves):
+    for value, col in moves:
+        log.begin_move()
+        model.place_number(value, 0, col)
+        model.sketch(value, 0, col)
+        model.toggle_mark(value, 0, col)
+
+
+def test_undo_and_redo_round_trip():
+    model = new_model()
+    log = UndoLog(model)
+    start = bytes(model.data)
+    play(model, log, [(value, col) for col, value in enumerate(SOLUTION[0])])
+    end = bytes(model.data)
+    assert model.check_board()
+
+    assert log.undo() == [(0, 8)] * 3
+    assert model.value(0, 8) == 0 and model.marks(0, 8) == 0
+    assert log.redo() == [(0, 8)] * 3
+    assert bytes(model.data) == end
+
+    assert log.rewind()
+    assert bytes(model.data) == start
+    assert log.undo() == []
+    while log.redo():
+        pass
+    assert bytes(model.data) == end and model.check_board()
+
+
+def test_a_new_move_drops_the_redos():
+    model = new_model()
+    log = UndoLog(model)
+    play(model, log, [(5, 0), (3, 1)])
+    log.undo()
+    play(model, log, [(4, 2)])
+    assert log.redo() == []
+    assert model.value(0, 1) == 0 and model.value(0, 2) == 4
+    assert log.rewind()
+    assert bytes(model.data) == bytes(new_model().data)
+
+
+def test_full_log_forgets_whole_moves():
+    model = new_model()
+    log = UndoLog(model, cap=8)  # each move is 3 changes, so only 2 whole moves fit
+    play(model, log, [(value, col) for col, value in enumerate(SOLUTION[0][:4])])
+    assert log.count <= 8
+    assert log.entries[log.start] & UndoLog.MOVE_START
+    assert not log.rewind()
+    # the two newest moves are undone, the older ones were forgotten and stay on the board
+    assert [model.value(0, col) for col in range(4)] == SOLUTION[0][:2] + [0, 0]
+    while log.redo():
+        pass
+    assert [model.value(0, col) for col in range(4)] == SOLUTION[0][:4]
+
+
+def test_undo_keeps_counts_and_candidates_right():
+    model = new_model()
+    model.show_candidates(True)
+    log = UndoLog(model)
+    before = model.candidates[:]
+    play(model, log, [(5, 0), (5, 1)])  # the second 5 is in row 0 already, and in column 1 at (3, 1)
+    assert model.conflicts() == {(0, 0), (0, 1), (3, 1)}
+    log.undo()
+    assert model.conflicts() == set()
+    log.undo()
+    assert model.candidates == before and model.empty_count == 9